@@ -0,0 +1,183 @@
+"""
+Admission control for query inference.
+
+Each model gets a fixed number of inference slots and a bounded queue of
+requests waiting for one. Requests are counted against their models as
+they arrive, on the event loop, so the queue includes requests still waiting
+for a worker thread. A request arriving at a full queue is rejected at once,
+and a request still waiting when its deadline passes is dropped before
+inference starts. Under overload clients get a fast 503 instead of a slow
+timeout, and the CPU only works on requests that can still be answered in
+time.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+import math
+import os
+import threading
+import time
+
+# Concurrent inferences per model (default: CPU cores); more only adds contention
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT") or os.cpu_count() or 1)
+# Requests allowed to wait for an inference slot, per model
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "32"))
+# Time a request may take before it is no longer worth answering
+REQUEST_DEADLINE_MS = float(os.environ.get("REQUEST_DEADLINE_MS", "2000"))
+# Seconds clients are told to wait after being shed
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", "1"))
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being served."""
+
+    def __init__(self, message: str, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Overloaded):
+    """Raised when a request's deadline passes before inference starts."""
+
+
+def deadline_after(timeout_ms: float) -> float:
+    """Turn a timeout into an absolute ``time.monotonic()`` deadline."""
+    return time.monotonic() + timeout_ms / 1000
+
+
+def remaining_seconds(deadline: float) -> int:
+    """Whole seconds left before a deadline, rounded up and at least one.
+
+    Qdrant takes its request timeout in whole seconds.
+    """
+    return max(math.ceil(deadline - time.monotonic()), 1)
+
+
+class ModelGate:
+    """Inference slots and wait queue for one model."""
+
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.slots = threading.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        # Requests reserved for the model, from arrival until they finish
+        self.in_flight = 0
+        self.waiting = 0
+        self.running = 0
+        self.rejected = 0
+        self.expired = 0
+
+
+class AdmissionController:
+    """Bounds the inference running and queued for each model."""
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE
+    ):
+        """Initialize the controller.
+
+        Args:
+            max_concurrent: Inference slots per model
+            max_queue: Requests allowed to wait for a slot, per model
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._gates: Dict[str, ModelGate] = {}
+        self._lock = threading.Lock()
+
+    def _gate(self, model_name: str) -> ModelGate:
+        """Get a model's gate, creating it on first use (call with the lock held)."""
+        gate = self._gates.get(model_name)
+        if gate is None:
+            gate = self._gates[model_name] = ModelGate(self.max_concurrent, self.max_queue)
+        return gate
+
+    @contextmanager
+    def reserve(self, model_names: Sequence[str]) -> Iterator[None]:
+        """Count a request against its models from arrival until it finishes.
+
+        Never blocks, so it can run on the event loop before the request
+        waits for a worker thread. A model holds at most ``max_concurrent``
+        running requests plus ``max_queue`` waiting ones, whether they wait
+        for a worker thread or for an inference slot.
+
+        Args:
+            model_names: Models the request may run inference on
+
+        Raises:
+            Overloaded: If any of the models has no room left
+        """
+        with self._lock:
+            model_names = list(dict.fromkeys(model_names))
+            gates = [self._gate(model_name) for model_name in model_names]
+            for model_name, gate in zip(model_names, gates):
+                if gate.in_flight >= gate.max_concurrent + gate.max_queue:
+                    gate.rejected += 1
+                    raise Overloaded(f"Too many queued requests for {model_name}")
+            for gate in gates:
+                gate.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for gate in gates:
+                    gate.in_flight -= 1
+
+    @contextmanager
+    def admit(self, model_name: str, deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold an inference slot for a model while the block runs.
+
+        Args:
+            model_name: Model the inference runs on
+            deadline: Optional ``time.monotonic()`` deadline of the request
+
+        Raises:
+            Overloaded: If the model's wait queue is full
+            DeadlineExceeded: If the deadline passes before a slot is free
+        """
+        with self._lock:
+            gate = self._gate(model_name)
+            if gate.waiting >= gate.max_queue:
+                gate.rejected += 1
+                raise Overloaded(f"Too many queued requests for {model_name}")
+            gate.waiting += 1
+
+        if deadline is None:
+            acquired = gate.slots.acquire()
+        else:
+            timeout = deadline - time.monotonic()
+            acquired = timeout > 0 and gate.slots.acquire(timeout=timeout)
+        with self._lock:
+            gate.waiting -= 1
+            if not acquired:
+                gate.expired += 1
+            else:
+                gate.running += 1
+        if not acquired:
+            raise DeadlineExceeded(f"Request deadline passed while waiting for {model_name}")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                gate.running -= 1
+            gate.slots.release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Report in-flight, running, waiting, rejected and expired requests per model.
+
+        Returns:
+            Dictionary keyed by model name
+        """
+        with self._lock:
+            return {
+                model_name: {
+                    "in_flight": gate.in_flight,
+                    "running": gate.running,
+                    "waiting": gate.waiting,
+                    "rejected": gate.rejected,
+                    "expired": gate.expired
+                }
+                for model_name, gate in self._gates.items()
+            }
@@ -1,33 +1,136 @@
 """
 API for search suggestions.
 """
+import asyncio
+import json
+import logging
 import os
-from typing import Dict, List, Optional, Any, Union
+import threading
+import time
+from distutils.util import strtobool
+from urllib.parse import quote
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Tuple, Union
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, Depends, HTTPException, Body
+from fastapi import FastAPI, Query, Depends, HTTPException, Body, Header, Response, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from enum import Enum
 
+from search_suggest.admission import (
+    AdmissionController,
+    Overloaded,
+    REQUEST_DEADLINE_MS,
+    RETRY_AFTER_SECONDS,
+    deadline_after,
+    remaining_seconds
+)
+from search_suggest.cache import LRUCache
+from search_suggest.circuit_breaker import CircuitBreaker, CircuitOpen
 from search_suggest.embeddings import EmbeddingService, RECOMMENDED_MODELS
-from search_suggest.vector_store import VectorStore
+from search_suggest.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from search_suggest.jobs import Job, JobManager, JobLimitExceeded
+from search_suggest.local_index import IndexRegistry, LocalIndex
+from search_suggest.memory import deep_sizeof, mapped_files, model_parameter_bytes, process_memory, tokenizer_bytes
+from search_suggest.populate_db import populate_versioned_collection
+from search_suggest.precompute import PrecomputedResults, canonicalize_query
+from search_suggest.profiling import (
+    PROFILE_HEADER,
+    PROFILING_TOKEN,
+    ProfiledRoute,
+    profile_path,
+    profile_requests,
+    profile_text,
+    sample_profile,
+    token_matches
+)
+from search_suggest.query_log import create_query_logger
+from search_suggest.reduction import Reducer, ReducerNotFound, load_reducer, parse_reduction
+from search_suggest.serialization import FastJSONResponse, dumps, search_rows
+from search_suggest.spelling import load_spelling_index
+from search_suggest.taxonomy import TaxonomyParser
+from search_suggest.typeahead import TYPEAHEAD_DEBOUNCE_MS, Superseded, TypeaheadSession
+from search_suggest.vector_store import VectorStore, get_vector_store as get_shared_vector_store
 
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Search Suggestions API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Flush sampled queries still waiting to be written on shutdown."""
+    yield
+    if query_logger is not None:
+        query_logger.close()
+
+app = FastAPI(title="Search Suggestions API", lifespan=lifespan)
+
+if PROFILING_TOKEN is not None:
+    # Installed only when enabled, so requests pay nothing for it otherwise
+    app.router.route_class = ProfiledRoute
+    app.middleware("http")(profile_requests)
 
 # Mount static files
 static_dir = Path(__file__).parent / "static"
 static_dir.mkdir(exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
+# Collections searched for each model are named <prefix>_<model><suffix>
+COLLECTION_PREFIX = os.getenv("COLLECTION_PREFIX", "merchant_categories")
+COLLECTION_SUFFIX = os.getenv("COLLECTION_SUFFIX", "_test")
+
+# Seconds a resolved collection (alias target, vector name, reducer) is cached
+COLLECTION_SPEC_TTL = float(os.getenv("COLLECTION_SPEC_TTL", "30"))
+
+# "qdrant" searches Qdrant; "local" searches the memory-mapped local indexes
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "qdrant").lower()
+
+# Header marking responses served from the local fallback index
+DEGRADED_HEADER = "X-Search-Degraded"
+
+# Taxonomy used by populate jobs and for spelling correction
+TAXONOMY_FILE = Path(__file__).parent.parent / "data" / "taxonomy.txt"
+
+# Correct misspelled query terms against the taxonomy's vocabulary
+SPELLING_CORRECTION = bool(strtobool(os.getenv("SPELLING_CORRECTION", "false").lower()))
+# Top score a corrected query must add over the query as typed to be kept
+SPELLING_MIN_SCORE_GAIN = float(os.getenv("SPELLING_MIN_SCORE_GAIN", "0.05"))
+# Header carrying the corrected query (percent-encoded UTF-8)
+CORRECTED_QUERY_HEADER = "X-Search-Corrected-Query"
+
+# Seconds /collections output is reused while the set of collections is unchanged
+COLLECTIONS_CACHE_TTL = float(os.getenv("COLLECTIONS_CACHE_TTL", "300"))
+
+# Query embeddings kept per worker, keyed by canonical query (0 disables the cache)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
 # Global services
 embedding_services: Dict[str, EmbeddingService] = {}
-vector_store: Optional[VectorStore] = None
+job_manager = JobManager()
+collection_specs: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# /collections output keyed by the collection names it was built from
+collections_cache: Dict[Tuple[str, ...], Tuple[float, List[Dict[str, Any]], str]] = {}
+local_indexes = IndexRegistry()
+# Results for head queries, loaded once at startup
+precomputed = PrecomputedResults.load()
+# Sampled query log (None unless QUERY_LOG_FILE is set)
+query_logger = create_query_logger()
+# Bounded inference concurrency and queueing per model
+admission = AdmissionController()
+# Trips on failing or slow Qdrant calls, sending searches to the local indexes
+qdrant_breaker = CircuitBreaker("qdrant")
+# Reducers of collection and local index versions, loaded once per version
+get_reducer = lru_cache(maxsize=32)(load_reducer)
+# Symmetric-delete index over the taxonomy's words (None when disabled)
+spelling_index = load_spelling_index(TAXONOMY_FILE) if SPELLING_CORRECTION else None
+# Recent query embeddings, keyed by (model, collection, canonical query)
+query_embeddings = LRUCache(EMBEDDING_CACHE_SIZE)
 
 # Create an Enum for model selection in the API docs
 class EmbeddingModelEnum(str, Enum):
@@ -42,6 +145,11 @@ class EmbeddingModelEnum(str, Enum):
     MINI_LM_QA = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1"
     MSMARCO = "sentence-transformers/msmarco-MiniLM-L6-cos-v5"
 
+class StreamFormat(str, Enum):
+    """Encodings supported by streaming endpoints."""
+    NDJSON = "ndjson"
+    SSE = "sse"
+
 # Pydantic models for request/response
 class SearchResult(BaseModel):
     """Search result model."""
@@ -70,6 +178,7 @@ class ComparisonRequest(BaseModel):
     query: str = Field(..., description="Search query")
     models: List[EmbeddingModelEnum] = Field(..., description="Models to compare")
     limit: int = Field(10, description="Maximum number of results to return")
+    correct: bool = Field(True, description="Correct misspelled query terms before searching")
 
 class ComparisonResult(BaseModel):
     """Comparison result model."""
@@ -77,6 +186,24 @@ class ComparisonResult(BaseModel):
     query_time_ms: float = Field(..., description="Query time in milliseconds")
     results: List[SearchResult] = Field(..., description="Search results")
     model_info: Optional[Dict[str, Any]] = Field(None, description="Model information")
+    degraded: bool = Field(False, description="Served from the local fallback index while Qdrant was unavailable")
+    corrected_query: Optional[str] = Field(None, description="Query actually searched, if spelling correction changed it")
+
+class JobInfo(BaseModel):
+    """Background job information."""
+    id: str = Field(..., description="Job ID")
+    kind: str = Field(..., description="Type of job")
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    details: Dict[str, Any] = Field(..., description="Job parameters")
+    processed: int = Field(..., description="Number of items processed")
+    total: Optional[int] = Field(None, description="Total number of items")
+    progress: Optional[float] = Field(None, description="Fraction of items processed")
+    throughput: Optional[float] = Field(None, description="Items processed per second")
+    eta_seconds: Optional[float] = Field(None, description="Estimated seconds remaining")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    created_at: Optional[str] = Field(None, description="Creation timestamp")
+    started_at: Optional[str] = Field(None, description="Start timestamp")
+    finished_at: Optional[str] = Field(None, description="Finish timestamp")
 
 def get_embedding_service(model_name: str = "BAAI/bge-small-en-v1.5") -> EmbeddingService:
     """Get or create the embedding service.
@@ -93,30 +220,15 @@ def get_embedding_service(model_name: str = "BAAI/bge-small-en-v1.5") -> Embeddi
     return embedding_services[model_name]
 
 def get_vector_store() -> VectorStore:
-    """Get or create the vector store.
+    """Get the process-wide vector store.
     
     Returns:
         Vector store
     """
-    global vector_store
-    if vector_store is None:
-        # Check if we should use a local Qdrant instance
-        use_local_qdrant = os.getenv("USE_LOCAL_QDRANT", "false").lower() in ("true", "1", "yes")
-        
-        if use_local_qdrant:
-            # Use local Qdrant instance (no API key needed)
-            vector_store = VectorStore()
-        else:
-            # Use cloud Qdrant instance
-            qdrant_url = os.getenv("QDRANT_URL")
-            qdrant_api_key = os.getenv("QDRANT_API_KEY")
-            if not qdrant_url:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="QDRANT_URL environment variable is not set"
-                )
-            vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
-    return vector_store
+    try:
+        return get_shared_vector_store()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 def get_collection_for_model(model: str) -> str:
     """Determine the collection name based on the model.
@@ -127,8 +239,461 @@ def get_collection_for_model(model: str) -> str:
     Returns:
         Collection name
     """
-    # Standard format for all models with test suffix
-    return f"merchant_categories_{model.replace('/', '_')}_test"
+    # Standard format for all models; this is the alias populate publishes to
+    return f"{COLLECTION_PREFIX}_{model.replace('/', '_')}{COLLECTION_SUFFIX}"
+
+def get_collection_spec(vector_store: VectorStore, alias_name: str) -> Dict[str, Any]:
+    """Resolve how a model's collection must be searched.
+    
+    Reduced collections store their vectors under a named vector such as
+    ``pca-128``, and query embeddings must go through the same reducer. The
+    resolution is cached for ``COLLECTION_SPEC_TTL`` seconds so searches
+    don't pay for the extra lookups.
+    
+    Args:
+        vector_store: Vector store
+        alias_name: Collection name or alias searched for the model
+        
+    Returns:
+        Dictionary with the concrete ``collection``, its ``vector_name`` and
+        the ``reducer`` to apply to queries (both None for full-size vectors)
+    """
+    cached = collection_specs.get(alias_name)
+    if cached is not None and time.monotonic() - cached[0] < COLLECTION_SPEC_TTL:
+        return cached[1]
+    
+    collection_name = vector_store.get_alias_target(alias_name) or alias_name
+    try:
+        vector_name, _ = vector_store.get_vector_spec(collection_name)
+    except Exception:
+        # Missing collection; leave it to the search to report, and don't cache
+        return {"collection": collection_name, "vector_name": None, "reducer": None}
+    
+    spec = {
+        "collection": collection_name,
+        "vector_name": vector_name,
+        "reducer": resolve_reducer(collection_name, vector_name, vector_store)
+    }
+    collection_specs[alias_name] = (time.monotonic(), spec)
+    return spec
+
+def resolve_reducer(
+    collection_name: Optional[str],
+    vector_name: Optional[str],
+    vector_store: Optional[VectorStore] = None,
+    index_path: Optional[Path] = None
+) -> Optional[Reducer]:
+    """Get the reducer queries against a collection need.
+    
+    A missing projection is a broken deployment rather than a Qdrant
+    failure, so it is a 500 and never counts against the circuit breaker.
+    
+    Args:
+        collection_name: Concrete collection name
+        vector_name: Name of the collection's vector (None for unreduced)
+        vector_store: Optional vector store holding the projection
+        index_path: Optional local index version built from the collection
+        
+    Returns:
+        Reducer, or None when the collection stores full-size vectors
+    """
+    try:
+        return get_reducer(collection_name, vector_name, vector_store, index_path)
+    except ReducerNotFound as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+def get_search_version(model_name: str, vector_store: VectorStore) -> Optional[str]:
+    """Name the concrete collection version a model's searches currently hit.
+    
+    Args:
+        model_name: Embedding model
+        vector_store: Vector store
+        
+    Returns:
+        Concrete collection name, or None if Qdrant can't be asked and no
+        local index is published
+    """
+    alias_name = get_collection_for_model(model_name)
+    if SEARCH_BACKEND == "local":
+        index = local_indexes.get(alias_name)
+        if index is not None:
+            return index.metadata.get("collection", alias_name)
+    try:
+        qdrant_breaker.check()
+        return get_collection_spec(vector_store, alias_name)["collection"]
+    except Exception:
+        # Degraded: searches fall back to the local index, if there is one
+        index = local_indexes.get(alias_name)
+        return index.metadata.get("collection", alias_name) if index is not None else None
+
+@contextmanager
+def admit_inference(model_name: str, deadline: Optional[float]):
+    """Hold an admission slot for a model, turning load shedding into a 503.
+    
+    Args:
+        model_name: Model the inference runs on
+        deadline: Optional ``time.monotonic()`` deadline of the request
+    """
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(admission.admit(model_name, deadline))
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        yield
+
+@contextmanager
+def admit_request(model_names: List[str]):
+    """Reserve a request's place with its models, turning load shedding into a 503.
+    
+    Called on the event loop, before the request waits for a worker thread.
+    
+    Args:
+        model_names: Models the request may run inference on
+    """
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(admission.reserve(model_names))
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        yield
+
+def request_deadline(timeout_ms: Optional[float]) -> float:
+    """Deadline for a request, optionally shortened by the client.
+    
+    Args:
+        timeout_ms: Client timeout from ``X-Request-Timeout-Ms``, if sent
+        
+    Returns:
+        ``time.monotonic()`` deadline
+    """
+    if timeout_ms is None or timeout_ms <= 0:
+        return deadline_after(REQUEST_DEADLINE_MS)
+    return deadline_after(min(timeout_ms, REQUEST_DEADLINE_MS))
+
+def correct_query(query: str) -> Tuple[str, bool]:
+    """Correct misspelled words of a query against the taxonomy's vocabulary.
+    
+    Args:
+        query: Raw query
+        
+    Returns:
+        Tuple of (query to search, whether it was changed)
+    """
+    if spelling_index is None:
+        return query, False
+    corrected, corrections = spelling_index.correct(query)
+    return corrected, bool(corrections)
+
+def search_with_correction(
+    query: str,
+    correct: bool,
+    run_search: Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]
+) -> Tuple[str, bool, List[Dict[str, Any]], Dict[str, Any]]:
+    """Search a query, or its spelling correction if that finds clearly better matches.
+    
+    A corrected query is searched alongside the query as typed and kept
+    only if its top score beats the original's by ``SPELLING_MIN_SCORE_GAIN``,
+    so a valid word the taxonomy lacks is not swapped for an unrelated one.
+    
+    Args:
+        query: Raw query
+        correct: Whether to try correcting misspelled query terms
+        run_search: Searches a query, filling in the trace it is given
+        
+    Returns:
+        Tuple of (query searched, whether it was corrected, raw results, trace)
+    """
+    search_query, corrected = correct_query(query) if correct else (query, False)
+    trace: Dict[str, Any] = {}
+    raw_results = run_search(search_query, trace)
+    if not corrected:
+        return query, False, raw_results, trace
+    
+    original_trace: Dict[str, Any] = {}
+    original_results = run_search(query, original_trace)
+    if raw_results and (
+        not original_results
+        or raw_results[0]["score"] >= original_results[0]["score"] + SPELLING_MIN_SCORE_GAIN
+    ):
+        return search_query, True, raw_results, trace
+    return query, False, original_results, original_trace
+
+def raise_if_superseded(cancel_event: Optional[threading.Event]) -> None:
+    """Stop work whose answer is no longer wanted.
+    
+    Args:
+        cancel_event: Optional event set once a newer request replaced this one
+        
+    Raises:
+        Superseded: If the event is set
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise Superseded()
+
+def embed_query(
+    query: str,
+    model_name: str,
+    collection_name: Optional[str],
+    reducer: Optional[Reducer],
+    embedding_service: EmbeddingService,
+    deadline: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> List[float]:
+    """Embed a query for a collection, reusing a cached embedding if there is one.
+    
+    Queries are embedded in their canonical form, so spellings that differ
+    only in case, spacing or surrounding punctuation share one entry.
+    Cache hits skip admission since they need no inference.
+    
+    Args:
+        query: Search query
+        model_name: Embedding model to use
+        collection_name: Concrete collection the embedding is searched in
+        reducer: Reducer of that collection, if any
+        embedding_service: Embedding service
+        deadline: Optional ``time.monotonic()`` deadline of the request
+        cancel_event: Optional event set once the embedding is no longer
+            wanted; checked before and after waiting for an inference slot
+        
+    Returns:
+        Query embedding
+    """
+    canonical = canonicalize_query(query) or query
+    key = (model_name, collection_name, canonical)
+    embedding = query_embeddings.get(key)
+    if embedding is None:
+        raise_if_superseded(cancel_event)
+        with admit_inference(model_name, deadline):
+            raise_if_superseded(cancel_event)
+            embedding = embedding_service.create_embedding(canonical, model_name=model_name, reducer=reducer)
+        query_embeddings.put(key, embedding)
+    return embedding
+
+def search_local_index(
+    index: LocalIndex,
+    query: str,
+    model_name: str,
+    limit: int,
+    embedding_service: EmbeddingService,
+    trace: Dict[str, Any],
+    deadline: Optional[float] = None,
+    query_vector: Optional[List[float]] = None,
+    with_vectors: bool = False,
+    cancel_event: Optional[threading.Event] = None
+) -> List[Dict[str, Any]]:
+    """Embed a query and search a local index.
+    
+    Args:
+        index: Local index to search
+        query: Search query
+        model_name: Embedding model to use
+        limit: Maximum number of results to return
+        embedding_service: Embedding service
+        trace: Dictionary filled with the ``embed`` and ``search`` times and
+            the ``collection`` and ``vector_name`` searched
+        deadline: Optional ``time.monotonic()`` deadline of the request
+        query_vector: Query embedding already made for this index, if any
+        with_vectors: Also return each result's stored ``vector``
+        cancel_event: Optional event set once the results are no longer wanted
+        
+    Returns:
+        Raw search results
+    """
+    start_time = time.perf_counter()
+    collection_name = index.metadata.get("collection")
+    vector_name = index.metadata.get("vector_name")
+    trace.update(collection=collection_name, vector_name=vector_name)
+    if query_vector is None:
+        reducer = resolve_reducer(collection_name, vector_name, index_path=index.path)
+        query_vector = embed_query(
+            query, model_name, collection_name, reducer, embedding_service, deadline, cancel_event
+        )
+        trace["embed"] = (time.perf_counter() - start_time) * 1000
+    embedded_time = time.perf_counter()
+    results = index.search(query_vector, limit=limit, with_vectors=with_vectors)
+    trace["search"] = (time.perf_counter() - embedded_time) * 1000
+    return results
+
+def search_categories(
+    query: str,
+    model_name: str,
+    limit: int,
+    embedding_service: EmbeddingService,
+    vector_store: VectorStore,
+    trace: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    with_vectors: bool = False,
+    cancel_event: Optional[threading.Event] = None
+) -> List[Dict[str, Any]]:
+    """Embed a query and search the model's collection.
+    
+    With ``SEARCH_BACKEND=local`` the search runs against the memory-mapped
+    local index published for the collection, falling back to Qdrant while
+    none has been published.
+    
+    Qdrant calls go through a circuit breaker. When a call fails, or the
+    breaker is open after too many failed or slow calls, the search runs
+    against the local index instead and ``trace["degraded"]`` is set. Without
+    a local index the request fails fast with a 503.
+    
+    Query embeddings are cached per collection (see ``embed_query``).
+    Inference waits for one of the model's admission slots. Requests shed
+    because the queue is full or the deadline passed get a 503 with
+    ``Retry-After``, and the time left is passed on as the Qdrant timeout.
+    
+    Args:
+        query: Search query
+        model_name: Embedding model to use
+        limit: Maximum number of results to return
+        embedding_service: Embedding service
+        vector_store: Vector store
+        trace: Optional dictionary filled with the ``source`` that answered,
+            the ``collection`` and ``vector_name`` searched, the ``embed``
+            and ``search`` times in milliseconds and whether the answer is
+            ``degraded``
+        deadline: Optional ``time.monotonic()`` deadline of the request
+        with_vectors: Also return each result's stored ``vector``
+        cancel_event: Optional event set once the results are no longer
+            wanted; checked before embedding and before querying Qdrant
+        
+    Returns:
+        Raw search results
+        
+    Raises:
+        Superseded: If ``cancel_event`` was set before the search finished
+    """
+    alias_name = get_collection_for_model(model_name)
+    trace = trace if trace is not None else {}
+    
+    if SEARCH_BACKEND == "local":
+        index = local_indexes.get(alias_name)
+        if index is not None:
+            trace["source"] = "local"
+            return search_local_index(
+                index,
+                query,
+                model_name,
+                limit,
+                embedding_service,
+                trace,
+                deadline,
+                with_vectors=with_vectors,
+                cancel_event=cancel_event
+            )
+    
+    spec = None
+    query_embedding = None
+    try:
+        qdrant_breaker.check()
+        # Determine the collection based on the model
+        try:
+            spec = get_collection_spec(vector_store, alias_name)
+        except HTTPException:
+            raise
+        except Exception:
+            qdrant_breaker.record_failure()
+            raise
+        
+        # Create embedding for the query, reduced the same way as the collection
+        start_time = time.perf_counter()
+        query_embedding = embed_query(
+            query,
+            model_name,
+            spec["collection"],
+            spec["reducer"],
+            embedding_service,
+            deadline,
+            cancel_event
+        )
+        embedded_time = time.perf_counter()
+        trace["embed"] = (embedded_time - start_time) * 1000
+        
+        raise_if_superseded(cancel_event)
+        results = qdrant_breaker.call(lambda: vector_store.search(
+            collection_name=spec["collection"],
+            query_vector=query_embedding,
+            limit=limit,
+            vector_name=spec["vector_name"],
+            timeout=remaining_seconds(deadline) if deadline is not None else None,
+            with_vectors=with_vectors
+        ))
+        trace.update(
+            source="qdrant",
+            collection=spec["collection"],
+            vector_name=spec["vector_name"],
+            search=(time.perf_counter() - embedded_time) * 1000
+        )
+        return results
+    except (HTTPException, Superseded):
+        raise
+    except Exception as e:
+        if spec is not None and query_embedding is None:
+            # Embedding failed; Qdrant is not to blame
+            raise
+        index = local_indexes.get(alias_name)
+        if index is None:
+            retry_after = e.retry_after if isinstance(e, CircuitOpen) else RETRY_AFTER_SECONDS
+            raise HTTPException(
+                status_code=503,
+                detail=f"Vector store unavailable: {e}",
+                headers={"Retry-After": str(retry_after)}
+            )
+        if not isinstance(e, CircuitOpen):
+            logger.warning(f"Serving {alias_name} from the local index: {e}")
+        
+        # The embedding can be reused if it was made for the same collection
+        reusable = (
+            query_embedding is not None
+            and index.metadata.get("collection") == spec["collection"]
+        )
+        trace.update(source="fallback", degraded=True)
+        return search_local_index(
+            index,
+            query,
+            model_name,
+            limit,
+            embedding_service,
+            trace,
+            deadline,
+            query_vector=query_embedding if reusable else None,
+            with_vectors=with_vectors,
+            cancel_event=cancel_event
+        )
+
+def log_query(
+    endpoint: str,
+    query: str,
+    model_name: str,
+    limit: int,
+    trace: Dict[str, Any],
+    total_ms: float,
+    results: List[Dict[str, Any]]
+) -> None:
+    """Hand a served query to the query logger, if query logging is enabled.
+    
+    Args:
+        endpoint: Endpoint that served the query
+        query: Search query
+        model_name: Embedding model used
+        limit: Maximum number of results requested
+        trace: Trace filled by ``search_categories``
+        total_ms: Total time spent serving the query
+        results: Raw search results
+    """
+    if query_logger is None:
+        return
+    timings_ms = {name: trace[name] for name in ("embed", "search") if name in trace}
+    timings_ms["total"] = total_ms
+    query_logger.log(
+        endpoint,
+        query,
+        model_name,
+        limit,
+        timings_ms,
+        [result["id"] for result in results],
+        source=trace.get("source")
+    )
 
 @app.get("/")
 def root():
@@ -140,11 +705,17 @@ def root():
     return FileResponse(static_dir / "index.html")
 
 @app.get("/models", response_model=Dict[str, ModelInfo])
-def list_models() -> Dict[str, ModelInfo]:
+def list_models(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+) -> Response:
     """List available embedding models.
     
+    Args:
+        if_none_match: ETag of the client's cached copy, if any
+        
     Returns:
-        Dictionary of model names to model information
+        JSON response mapping model names to model information, or a 304
+        if the client's copy is current
     """
     models = EmbeddingService.list_recommended_models()
     
@@ -157,184 +728,592 @@ def list_models() -> Dict[str, ModelInfo]:
             description=model_info.get("description", ""),
             speed=model_info.get("speed", ""),
             quality=model_info.get("quality", "")
-        )
+        ).model_dump()
     
-    return formatted_models
+    etag = make_etag("/models", formatted_models)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return FastJSONResponse(formatted_models, headers=cache_headers(etag))
 
 @app.get("/collections", response_model=List[CollectionInfo])
 def list_collections(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     vector_store: VectorStore = Depends(get_vector_store)
-) -> List[CollectionInfo]:
+) -> Response:
     """List available collections in the vector store.
     
+    Describing every collection takes one Qdrant call each, so the output
+    is kept until the set of collection names changes (as every versioned
+    populate and every delete does), an in-process populate finishes, or
+    ``COLLECTIONS_CACHE_TTL`` seconds pass.
+    
+    Args:
+        if_none_match: ETag of the client's cached copy, if any
+        vector_store: Vector store
+        
     Returns:
-        List of collections
+        JSON response listing the collections, or a 304 if the client's
+        copy is current
     """
-    collections = vector_store.list_collections()
+    names = tuple(sorted(vector_store.collection_names()))
+    cached = collections_cache.get(names)
+    if cached is None or time.monotonic() - cached[0] >= COLLECTIONS_CACHE_TTL:
+        collections = vector_store.list_collections()
+        
+        # Filter out collections we want to hide
+        filtered_collections = [
+            CollectionInfo(
+                name=collection["name"],
+                vector_count=collection.get("vector_count"),
+                vector_size=collection.get("vector_size"),
+                created_at=collection.get("created_at")
+            ).model_dump()
+            for collection in collections
+            if collection["name"] not in ["merchant_categories", "merchant_categories_enriched"]
+        ]
+        cached = (time.monotonic(), filtered_collections, make_etag("/collections", filtered_collections))
+        collections_cache.clear()
+        collections_cache[names] = cached
     
-    # Filter out collections we want to hide
-    filtered_collections = [
-        CollectionInfo(
-            name=collection["name"],
-            vector_count=collection.get("vector_count"),
-            vector_size=collection.get("vector_size"),
-            created_at=collection.get("created_at")
-        )
-        for collection in collections
-        if collection["name"] not in ["merchant_categories", "merchant_categories_enriched"]
-    ]
+    _, filtered_collections, etag = cached
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return FastJSONResponse(filtered_collections, headers=cache_headers(etag))
+
+async def admit_search(
+    model: EmbeddingModelEnum = Query(EmbeddingModelEnum.BGE_SMALL, description="Embedding model to use"),
+    request_timeout_ms: Optional[float] = Header(
+        None,
+        alias="X-Request-Timeout-Ms",
+        description="Optional client timeout; shortens the server's request deadline"
+    )
+) -> AsyncIterator[float]:
+    """Admit a ``/search`` request as it arrives and stamp its deadline.
     
-    return filtered_collections
+    Async dependencies run on the event loop before a sync endpoint waits
+    for a worker thread, so the deadline counts the time spent waiting for
+    one, and a model with a full queue sheds the request without it ever
+    taking a thread.
+    
+    Args:
+        model: Embedding model to use
+        request_timeout_ms: Optional client timeout in milliseconds
+        
+    Yields:
+        ``time.monotonic()`` deadline of the request
+    """
+    deadline = request_deadline(request_timeout_ms)
+    with admit_request([model.value]):
+        yield deadline
 
 @app.get("/search", response_model=List[SearchResult])
 def search(
     query: str = Query(..., description="Search query"),
     model: EmbeddingModelEnum = Query(EmbeddingModelEnum.BGE_SMALL, description="Embedding model to use"),
     limit: int = Query(10, description="Maximum number of results to return"),
+    correct: bool = Query(True, description="Correct misspelled query terms before searching"),
+    deadline: float = Depends(admit_search),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
     vector_store: VectorStore = Depends(get_vector_store)
-) -> List[SearchResult]:
+) -> Response:
     """Search for categories matching the query.
     
+    Misspelled terms are corrected against the taxonomy's vocabulary, and
+    the correction is kept if it finds clearly better matches than the
+    query as typed; it is then returned in ``X-Search-Corrected-Query``.
+    Under overload the request is shed with a 503 and ``Retry-After``
+    rather than queued past its deadline. Results served from the local
+    fallback index while Qdrant is unavailable carry ``X-Search-Degraded: 1``.
+    Results are shaped once and encoded directly, skipping FastAPI's
+    response validation; ``response_model`` still documents them.
+    
+    The ETag is derived from the request and the collection version the
+    model searches, so a client revalidating with ``If-None-Match`` gets a
+    304 without any search until a populate publishes a new version.
+    Degraded results are marked ``no-store`` instead.
+    
     Args:
         query: Search query
         model: Embedding model to use
         limit: Maximum number of results to return
+        correct: Whether to correct misspelled query terms
+        deadline: Deadline stamped when the request arrived
+        if_none_match: ETag of the client's cached copy, if any
         embedding_service: Embedding service
         vector_store: Vector store
         
     Returns:
-        List of matching categories
+        JSON response listing the matching categories, or a 304 if the
+        client's copy is current
     """
-    import time
     start_time = time.time()
+    headers: Dict[str, str] = {}
     
     # Get the string value from the Enum
     model_name = model.value
+    version = get_search_version(model_name, vector_store)
+    etag = make_etag("/search", query, model_name, limit, correct, version) if version is not None else None
+    if etag is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    def run_search(text: str, trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Head queries are answered from the precomputed table while it
+        # matches the collection version being searched
+        if model_name in precomputed.models:
+            raw_results = precomputed.lookup(model_name, text, limit, version)
+            if raw_results is not None:
+                trace["source"] = "precomputed"
+                return raw_results
+        # Search for similar categories
+        return search_categories(text, model_name, limit, embedding_service, vector_store, trace, deadline)
+    
+    search_query, corrected, raw_results, trace = search_with_correction(query, correct, run_search)
+    if corrected:
+        headers[CORRECTED_QUERY_HEADER] = quote(search_query)
+    
+    end_time = time.time()
+    query_time_ms = (end_time - start_time) * 1000
+    log_query("/search", query, model_name, limit, trace, query_time_ms, raw_results)
+    if trace.get("degraded"):
+        headers[DEGRADED_HEADER] = "1"
+        # Fallback results must not outlive the outage in any cache
+        etag = None
+    elif trace.get("collection", version) != version:
+        # A new version was published while this request ran
+        etag = make_etag("/search", query, model_name, limit, correct, trace["collection"])
+    headers.update(cache_headers(etag))
+    
+    return FastJSONResponse(search_rows(raw_results), headers=headers)
+
+@app.get("/related/{category_id}", response_model=List[SearchResult])
+def related(
+    category_id: str,
+    model: EmbeddingModelEnum = Query(EmbeddingModelEnum.BGE_SMALL, description="Embedding model to use"),
+    limit: int = Query(10, description="Maximum number of results to return")
+) -> Response:
+    """Get the categories most similar to a category.
     
-    # Create embedding for the query
-    query_embedding = embedding_service.create_embedding(query, model_name=model_name)
+    Neighbors are precomputed when the model's local index is built, so no
+    embedding or vector search happens here.
     
-    # Determine the collection name based on the model
-    collection_name = get_collection_for_model(model_name)
+    Args:
+        category_id: Category to find related categories for
+        model: Embedding model whose neighbor graph to use
+        limit: Maximum number of results to return
+        
+    Returns:
+        JSON response listing related categories, most similar first
+    """
+    index = local_indexes.get(get_collection_for_model(model.value))
+    if index is None or index.neighbors is None:
+        raise HTTPException(status_code=404, detail=f"No related categories computed for {model.value}")
+    raw_results = index.related(category_id, limit)
+    if raw_results is None:
+        raise HTTPException(status_code=404, detail=f"Unknown category {category_id}")
+    return FastJSONResponse(search_rows(raw_results))
+
+def compare_model(
+    query: str,
+    model_name: str,
+    limit: int,
+    embedding_service: EmbeddingService,
+    vector_store: VectorStore,
+    deadline: Optional[float] = None,
+    correct: bool = True
+) -> Dict[str, Any]:
+    """Run a query against a single model's collection.
+    
+    Args:
+        query: Search query
+        model_name: Embedding model to use
+        limit: Maximum number of results to return
+        embedding_service: Embedding service
+        vector_store: Vector store
+        deadline: Optional ``time.monotonic()`` deadline of the request
+        correct: Whether to correct misspelled query terms
+        
+    Returns:
+        Comparison result for the model, shaped like ``ComparisonResult``
+    """
+    start_time = time.time()
     
     # Search for similar categories
-    raw_results = vector_store.search(
-        collection_name=collection_name,
-        query_vector=query_embedding,
-        limit=limit
+    search_query, corrected, raw_results, trace = search_with_correction(
+        query,
+        correct,
+        lambda text, trace: search_categories(text, model_name, limit, embedding_service, vector_store, trace, deadline)
     )
     
     end_time = time.time()
     query_time_ms = (end_time - start_time) * 1000
+    log_query("/compare", query, model_name, limit, trace, query_time_ms, raw_results)
     
-    # Format results to match the response model
-    results = []
-    for result in raw_results:
-        try:
-            results.append(SearchResult(
-                id=result["id"],
-                score=result["score"],
-                full_path=result["payload"]["full_path"],
-                level=result["payload"]["level"]
-            ))
-        except KeyError as e:
-            # Skip results that don't match the expected format
-            continue
+    return {
+        "model": model_name,
+        "query_time_ms": query_time_ms,
+        "results": search_rows(raw_results),
+        "model_info": EmbeddingService.list_recommended_models().get(model_name),
+        "degraded": bool(trace.get("degraded", False)),
+        "corrected_query": search_query if corrected else None
+    }
+
+async def admit_compare(
+    request: ComparisonRequest,
+    request_timeout_ms: Optional[float] = Header(
+        None,
+        alias="X-Request-Timeout-Ms",
+        description="Optional client timeout; shortens the server's request deadline"
+    )
+) -> AsyncIterator[float]:
+    """Admit a ``/compare`` request with every model it compares, as it arrives.
     
-    return results
+    Args:
+        request: Comparison request
+        request_timeout_ms: Optional client timeout in milliseconds
+        
+    Yields:
+        ``time.monotonic()`` deadline of the request
+    """
+    deadline = request_deadline(request_timeout_ms)
+    with admit_request([model_enum.value for model_enum in request.models]):
+        yield deadline
 
 @app.post("/compare", response_model=List[ComparisonResult])
 def compare(
     request: ComparisonRequest,
+    deadline: float = Depends(admit_compare),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
     vector_store: VectorStore = Depends(get_vector_store)
-) -> List[ComparisonResult]:
+) -> Response:
     """Compare search results from multiple models.
     
+    All models share one request deadline. If any model was served from
+    the local fallback index the response carries ``X-Search-Degraded: 1``.
+    A corrected query is reported in each result's ``corrected_query`` and
+    in ``X-Search-Corrected-Query``.
+    
     Args:
         request: Comparison request
+        deadline: Deadline stamped when the request arrived
         embedding_service: Embedding service
         vector_store: Vector store
         
     Returns:
-        List of comparison results
+        JSON response listing the comparison results
     """
-    results = []
+    results = [
+        compare_model(
+            request.query,
+            model_enum.value,
+            request.limit or 10,
+            embedding_service,
+            vector_store,
+            deadline,
+            request.correct
+        )
+        for model_enum in request.models
+    ]
+    headers: Dict[str, str] = {}
+    if any(result["degraded"] for result in results):
+        headers[DEGRADED_HEADER] = "1"
+    if results and results[0]["corrected_query"] is not None:
+        headers[CORRECTED_QUERY_HEADER] = quote(results[0]["corrected_query"])
+    return FastJSONResponse(results, headers=headers)
+
+@app.post("/compare/stream")
+async def compare_stream(
+    request: ComparisonRequest,
+    format: StreamFormat = Query(StreamFormat.NDJSON, description="Stream encoding"),
+    request_timeout_ms: Optional[float] = Header(
+        None,
+        alias="X-Request-Timeout-Ms",
+        description="Optional client timeout; shortens the server's request deadline"
+    ),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    vector_store: VectorStore = Depends(get_vector_store)
+) -> StreamingResponse:
+    """Compare models concurrently, streaming each result as it completes.
     
-    for model_enum in request.models:
-        import time
-        start_time = time.time()
-        
-        # Get the string value from the Enum
-        model_name = model_enum.value
+    Every model runs in the thread pool at the same time and its
+    ``ComparisonResult`` is written as soon as it is ready, so the fastest
+    model is visible without waiting for the slowest. A model that fails
+    produces an ``{"model": ..., "error": ...}`` item instead.
+    
+    Args:
+        request: Comparison request
+        format: ``ndjson`` for newline-delimited JSON or ``sse`` for server-sent events
+        request_timeout_ms: Optional client timeout in milliseconds
+        embedding_service: Embedding service
+        vector_store: Vector store
         
-        # Create embedding for the query
-        query_embedding = embedding_service.create_embedding(
-            request.query, 
-            model_name=model_name
-        )
+    Returns:
+        Streaming response with one item per model
+    """
+    deadline = request_deadline(request_timeout_ms)
+    
+    async def run_model(model_name: str) -> Dict[str, Any]:
+        try:
+            # Reserved on the event loop, before waiting for a worker thread
+            with admit_request([model_name]):
+                return await run_in_threadpool(
+                    compare_model,
+                    request.query,
+                    model_name,
+                    request.limit or 10,
+                    embedding_service,
+                    vector_store,
+                    deadline,
+                    request.correct
+                )
+        except HTTPException as e:
+            return {"model": model_name, "error": e.detail}
+        except Exception as e:
+            return {"model": model_name, "error": str(e)}
+    
+    async def stream():
+        tasks = [asyncio.ensure_future(run_model(model_enum.value)) for model_enum in request.models]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = dumps(await next_done)
+                if format == StreamFormat.SSE:
+                    yield f"event: result\ndata: {item}\n\n"
+                else:
+                    yield item + "\n"
+            if format == StreamFormat.SSE:
+                yield "event: done\ndata: {}\n\n"
+        finally:
+            # The client went away: don't leave orphaned tasks behind
+            for task in tasks:
+                task.cancel()
+    
+    media_type = "text/event-stream" if format == StreamFormat.SSE else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+def typeahead_search(
+    session: TypeaheadSession,
+    query: str,
+    model_name: str,
+    limit: int,
+    embedding_service: EmbeddingService,
+    vector_store: VectorStore,
+    deadline: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Answer one type-ahead keystroke.
+    
+    Text extending the session's last full search is embedded and scored
+    against that search's candidates only. Anything else runs a full search
+    for the session's candidate count, with vectors, which the caller keeps
+    as the new candidates.
+    
+    A keystroke replaced by a newer one sets ``cancel_event``. The search
+    then stops at its next checkpoint: before waiting for an inference slot,
+    before embedding and before querying Qdrant. A step already running
+    finishes first.
+    
+    Args:
+        session: The connection's type-ahead session (not modified here)
+        query: Text typed so far
+        model_name: Embedding model to use
+        limit: Maximum number of results to return
+        embedding_service: Embedding service
+        vector_store: Vector store
+        deadline: Optional ``time.monotonic()`` deadline of the keystroke
+        cancel_event: Optional event set once a newer keystroke replaced this one
         
-        # Determine the collection name based on the model
-        collection_name = get_collection_for_model(model_name)
+    Returns:
+        Tuple of (raw results, trace); the trace's ``source`` is
+        ``rescored`` when the candidates answered
         
-        # Search for similar categories
-        raw_results = vector_store.search(
-            collection_name=collection_name,
-            query_vector=query_embedding,
-            limit=request.limit or 10
+    Raises:
+        Superseded: If ``cancel_event`` was set before the answer was ready
+    """
+    trace: Dict[str, Any] = {}
+    raise_if_superseded(cancel_event)
+    if session.can_rescore(query, get_search_version(model_name, vector_store)):
+        start_time = time.perf_counter()
+        reducer = resolve_reducer(session.collection, session.vector_name, vector_store)
+        query_vector = embed_query(
+            query, model_name, session.collection, reducer, embedding_service, deadline, cancel_event
         )
-        
-        end_time = time.time()
-        query_time_ms = (end_time - start_time) * 1000
-        
-        # Format results to match the response model
-        search_results = []
-        for result in raw_results:
+        embedded_time = time.perf_counter()
+        results = session.rescore(query_vector, limit)
+        trace.update(
+            source="rescored",
+            embed=(embedded_time - start_time) * 1000,
+            search=(time.perf_counter() - embedded_time) * 1000
+        )
+        return results, trace
+    results = search_categories(
+        query,
+        model_name,
+        max(session.candidates, limit),
+        embedding_service,
+        vector_store,
+        trace,
+        deadline,
+        with_vectors=True,
+        cancel_event=cancel_event
+    )
+    return results, trace
+
+@app.websocket("/typeahead")
+async def typeahead(
+    websocket: WebSocket,
+    model: EmbeddingModelEnum = Query(EmbeddingModelEnum.BGE_SMALL, description="Embedding model to use"),
+    limit: int = Query(10, description="Maximum number of results to return"),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    vector_store: VectorStore = Depends(get_vector_store)
+) -> None:
+    """Search as the user types, over one WebSocket per input box.
+    
+    The client sends the current text on every keystroke, either as a plain
+    text frame or as ``{"query": ..., "seq": ...}``. A keystroke is searched
+    once typing pauses for ``TYPEAHEAD_DEBOUNCE_MS``. A newer keystroke
+    supersedes the search of an older one, which stops at its next
+    checkpoint (see ``typeahead_search``) and is never answered, so only the
+    latest text is. Each answer is a JSON object with the ``seq`` (the
+    client's, or a counter), ``query``, ``results``, whether they were
+    ``rescored`` from the previous candidates, whether they are
+    ``degraded`` and ``query_time_ms``; failures send ``error`` instead.
+    Spelling correction is skipped since the last word is usually partial.
+    
+    Args:
+        websocket: Client connection
+        model: Embedding model to use
+        limit: Maximum number of results to return per keystroke
+        embedding_service: Embedding service
+        vector_store: Vector store
+    """
+    await websocket.accept()
+    model_name = model.value
+    session = TypeaheadSession()
+    latest: Dict[str, Any] = {"seq": 0, "query": "", "client_seq": None}
+    keystroke = asyncio.Event()
+    # Search of the latest keystroke, and the event superseding it
+    running: Dict[str, Any] = {"task": None, "cancel": None}
+    
+    async def receive() -> None:
+        while True:
+            message = await websocket.receive_text()
             try:
-                search_results.append(SearchResult(
-                    id=result["id"],
-                    score=result["score"],
-                    full_path=result["payload"]["full_path"],
-                    level=result["payload"]["level"]
-                ))
-            except KeyError as e:
-                # Skip results that don't match the expected format
+                data = json.loads(message)
+            except ValueError:
+                data = message
+            if isinstance(data, dict):
+                latest.update(query=str(data.get("query") or ""), client_seq=data.get("seq"))
+            else:
+                latest.update(query=str(data), client_seq=None)
+            latest["seq"] += 1
+            keystroke.set()
+            # The running search is for text the user has already changed
+            if running["cancel"] is not None:
+                running["cancel"].set()
+    
+    async def search_keystroke(
+        query: str,
+        cancel_event: threading.Event
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        deadline = request_deadline(None)
+        # Reserved on the event loop, before waiting for a worker thread
+        with admit_request([model_name]):
+            return await run_in_threadpool(
+                typeahead_search,
+                session,
+                query,
+                model_name,
+                limit,
+                embedding_service,
+                vector_store,
+                deadline,
+                cancel_event
+            )
+    
+    async def respond() -> None:
+        while True:
+            await keystroke.wait()
+            # Debounce: wait until no keystroke arrived for a full interval
+            while keystroke.is_set():
+                keystroke.clear()
+                await asyncio.sleep(TYPEAHEAD_DEBOUNCE_MS / 1000)
+            seq, query = latest["seq"], latest["query"]
+            reply: Dict[str, Any] = {
+                "seq": latest["client_seq"] if latest["client_seq"] is not None else seq,
+                "query": query
+            }
+            if not query.strip():
+                await websocket.send_json(dict(reply, results=[], rescored=False, degraded=False, query_time_ms=0.0))
                 continue
-        
-        # Get model info if available
-        model_info = None
-        if model_name in EmbeddingService.list_recommended_models():
-            model_info = EmbeddingService.list_recommended_models()[model_name]
-        
-        results.append(ComparisonResult(
-            model=model_name,
-            query_time_ms=query_time_ms,
-            results=search_results,
-            model_info=model_info
-        ))
+            
+            start_time = time.time()
+            cancel_event = running["cancel"] = threading.Event()
+            task = running["task"] = asyncio.ensure_future(search_keystroke(query, cancel_event))
+            await asyncio.wait({task})
+            if seq != latest["seq"]:
+                continue
+            try:
+                raw_results, trace = task.result()
+            except HTTPException as e:
+                await websocket.send_json(dict(reply, error=e.detail))
+                continue
+            except Exception as e:
+                await websocket.send_json(dict(reply, error=str(e)))
+                continue
+            
+            rescored = trace.get("source") == "rescored"
+            if not rescored:
+                session.reset(query, trace.get("collection"), trace.get("vector_name"), raw_results)
+            await websocket.send_json(dict(
+                reply,
+                results=search_rows(raw_results[:limit]),
+                rescored=rescored,
+                degraded=trace.get("degraded", False),
+                query_time_ms=(time.time() - start_time) * 1000
+            ))
     
-    return results
+    responder = asyncio.ensure_future(respond())
+    try:
+        await receive()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        responder.cancel()
+        if running["cancel"] is not None:
+            running["cancel"].set()
+        if running["task"] is not None:
+            running["task"].cancel()
 
 @app.post("/populate")
 def populate_collection(
     model: str = Body(..., description="Embedding model to use"),
-    collection_suffix: str = Body("", description="Optional suffix for collection name")
+    collection_suffix: Optional[str] = Body(
+        None,
+        description="Optional suffix for collection name (defaults to the collection /search uses)"
+    ),
+    reduction: Optional[str] = Body(
+        None,
+        description="Optional reduction of stored vectors, e.g. 'pca:128' or 'truncate:256'"
+    )
 ) -> Dict[str, Any]:
     """Populate a collection with embeddings from the specified model.
     
-    This is an asynchronous operation that will run in the background.
+    The work is queued on the in-process job manager, which reuses the
+    already-loaded model, caps the number of concurrent builds and runs them
+    at a lower CPU priority than searches. Track it with ``GET /jobs/{id}``.
+    
+    The collection name is an alias: a new ``<name>_v<N>`` version is built
+    and verified, then the alias is switched to it atomically, so searches
+    keep hitting the previous version until the new one is complete.
     
     Args:
         model: Embedding model to use
         collection_suffix: Optional suffix for collection name
+        reduction: Optional reduction spec for the stored vectors
         
     Returns:
-        Status message
+        Status message with the job ID
     """
-    import subprocess
-    import threading
-    
     # Validate model
     if model not in RECOMMENDED_MODELS:
         raise HTTPException(
@@ -343,24 +1322,244 @@ def populate_collection(
         )
     
     # Create collection name
-    collection_name = f"merchant_categories_{model.replace('/', '_')}{collection_suffix}"
-    
-    # Define function to run in background
-    def run_populate():
-        cmd = [
-            "uv", "run", "python", "-m", "search_suggest.cli", "populate",
-            "--collection", collection_name,
-            "--embedding-model", model
-        ]
-        subprocess.run(cmd, check=True)
+    if collection_suffix is None:
+        collection_name = get_collection_for_model(model)
+    else:
+        collection_name = f"{COLLECTION_PREFIX}_{model.replace('/', '_')}{collection_suffix}"
+    
+    if reduction is not None:
+        try:
+            parse_reduction(reduction)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Only one build per collection at a time
+    active_job = job_manager.find_active(collection=collection_name)
+    if active_job is not None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Collection {collection_name} is already being populated by job {active_job.id}"
+        )
     
-    # Start background thread
-    thread = threading.Thread(target=run_populate)
-    thread.daemon = True
-    thread.start()
+    def run_populate(job: Job) -> None:
+        populate_versioned_collection(
+            taxonomy_file=TAXONOMY_FILE,
+            alias_name=collection_name,
+            embedding_model=model,
+            embedding_service=get_embedding_service(),
+            progress_callback=job.update_progress,
+            reduction=reduction
+        )
+        # Searches pick up the new version's vector name and reducer now
+        collection_specs.pop(collection_name, None)
+        collections_cache.clear()
+    
+    try:
+        job = job_manager.submit(
+            "populate",
+            {"collection": collection_name, "model": model, "reduction": reduction},
+            run_populate
+        )
+    except JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=f"Too many populate jobs: {e}")
     
     return {
         "status": "started",
         "message": f"Started populating collection {collection_name} with model {model}",
-        "collection": collection_name
+        "collection": collection_name,
+        "job_id": job.id
     }
+
+@app.get("/jobs", response_model=List[JobInfo])
+def list_jobs() -> List[JobInfo]:
+    """List background jobs, newest first.
+    
+    Returns:
+        List of jobs
+    """
+    return [JobInfo(**job.to_dict()) for job in job_manager.list()]
+
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+def get_job(job_id: str) -> JobInfo:
+    """Get the status of a background job.
+    
+    Args:
+        job_id: ID of the job
+        
+    Returns:
+        Job progress, throughput and estimated time remaining
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobInfo(**job.to_dict())
+
+@app.delete("/jobs/{job_id}", response_model=JobInfo)
+def cancel_job(job_id: str) -> JobInfo:
+    """Cancel a background job.
+    
+    Queued jobs are dropped; running jobs stop after their current batch.
+    
+    Args:
+        job_id: ID of the job
+        
+    Returns:
+        Job information
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobInfo(**job.to_dict())
+
+def memory_report(taxonomy_file: Optional[Path] = None) -> Dict[str, Any]:
+    """Break down what this process holds in memory.
+    
+    Python structures are measured by walking them, which takes up to a
+    few seconds for the larger ones. Memory-mapped local indexes are
+    reported with how much of their files is resident. Qdrant client
+    buffers are not broken out and fall in the unaccounted remainder.
+    
+    Args:
+        taxonomy_file: Optional taxonomy to parse and measure, for what a
+            populate job holds while it runs
+        
+    Returns:
+        Dictionary with the ``process`` memory, loaded ``models``, mapped
+        ``local_indexes``, ``taxonomy`` structures, ``caches`` and the
+        ``accounted_bytes`` among them
+    """
+    models = {}
+    for service in embedding_services.values():
+        for model_name, model in service.models.items():
+            if model_name not in models:
+                models[model_name] = {
+                    "model": model_name,
+                    "dtype": str(next(model.parameters()).dtype).removeprefix("torch."),
+                    "parameter_bytes": model_parameter_bytes(model),
+                    "tokenizer_bytes": tokenizer_bytes(model.tokenizer)
+                }
+    
+    mappings = mapped_files()
+    indexes = []
+    for name, version, index in local_indexes.loaded():
+        root = str(local_indexes.root.resolve() / name / version) + os.sep
+        indexes.append({
+            "name": name,
+            "version": version,
+            "count": len(index),
+            "vector_bytes": index.nbytes,
+            "neighbor_bytes": (
+                index.neighbors.nbytes + index.neighbor_scores.nbytes if index.neighbors is not None else 0
+            ),
+            "resident_bytes": sum(m["rss"] for path, m in mappings.items() if path.startswith(root)),
+            "payload_bytes": deep_sizeof([index.ids, index.payloads, index.__dict__.get("rows")])
+        })
+    
+    taxonomy: Dict[str, Dict[str, Any]] = {}
+    if spelling_index is not None:
+        taxonomy["spelling_index"] = {
+            "entries": len(spelling_index),
+            "bytes": deep_sizeof(spelling_index)
+        }
+    taxonomy["precomputed"] = {"entries": len(precomputed), "bytes": deep_sizeof(precomputed.models)}
+    if taxonomy_file is not None:
+        parser = TaxonomyParser(taxonomy_file)
+        taxonomy["parsed_taxonomy"] = {"entries": len(parser.categories), "bytes": deep_sizeof(parser)}
+    
+    caches: Dict[str, Dict[str, Any]] = {
+        "query_embeddings": dict(query_embeddings.stats(), entries=len(query_embeddings), bytes=deep_sizeof(query_embeddings)),
+        "collection_specs": {"entries": len(collection_specs), "bytes": deep_sizeof(collection_specs)},
+        "collections": {"entries": len(collections_cache), "bytes": deep_sizeof(collections_cache)},
+        "reducers": {"entries": get_reducer.cache_info().currsize, "maxsize": get_reducer.cache_info().maxsize}
+    }
+    if spelling_index is not None:
+        lookups = spelling_index.lookup.cache_info()
+        caches["spelling_lookups"] = {"entries": lookups.currsize, "maxsize": lookups.maxsize}
+    
+    accounted = (
+        sum(m["parameter_bytes"] + m["tokenizer_bytes"] for m in models.values())
+        + sum(i["resident_bytes"] + i["payload_bytes"] for i in indexes)
+        + sum(item.get("bytes") or 0 for section in (taxonomy, caches) for item in section.values())
+    )
+    return {
+        "pid": os.getpid(),
+        "process": process_memory(),
+        "models": list(models.values()),
+        "local_indexes": indexes,
+        "taxonomy": taxonomy,
+        "caches": caches,
+        "accounted_bytes": accounted
+    }
+
+@app.get("/debug/memory", include_in_schema=False)
+def debug_memory(
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+) -> Dict[str, Any]:
+    """Report what this worker holds in memory (see ``memory_report``).
+    
+    Args:
+        profile_token: Profiling token
+        
+    Returns:
+        Memory report of the worker that served the request
+    """
+    if not token_matches(profile_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return memory_report()
+
+class ProfileFormat(str, Enum):
+    """Renderings of a stored per-request profile."""
+    TEXT = "text"
+    PSTATS = "pstats"
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(
+    profile_id: str,
+    format: ProfileFormat = Query(ProfileFormat.TEXT, description="Rendering of the profile"),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+) -> Response:
+    """Download the profile of a request sent with ``X-Profile-Token``.
+    
+    Args:
+        profile_id: ID from the request's ``X-Profile-Id`` header
+        format: ``text`` for the top functions by cumulative time, or
+            ``pstats`` for the raw file (for snakeviz or ``pstats``)
+        profile_token: Profiling token
+        
+    Returns:
+        The profile
+    """
+    path = profile_path(profile_id) if token_matches(profile_token) else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if format == ProfileFormat.PSTATS:
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+    return PlainTextResponse(profile_text(path))
+
+@app.get("/debug/sample", include_in_schema=False)
+async def sample(
+    seconds: float = Query(10, gt=0, description="How long to sample"),
+    interval_ms: float = Query(5, gt=0, description="Milliseconds between samples"),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+) -> PlainTextResponse:
+    """Sample the stacks of every thread in this worker for a while.
+    
+    All traffic the worker serves meanwhile is sampled. The result is in
+    the collapsed-stack format, one ``frame;frame;... count`` line per
+    stack, which ``flamegraph.pl`` and speedscope read directly.
+    
+    Args:
+        seconds: How long to sample (at most ``PROFILE_MAX_SECONDS``)
+        interval_ms: Milliseconds between samples
+        profile_token: Profiling token
+        
+    Returns:
+        Collapsed stacks
+    """
+    if not token_matches(profile_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    stacks = await run_in_threadpool(sample_profile, seconds, interval_ms / 1000)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="The sampling profiler is already running")
+    return PlainTextResponse(stacks)
+
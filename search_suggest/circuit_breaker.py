@@ -0,0 +1,177 @@
+"""
+Circuit breaker for calls to the vector store.
+
+The breaker watches a sliding window of recent calls. A call fails if it
+raises or takes longer than the slow-call threshold. Once enough of the
+window has failed, the breaker opens and calls are refused at once instead
+of waiting on a struggling Qdrant. After a cool-down it lets a single trial
+call through (half-open): success closes it again, failure reopens it.
+"""
+from collections import deque
+from typing import Any, Callable, Deque, Dict, TypeVar
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fraction of failed or slow calls in the window that opens the breaker
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", "0.5"))
+# Calls slower than this count as failures
+BREAKER_SLOW_CALL_MS = float(os.environ.get("BREAKER_SLOW_CALL_MS", "1000"))
+# Number of recent calls the failure rate is computed over, and the minimum
+# number of calls before the breaker may open
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", "5"))
+# Seconds the breaker stays open before a trial call is let through
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised when a call is refused because the breaker is open."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after too many failed or slow calls, then probes for recovery."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_call_ms: float = BREAKER_SLOW_CALL_MS,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        open_seconds: float = BREAKER_OPEN_SECONDS
+    ):
+        """Initialize the breaker.
+
+        Args:
+            name: Name used in logs and errors
+            failure_rate: Fraction of failed calls in the window that opens it
+            slow_call_ms: Calls slower than this count as failures
+            window: Number of recent calls considered
+            min_calls: Calls needed in the window before it may open
+            open_seconds: Seconds to stay open before a trial call
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: ``closed``, ``open`` or ``half_open``."""
+        with self._lock:
+            return self._current_state()
+
+    def check(self) -> None:
+        """Refuse early if the breaker is open, without using up the trial call.
+
+        Raises:
+            CircuitOpen: If the breaker is open
+        """
+        with self._lock:
+            if self._current_state() == OPEN:
+                raise CircuitOpen(f"{self.name} circuit is open", self._retry_after())
+
+    def call(self, operation: Callable[[], T]) -> T:
+        """Run an operation through the breaker, recording how it went.
+
+        Args:
+            operation: Function calling the protected service
+
+        Returns:
+            The operation's result
+
+        Raises:
+            CircuitOpen: If the breaker is open, or half-open with a trial
+                call already in flight
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._trial_running):
+                raise CircuitOpen(f"{self.name} circuit is open", self._retry_after())
+            trial = state == HALF_OPEN
+            if trial:
+                self._trial_running = True
+
+        start_time = time.perf_counter()
+        try:
+            result = operation()
+        except Exception:
+            self._record(False, trial)
+            raise
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self._record(elapsed_ms <= self.slow_call_ms, trial)
+        return result
+
+    def record_failure(self) -> None:
+        """Count a failure of a call made outside ``call``."""
+        self._record(False, trial=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the state and the failure rate over the window.
+
+        Returns:
+            Dictionary with ``state``, ``calls`` and ``failure_rate``
+        """
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "calls": calls,
+                "failure_rate": failures / calls if calls else 0.0
+            }
+
+    def _record(self, success: bool, trial: bool) -> None:
+        with self._lock:
+            if trial:
+                self._trial_running = False
+                if success:
+                    logger.info(f"{self.name} circuit closed")
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self._state != CLOSED:
+                # A call started before the breaker opened; its outcome is stale
+                return
+            self._outcomes.append(success)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(f"{self.name} circuit opened for {self.open_seconds}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _retry_after(self) -> int:
+        remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+        return max(math.ceil(remaining), 1)
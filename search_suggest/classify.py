@@ -0,0 +1,299 @@
+"""
+Bulk classification of product titles into taxonomy categories.
+
+Titles are streamed from a JSONL or CSV file in chunks. A pool of forked
+worker processes embeds each chunk in large, length-sorted batches and
+searches Qdrant or a local index with batched requests. Chunks are written
+out in input order as they complete, one JSON line per input row, so an
+interrupted run resumes from the last row written.
+
+The model is loaded once in the parent before forking, and the workers
+share its weights copy-on-write, as the API's pre-fork server does.
+"""
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+from search_suggest.embeddings import EmbeddingService
+from search_suggest.local_index import LOCAL_INDEX_DIR, IndexRegistry
+from search_suggest.populate_db import encode_length_sorted, iter_batches
+from search_suggest.reduction import load_reducer
+from search_suggest.vector_store import VectorStore, get_vector_store, reset_clients
+
+# Encoder worker processes (default: CPU cores)
+CLASSIFY_WORKERS = int(os.getenv("CLASSIFY_WORKERS") or os.cpu_count() or 1)
+# Titles handed to a worker at once, and written out together
+CLASSIFY_CHUNK_SIZE = int(os.getenv("CLASSIFY_CHUNK_SIZE", "2048"))
+# Queries sent to Qdrant per batch search request
+SEARCH_BATCH_SIZE = 256
+CLASSIFY_BACKENDS = ("qdrant", "local")
+
+# What each worker classifies with; filled in before forking
+_worker: Dict[str, Any] = {}
+
+
+def iter_titles(
+    input_file: Path,
+    title_field: str = "title",
+    id_field: str = "id"
+) -> Iterator[Tuple[Optional[str], str]]:
+    """Read product titles from a JSONL or CSV file.
+
+    JSONL lines may be objects or bare JSON strings; CSV files need a
+    header row. Blank JSONL lines are skipped.
+
+    Args:
+        input_file: ``.csv`` file, or JSONL for any other extension
+        title_field: Field or column holding the title
+        id_field: Optional field or column holding a product ID
+
+    Yields:
+        Tuples of (product ID or None, title)
+    """
+    with open(input_file, "r", encoding="utf-8", newline="") as f:
+        if input_file.suffix.lower() == ".csv":
+            for row in csv.DictReader(f):
+                yield row.get(id_field), row.get(title_field) or ""
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield None, record
+            else:
+                yield record.get(id_field), str(record.get(title_field) or "")
+
+
+def completed_rows(output_file: Path) -> int:
+    """Count the rows an interrupted run already wrote, dropping a torn last line.
+
+    Args:
+        output_file: JSONL output of an earlier run
+
+    Returns:
+        Number of complete rows; the file is truncated after the last one
+    """
+    if not output_file.exists():
+        return 0
+    rows = 0
+    end = 0
+    position = 0
+    with open(output_file, "rb+") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            newlines = block.count(b"\n")
+            if newlines:
+                rows += newlines
+                end = position + block.rindex(b"\n") + 1
+            position += len(block)
+        f.truncate(end)
+    return rows
+
+
+def init_classify_worker(workers: int) -> None:
+    """Prepare a forked worker process.
+
+    Args:
+        workers: Total number of workers, used to size thread pools
+    """
+    import torch
+    from search_suggest.server import threads_per_worker
+
+    if _worker["backend"] == "qdrant" and _worker["vector_store"] is None:
+        # Connections opened by the parent must not be shared across processes
+        reset_clients()
+    if "OMP_NUM_THREADS" not in os.environ:
+        torch.set_num_threads(threads_per_worker(workers))
+
+
+def classify_chunk(titles: List[str]) -> List[List[Dict[str, Any]]]:
+    """Embed a chunk of titles and find the best categories for each.
+
+    Args:
+        titles: Product titles
+
+    Returns:
+        Categories for each title, best first
+    """
+    vectors = encode_length_sorted(
+        _worker["embedding_service"],
+        titles,
+        _worker["embedding_model"],
+        _worker["reducer"],
+        batch_size=_worker["batch_size"]
+    )
+    limit = _worker["limit"]
+    if _worker["backend"] == "local":
+        results = _worker["index"].search_batch(vectors, limit)
+    else:
+        if _worker["vector_store"] is None:
+            _worker["vector_store"] = get_vector_store()
+        results = []
+        for start in range(0, len(vectors), SEARCH_BATCH_SIZE):
+            results.extend(_worker["vector_store"].search_batch(
+                _worker["collection"],
+                vectors[start:start+SEARCH_BATCH_SIZE],
+                limit,
+                _worker["vector_name"]
+            ))
+    return [
+        [
+            {
+                "id": result["id"],
+                "score": round(float(result["score"]), 4),
+                "full_path": result["payload"].get("full_path")
+            }
+            for result in title_results
+        ]
+        for title_results in results
+    ]
+
+
+def classify_file(
+    input_file: Path,
+    output_file: Path,
+    collection: str,
+    embedding_model: str,
+    backend: str = "qdrant",
+    index_dir: Path = LOCAL_INDEX_DIR,
+    limit: int = 3,
+    workers: int = CLASSIFY_WORKERS,
+    chunk_size: int = CLASSIFY_CHUNK_SIZE,
+    batch_size: int = 64,
+    resume: bool = False,
+    title_field: str = "title",
+    id_field: str = "id",
+    embedding_service: Optional[EmbeddingService] = None,
+    vector_store: Optional[VectorStore] = None
+) -> Dict[str, Any]:
+    """Classify every title of a file into taxonomy categories.
+
+    Each output line holds the row's ``id`` and ``title`` and its best
+    ``categories``. Up to two chunks per worker are in flight at once, so
+    memory stays bounded however large the input is.
+
+    Args:
+        input_file: JSONL or CSV file of titles (see ``iter_titles``)
+        output_file: JSONL file to write
+        collection: Collection or alias (or local index name) to search
+        embedding_model: Model the collection was built with
+        backend: ``qdrant`` or ``local``
+        index_dir: Directory of local indexes, for the ``local`` backend
+        limit: Categories returned per title
+        workers: Encoder processes (1 classifies in this process)
+        chunk_size: Titles per worker task
+        batch_size: Titles the model encodes at once
+        resume: Continue after the rows an earlier run wrote to ``output_file``
+        title_field: Field or column holding the title
+        id_field: Field or column holding a product ID
+        embedding_service: Optional already-loaded embedding service
+        vector_store: Optional vector store (defaults to the shared one)
+
+    Returns:
+        Dictionary with the ``rows`` classified, ``skipped`` rows from an
+        earlier run, ``seconds`` and ``rows_per_second``
+    """
+    if backend not in CLASSIFY_BACKENDS:
+        raise ValueError(f"Invalid backend '{backend}', expected one of {CLASSIFY_BACKENDS}")
+    skipped = completed_rows(output_file) if resume else 0
+
+    index = None
+    if backend == "local":
+        index = IndexRegistry(index_dir).get(collection)
+        if index is None:
+            raise ValueError(f"No local index published for {collection} in {index_dir}")
+        collection_name = index.metadata.get("collection", collection)
+        vector_name = index.metadata.get("vector_name")
+        reducer = load_reducer(collection_name, vector_name, index_path=index.path)
+    else:
+        store = vector_store or get_vector_store()
+        collection_name = store.get_alias_target(collection) or collection
+        vector_name, _ = store.get_vector_spec(collection_name)
+        reducer = load_reducer(collection_name, vector_name, store)
+
+    _worker.update(
+        embedding_service=embedding_service or EmbeddingService(model_name=embedding_model),
+        embedding_model=embedding_model,
+        reducer=reducer,
+        backend=backend,
+        index=index,
+        vector_store=vector_store,
+        collection=collection_name,
+        vector_name=vector_name,
+        limit=limit,
+        batch_size=batch_size
+    )
+    if skipped:
+        print(f"Resuming after {skipped} rows already in {output_file}")
+    print(f"Classifying {input_file} against {collection_name} with {workers} workers")
+
+    chunks = iter_batches(itertools.islice(iter_titles(input_file, title_field, id_field), skipped, None), chunk_size)
+    rows = 0
+    start_time = time.perf_counter()
+    pool = multiprocessing.get_context("fork").Pool(
+        workers, initializer=init_classify_worker, initargs=(workers,)
+    ) if workers > 1 else None
+    try:
+        with open(output_file, "a" if resume else "w", encoding="utf-8") as out:
+            for chunk, results in classify_in_order(chunks, pool, max_pending=2 * workers):
+                for (product_id, title), categories in zip(chunk, results):
+                    out.write(json.dumps({"id": product_id, "title": title, "categories": categories}) + "\n")
+                # Everything written is kept if the run is interrupted
+                out.flush()
+                rows += len(chunk)
+                elapsed = time.perf_counter() - start_time
+                print(f"Classified {skipped + rows} rows ({rows / elapsed:.0f} rows/s)")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        _worker.clear()
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        "rows": rows,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def classify_in_order(
+    chunks: Iterator[List[Tuple[Optional[str], str]]],
+    pool: Optional[Any],
+    max_pending: int
+) -> Iterator[Tuple[List[Tuple[Optional[str], str]], List[List[Dict[str, Any]]]]]:
+    """Classify chunks on a pool, yielding them in input order.
+
+    Unlike ``Pool.imap``, which reads its whole input ahead, at most
+    ``max_pending`` chunks are read and in flight at a time.
+
+    Args:
+        chunks: Lists of (product ID, title)
+        pool: Worker pool, or None to classify in this process
+        max_pending: Chunks submitted ahead of the one being written
+
+    Yields:
+        Tuples of (chunk, categories for each row)
+    """
+    if pool is None:
+        for chunk in chunks:
+            yield chunk, classify_chunk([title for _, title in chunk])
+        return
+
+    pending: Deque[Tuple[List[Tuple[Optional[str], str]], Any]] = deque()
+    for chunk in chunks:
+        pending.append((chunk, pool.apply_async(classify_chunk, ([title for _, title in chunk],))))
+        if len(pending) >= max_pending:
+            done, result = pending.popleft()
+            yield done, result.get()
+    while pending:
+        done, result = pending.popleft()
+        yield done, result.get()
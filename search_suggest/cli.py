@@ -2,15 +2,45 @@
 Command-line interface for search suggestions.
 """
 import argparse
+import json
 import os
 import time
 from pathlib import Path
 from dotenv import load_dotenv
 from tabulate import tabulate
 
-from search_suggest.populate_db import populate_taxonomy_embeddings
-from search_suggest.embeddings import RECOMMENDED_MODELS, EmbeddingService
-from search_suggest.vector_store import VectorStore
+from search_suggest.populate_db import (
+    populate_versioned_collection,
+    snapshot_collection
+)
+from search_suggest.compare_models import (
+    compare_models,
+    reduction_report,
+    DEFAULT_LABELS_FILE,
+    DEFAULT_REDUCTION_DIMENSIONS
+)
+from search_suggest.classify import CLASSIFY_BACKENDS, CLASSIFY_CHUNK_SIZE, CLASSIFY_WORKERS, classify_file
+from search_suggest.export import IMPORT_TARGETS, export_collection, import_collection
+from search_suggest.local_index import LOCAL_INDEX_DIR
+from search_suggest.memory import print_memory_report
+from search_suggest.precompute import (
+    PRECOMPUTE_FILE,
+    build_precomputed_table,
+    load_query_counts,
+    save_precomputed_table
+)
+from search_suggest.reduction import REDUCTION_METHODS, delete_reducer
+from search_suggest.replay import load_log_entries, print_replay_report, replay
+from search_suggest.serialization import benchmark_serialization, print_serialization_report
+from search_suggest.embeddings import (
+    DEFAULT_MODEL,
+    MODEL_DIR,
+    PREFETCH_DTYPES,
+    RECOMMENDED_MODELS,
+    EmbeddingService,
+    prefetch_models
+)
+from search_suggest.vector_store import get_vector_store
 
 def main():
     """Main entry point for the CLI."""
@@ -33,13 +63,33 @@ def main():
     populate_parser.add_argument(
         "--collection", 
         default="merchant_categories", 
-        help="Name of the collection to populate"
+        help="Alias to point at the new <collection>_v<N> version once it is built"
     )
     populate_parser.add_argument(
         "--embedding-model",
         default="BAAI/bge-small-en-v1.5",
         help="Name of the sentence-transformers model to use for embeddings"
     )
+    populate_parser.add_argument(
+        "--versioned",
+        action="store_true",
+        help="Deprecated: populate always builds a new version and swaps the alias"
+    )
+    populate_parser.add_argument(
+        "--no-local-index",
+        action="store_true",
+        help="Don't publish a local index copy of the vectors (used when Qdrant is unavailable)"
+    )
+    populate_parser.add_argument(
+        "--reduction",
+        default=None,
+        help="Reduce stored vectors, e.g. 'pca:128' or 'truncate:256' (Matryoshka models)"
+    )
+    populate_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the taxonomy in chunks instead of loading it, for taxonomies too large for memory"
+    )
     
     # Generate embeddings for all models command
     generate_all_parser = subparsers.add_parser(
@@ -68,6 +118,433 @@ def main():
         help="Suffix to append to collection names"
     )
     
+    # Evaluate models command
+    evaluate_parser = subparsers.add_parser(
+        "evaluate",
+        help="Evaluate models on labeled queries (recall@k, MRR, nDCG, latency, memory)"
+    )
+    evaluate_parser.add_argument(
+        "--models",
+        nargs="+",
+        default=None,
+        help="Models to evaluate (defaults to all recommended models)"
+    )
+    evaluate_parser.add_argument(
+        "--labels-file",
+        default=str(DEFAULT_LABELS_FILE),
+        help="JSONL file of labeled queries"
+    )
+    evaluate_parser.add_argument(
+        "--taxonomy-file", 
+        default="data/taxonomy.txt", 
+        help="Path to the taxonomy file"
+    )
+    evaluate_parser.add_argument(
+        "--max-level", 
+        type=int, 
+        default=3, 
+        help="Maximum level of categories to include"
+    )
+    evaluate_parser.add_argument(
+        "--top-k",
+        type=int,
+        default=5,
+        help="Number of top results to score"
+    )
+    evaluate_parser.add_argument(
+        "--output",
+        default=None,
+        help="Path to write the JSON report to"
+    )
+    
+    # Reduction report command
+    reduction_parser = subparsers.add_parser(
+        "reduction-report",
+        help="Report recall lost when reducing a model's embeddings to smaller dimensions"
+    )
+    reduction_parser.add_argument(
+        "--embedding-model",
+        default="BAAI/bge-small-en-v1.5",
+        help="Name of the sentence-transformers model to evaluate"
+    )
+    reduction_parser.add_argument(
+        "--methods",
+        nargs="+",
+        default=["pca", "truncate"],
+        choices=REDUCTION_METHODS,
+        help="Reduction methods to try"
+    )
+    reduction_parser.add_argument(
+        "--dimensions",
+        nargs="+",
+        type=int,
+        default=DEFAULT_REDUCTION_DIMENSIONS,
+        help="Reduced dimensions to try"
+    )
+    reduction_parser.add_argument(
+        "--labels-file",
+        default=str(DEFAULT_LABELS_FILE),
+        help="JSONL file of labeled queries"
+    )
+    reduction_parser.add_argument(
+        "--taxonomy-file", 
+        default="data/taxonomy.txt", 
+        help="Path to the taxonomy file"
+    )
+    reduction_parser.add_argument(
+        "--max-level", 
+        type=int, 
+        default=3, 
+        help="Maximum level of categories to include"
+    )
+    reduction_parser.add_argument(
+        "--top-k",
+        type=int,
+        default=5,
+        help="Number of top results to score"
+    )
+    reduction_parser.add_argument(
+        "--output",
+        default=None,
+        help="Path to write the JSON report to"
+    )
+    
+    # Precompute head queries command
+    precompute_parser = subparsers.add_parser(
+        "precompute",
+        help="Precompute results for the most frequent queries, served by the API without searching"
+    )
+    precompute_parser.add_argument(
+        "queries_file",
+        help="Query log (JSONL with a 'query' field) or frequency list ('<query>\\t<count>' per line)"
+    )
+    precompute_parser.add_argument(
+        "--models",
+        nargs="+",
+        default=[DEFAULT_MODEL],
+        help="Models to precompute results for"
+    )
+    precompute_parser.add_argument(
+        "--top-n",
+        type=int,
+        default=1000,
+        help="Number of most frequent queries to precompute"
+    )
+    precompute_parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Number of results stored per query"
+    )
+    precompute_parser.add_argument(
+        "--collection-prefix",
+        default=os.getenv("COLLECTION_PREFIX", "merchant_categories"),
+        help="Prefix of the collections the API searches"
+    )
+    precompute_parser.add_argument(
+        "--collection-suffix",
+        default=os.getenv("COLLECTION_SUFFIX", "_test"),
+        help="Suffix of the collections the API searches"
+    )
+    precompute_parser.add_argument(
+        "--output",
+        default=str(PRECOMPUTE_FILE),
+        help="Path to write the table to"
+    )
+    
+    # Replay query log command
+    replay_parser = subparsers.add_parser(
+        "replay",
+        help="Replay a query log against a running API and report latency percentiles"
+    )
+    replay_parser.add_argument(
+        "log_files",
+        nargs="+",
+        help="Query log files or glob patterns"
+    )
+    replay_parser.add_argument(
+        "--base-url",
+        default="http://localhost:8000",
+        help="Base URL of the API"
+    )
+    replay_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of requests in flight"
+    )
+    replay_parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Target requests per second (default: as fast as --concurrency allows)"
+    )
+    replay_parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Number of requests to send, cycling through the log (default: one per entry)"
+    )
+    replay_parser.add_argument(
+        "--output",
+        default=None,
+        help="Path to write the JSON report to"
+    )
+    
+    # Serialization benchmark command
+    serialization_parser = subparsers.add_parser(
+        "benchmark-serialization",
+        help="Measure the CPU each /search and /compare response spends on JSON encoding"
+    )
+    serialization_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Results per model"
+    )
+    serialization_parser.add_argument(
+        "--models",
+        type=int,
+        default=3,
+        help="Models per /compare request"
+    )
+    serialization_parser.add_argument(
+        "--iterations",
+        type=int,
+        default=2000,
+        help="Responses encoded per measurement"
+    )
+    
+    # Snapshot collections command
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="Copy collections from Qdrant into local indexes the API falls back to"
+    )
+    snapshot_parser.add_argument(
+        "collections",
+        nargs="+",
+        help="Collections or aliases to snapshot, as searched by the API"
+    )
+    snapshot_parser.add_argument(
+        "--index-dir",
+        default=str(LOCAL_INDEX_DIR),
+        help="Directory of local indexes"
+    )
+    
+    # Classify product titles command
+    classify_parser = subparsers.add_parser(
+        "classify",
+        help="Map a file of product titles to taxonomy categories"
+    )
+    classify_parser.add_argument(
+        "input",
+        help="JSONL (one object or string per line) or CSV file of titles"
+    )
+    classify_parser.add_argument(
+        "output",
+        help="JSONL file to write, one line per input row in input order"
+    )
+    classify_parser.add_argument(
+        "--embedding-model",
+        default=DEFAULT_MODEL,
+        help="Model whose collection to search"
+    )
+    classify_parser.add_argument(
+        "--collection",
+        default=None,
+        help="Collection, alias or local index to search (default: the one the API uses for the model)"
+    )
+    classify_parser.add_argument(
+        "--collection-prefix",
+        default=os.getenv("COLLECTION_PREFIX", "merchant_categories"),
+        help="Prefix of the collections the API searches"
+    )
+    classify_parser.add_argument(
+        "--collection-suffix",
+        default=os.getenv("COLLECTION_SUFFIX", "_test"),
+        help="Suffix of the collections the API searches"
+    )
+    classify_parser.add_argument(
+        "--backend",
+        choices=CLASSIFY_BACKENDS,
+        default="qdrant",
+        help="Search Qdrant or the published local index"
+    )
+    classify_parser.add_argument(
+        "--index-dir",
+        default=str(LOCAL_INDEX_DIR),
+        help="Directory of local indexes"
+    )
+    classify_parser.add_argument(
+        "--limit",
+        type=int,
+        default=3,
+        help="Categories returned per title"
+    )
+    classify_parser.add_argument(
+        "--workers",
+        type=int,
+        default=CLASSIFY_WORKERS,
+        help="Encoder processes"
+    )
+    classify_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CLASSIFY_CHUNK_SIZE,
+        help="Titles handed to a worker at once"
+    )
+    classify_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="Titles the model encodes at once"
+    )
+    classify_parser.add_argument(
+        "--title-field",
+        default="title",
+        help="Field or column holding the title"
+    )
+    classify_parser.add_argument(
+        "--id-field",
+        default="id",
+        help="Field or column holding a product ID"
+    )
+    classify_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue after the rows already in the output file"
+    )
+    
+    # Export collection command
+    export_parser = subparsers.add_parser(
+        "export-collection",
+        help="Write a collection's vectors, IDs and payloads to a portable file"
+    )
+    export_parser.add_argument(
+        "collection",
+        help="Collection or alias to export"
+    )
+    export_parser.add_argument(
+        "output",
+        help="Path of the .npz file to write"
+    )
+    export_parser.add_argument(
+        "--embedding-model",
+        default=DEFAULT_MODEL,
+        help="Model the collection was built with, recorded in the manifest"
+    )
+    export_parser.add_argument(
+        "--taxonomy-file",
+        default="data/taxonomy.txt",
+        help="Taxonomy the collection was built from, hashed into the manifest"
+    )
+    export_parser.add_argument(
+        "--float16",
+        action="store_true",
+        help="Store vectors as float16, halving the file"
+    )
+    
+    # Import collection command
+    import_parser = subparsers.add_parser(
+        "import-collection",
+        help="Load an exported collection file without re-embedding"
+    )
+    import_parser.add_argument(
+        "input",
+        help="Path of the .npz file written by export-collection"
+    )
+    import_parser.add_argument(
+        "--collection",
+        default="merchant_categories",
+        help="Collection or alias the API searches for the model"
+    )
+    import_parser.add_argument(
+        "--target",
+        choices=IMPORT_TARGETS,
+        default="qdrant",
+        help="Load into Qdrant or only into a local index"
+    )
+    import_parser.add_argument(
+        "--versioned",
+        action="store_true",
+        help="Import into a new collection version and switch the alias to it"
+    )
+    import_parser.add_argument(
+        "--no-local-index",
+        action="store_true",
+        help="Skip the local index of a versioned Qdrant import"
+    )
+    import_parser.add_argument(
+        "--index-dir",
+        default=str(LOCAL_INDEX_DIR),
+        help="Directory of local indexes"
+    )
+    import_parser.add_argument(
+        "--embedding-model",
+        default=None,
+        help="Refuse the file unless it was built with this model"
+    )
+    import_parser.add_argument(
+        "--taxonomy-file",
+        default=None,
+        help="Refuse the file unless it was built from this taxonomy"
+    )
+    import_parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of processes uploading to Qdrant"
+    )
+    
+    # Prefetch models command
+    prefetch_parser = subparsers.add_parser(
+        "prefetch-models",
+        help="Download models into a directory the API loads them from without network access"
+    )
+    prefetch_parser.add_argument(
+        "models",
+        nargs="*",
+        help="Models to prefetch (default: all recommended models)"
+    )
+    prefetch_parser.add_argument(
+        "--model-dir",
+        default=str(MODEL_DIR or "models"),
+        help="Directory to save the models under (default: MODEL_DIR, or ./models)"
+    )
+    prefetch_parser.add_argument(
+        "--dtype",
+        choices=PREFETCH_DTYPES,
+        default="float32",
+        help="Precision of the saved weights; float16 halves their size on disk"
+    )
+    prefetch_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Download and save models again even if already present"
+    )
+    
+    # Memory report command
+    memory_parser = subparsers.add_parser(
+        "memory-report",
+        help="Load models and indexes as the API does and break down the memory they take"
+    )
+    memory_parser.add_argument(
+        "models",
+        nargs="*",
+        default=[DEFAULT_MODEL],
+        help=f"Models to load (default: {DEFAULT_MODEL})"
+    )
+    memory_parser.add_argument(
+        "--taxonomy-file",
+        default=None,
+        help="Also parse and measure this taxonomy, as populate jobs hold it"
+    )
+    memory_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the report as JSON"
+    )
+    
     # List models command
     models_parser = subparsers.add_parser("list-models", help="List recommended embedding models")
     
@@ -92,11 +569,14 @@ def main():
     args = parser.parse_args()
     
     if args.command == "populate":
-        populate_taxonomy_embeddings(
+        populate_versioned_collection(
             taxonomy_file=Path(args.taxonomy_file),
             max_level=args.max_level,
-            collection_name=args.collection,
-            embedding_model=args.embedding_model
+            alias_name=args.collection,
+            embedding_model=args.embedding_model,
+            reduction=args.reduction,
+            index_dir=None if args.no_local_index else LOCAL_INDEX_DIR,
+            stream=args.stream
         )
     elif args.command == "generate-all-models":
         generate_embeddings_for_all_models(
@@ -105,6 +585,136 @@ def main():
             collection_prefix=args.collection_prefix,
             test_suffix=args.test_suffix
         )
+    elif args.command == "evaluate":
+        compare_models(
+            args.models,
+            labels_file=Path(args.labels_file),
+            taxonomy_file=Path(args.taxonomy_file),
+            max_level=args.max_level,
+            top_k=args.top_k,
+            output_file=Path(args.output) if args.output else None
+        )
+    elif args.command == "reduction-report":
+        reduction_report(
+            args.embedding_model,
+            methods=args.methods,
+            dimensions=args.dimensions,
+            labels_file=Path(args.labels_file),
+            taxonomy_file=Path(args.taxonomy_file),
+            max_level=args.max_level,
+            top_k=args.top_k,
+            output_file=Path(args.output) if args.output else None
+        )
+    elif args.command == "precompute":
+        query_counts = load_query_counts(Path(args.queries_file))
+        print(f"Read {len(query_counts)} distinct queries ({sum(query_counts.values())} total)")
+        table = build_precomputed_table(
+            query_counts,
+            args.models,
+            {
+                model: f"{args.collection_prefix}_{model.replace('/', '_')}{args.collection_suffix}"
+                for model in args.models
+            },
+            EmbeddingService(model_name=args.models[0]),
+            get_vector_store(),
+            top_n=args.top_n,
+            limit=args.limit
+        )
+        save_precomputed_table(table, Path(args.output))
+        print(f"Wrote precomputed results to {args.output}; restart the API to load them")
+    elif args.command == "replay":
+        entries = load_log_entries(args.log_files)
+        print(f"Replaying {args.max_requests or len(entries)} requests from {len(entries)} logged queries")
+        report = replay(
+            args.base_url,
+            entries,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            max_requests=args.max_requests
+        )
+        print_replay_report(report)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {args.output}")
+    elif args.command == "benchmark-serialization":
+        report = benchmark_serialization(limit=args.limit, models=args.models, iterations=args.iterations)
+        print_serialization_report(report)
+    elif args.command == "snapshot":
+        for collection_name in args.collections:
+            snapshot_collection(collection_name, index_dir=Path(args.index_dir))
+    elif args.command == "classify":
+        model = args.embedding_model
+        stats = classify_file(
+            Path(args.input),
+            Path(args.output),
+            args.collection or f"{args.collection_prefix}_{model.replace('/', '_')}{args.collection_suffix}",
+            model,
+            backend=args.backend,
+            index_dir=Path(args.index_dir),
+            limit=args.limit,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            batch_size=args.batch_size,
+            resume=args.resume,
+            title_field=args.title_field,
+            id_field=args.id_field
+        )
+        print(f"Classified {stats['rows']} rows in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)")
+    elif args.command == "export-collection":
+        taxonomy_file = Path(args.taxonomy_file)
+        export_collection(
+            args.collection,
+            Path(args.output),
+            args.embedding_model,
+            dtype="float16" if args.float16 else "float32",
+            taxonomy_file=taxonomy_file if taxonomy_file.exists() else None
+        )
+    elif args.command == "import-collection":
+        start_time = time.time()
+        import_collection(
+            Path(args.input),
+            args.collection,
+            target=args.target,
+            versioned=args.versioned,
+            index_dir=None if args.no_local_index else Path(args.index_dir),
+            expected_model=args.embedding_model,
+            taxonomy_file=Path(args.taxonomy_file) if args.taxonomy_file else None,
+            parallel=args.parallel
+        )
+        print(f"Import took {time.time() - start_time:.1f}s")
+    elif args.command == "prefetch-models":
+        saved = prefetch_models(
+            args.models or list(RECOMMENDED_MODELS),
+            Path(args.model_dir),
+            dtype=args.dtype,
+            force=args.force
+        )
+        print(tabulate(
+            [
+                [
+                    item["model"],
+                    str(item["path"]),
+                    f"{item['bytes'] / 1e6:.1f} MB",
+                    "downloaded" if item["downloaded"] else "already present"
+                ]
+                for item in saved
+            ],
+            headers=["Model", "Path", "Size", "Status"],
+            tablefmt="grid"
+        ))
+        print(f"Set MODEL_DIR={args.model_dir} (and MODEL_OFFLINE=true to never download at boot)")
+    elif args.command == "memory-report":
+        from search_suggest import api
+        
+        api.get_embedding_service().preload(args.models)
+        for model_name in args.models:
+            api.local_indexes.get(api.get_collection_for_model(model_name))
+        report = api.memory_report(Path(args.taxonomy_file) if args.taxonomy_file else None)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_memory_report(report)
     elif args.command == "list-models":
         print("Recommended embedding models:")
         print("-" * 80)
@@ -126,7 +736,7 @@ def main():
             print("❌ QDRANT_URL or QDRANT_API_KEY environment variable is not set")
             return
         
-        vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
+        vector_store = get_vector_store()
         collections = vector_store.list_collections()
         
         # Format collections as a table
@@ -155,7 +765,7 @@ def main():
             print("❌ QDRANT_URL or QDRANT_API_KEY environment variable is not set")
             return
         
-        vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
+        vector_store = get_vector_store()
         
         # Confirm deletion
         confirm = input(f"Are you sure you want to delete collection '{args.collection_name}'? (y/n): ")
@@ -165,6 +775,7 @@ def main():
         
         # Delete collection
         success = vector_store.delete_collection(args.collection_name)
+        delete_reducer(args.collection_name, vector_store)
         if success:
             print(f"✅ Successfully deleted collection '{args.collection_name}'")
         else:
@@ -180,7 +791,7 @@ def main():
             print("❌ QDRANT_URL or QDRANT_API_KEY environment variable is not set")
             return
         
-        vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
+        vector_store = get_vector_store()
         collections = vector_store.list_collections()
         
         if not collections:
@@ -218,6 +829,11 @@ def generate_embeddings_for_all_models(
 ) -> None:
     """Generate embeddings for all recommended models.
     
+    Each model's collection is built as a new version behind its
+    ``{prefix}_{model}{suffix}`` alias, as ``populate`` does, so the
+    collection keeps serving its previous version until the new one is
+    verified.
+    
     Args:
         taxonomy_file: Path to the taxonomy file
         max_level: Maximum level of categories to include
@@ -234,8 +850,6 @@ def generate_embeddings_for_all_models(
         print("❌ QDRANT_URL or QDRANT_API_KEY environment variable is not set")
         return
     
-    vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
-    
     # Create a table to track performance
     performance_data = []
     
@@ -253,10 +867,10 @@ def generate_embeddings_for_all_models(
         
         # Generate embeddings
         try:
-            populate_taxonomy_embeddings(
+            populate_versioned_collection(
                 taxonomy_file=taxonomy_file,
                 max_level=max_level,
-                collection_name=collection_name,
+                alias_name=collection_name,
                 embedding_model=model_name
             )
             
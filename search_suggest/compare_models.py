@@ -1,181 +1,404 @@
 """
-Script to compare different embedding models for search quality.
+Evaluation harness comparing embedding models on search quality and cost.
+
+Each model is loaded in-process, the taxonomy is embedded into a local index
+and a labeled query file is run against it. Quality (recall@k, MRR, nDCG@k)
+is reported next to query latency and memory so model choice is a measured
+tradeoff.
 """
-import os
+import json
+import math
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
 from tabulate import tabulate
+
 from search_suggest.embeddings import EmbeddingService, RECOMMENDED_MODELS
-from search_suggest.vector_store import VectorStore
-
-# Test queries that should return relevant categories
-TEST_QUERIES = [
-    "kitchen appliances",
-    "cooking equipment",
-    "refrigerators and freezers",
-    "blenders and mixers",
-    "coffee makers",
-    "climbing gear",
-    "baby toys",
-    "office supplies",
-    "fitness equipment",
-    "electronics",
-    "smartphones",
-    "laptops",
-    "clothing",
-    "shoes",
-    "furniture"
-]
-
-def populate_collection_with_model(model_name, collection_suffix="_test"):
-    """Populate a test collection with the specified model.
-    
+from search_suggest.local_index import LocalIndex
+from search_suggest.memory import model_parameter_bytes, process_memory
+from search_suggest.populate_db import build_local_index
+from search_suggest.reduction import Reducer, fit_reducer
+
+# Dimensions tried by the reduction report
+DEFAULT_REDUCTION_DIMENSIONS = [64, 128, 256, 384]
+
+# Default labeled queries (query -> relevant category IDs)
+DEFAULT_LABELS_FILE = Path(__file__).parent.parent / "data" / "eval_queries.jsonl"
+DEFAULT_TAXONOMY_FILE = Path(__file__).parent.parent / "data" / "taxonomy.txt"
+
+
+def load_labeled_queries(labels_file: Path) -> List[Dict[str, Any]]:
+    """Load a labeled query file.
+
+    Each line is a JSON object with a ``query`` string and a ``relevant``
+    list of category IDs that count as correct answers.
+
+    Args:
+        labels_file: Path to the JSONL file
+
+    Returns:
+        List of labeled queries
+    """
+    labeled = []
+    with open(labels_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            if not item.get("query") or not item.get("relevant"):
+                raise ValueError(f"{labels_file}:{line_number}: expected 'query' and 'relevant' fields")
+            labeled.append({
+                "query": item["query"],
+                "relevant": [str(category_id) for category_id in item["relevant"]]
+            })
+    return labeled
+
+
+def recall_at_k(ranked_ids: Sequence[str], relevant: Set[str], k: int) -> float:
+    """Fraction of the relevant IDs found in the top ``k`` results."""
+    if not relevant:
+        return 0.0
+    return len(relevant.intersection(ranked_ids[:k])) / len(relevant)
+
+
+def reciprocal_rank(ranked_ids: Sequence[str], relevant: Set[str], k: int) -> float:
+    """Inverse rank of the first relevant result in the top ``k`` (0 if none)."""
+    for rank, category_id in enumerate(ranked_ids[:k], start=1):
+        if category_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids: Sequence[str], relevant: Set[str], k: int) -> float:
+    """Normalized discounted cumulative gain with binary relevance."""
+    dcg = sum(
+        1.0 / math.log2(rank + 1)
+        for rank, category_id in enumerate(ranked_ids[:k], start=1)
+        if category_id in relevant
+    )
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def evaluate_index(
+    embedding_service: EmbeddingService,
+    index: LocalIndex,
+    labeled_queries: List[Dict[str, Any]],
+    top_k: int = 5,
+    reducer: Optional[Reducer] = None
+) -> Dict[str, Any]:
+    """Run labeled queries against an index and compute quality and latency.
+
     Args:
-        model_name: Name of the model to use
-        collection_suffix: Suffix to add to the collection name
-    
+        embedding_service: Embedding service used to encode the queries
+        index: Index to search
+        labeled_queries: Queries with their relevant category IDs
+        top_k: Number of top results to score
+        reducer: Optional reducer the index vectors were reduced with
+
     Returns:
-        Collection name
+        Dictionary with aggregate metrics and per-query results
     """
-    import subprocess
-    
-    collection_name = f"merchant_categories_{model_name.replace('/', '_')}{collection_suffix}"
-    
-    # Run the populate command with the specified model
-    cmd = [
-        "uv", "run", "python", "-m", "search_suggest.cli", "populate",
-        "--collection", collection_name,
-        "--embedding-model", model_name
-    ]
-    
-    print(f"Populating collection {collection_name} with model {model_name}...")
-    subprocess.run(cmd, check=True)
-    
-    return collection_name
-
-def evaluate_model(model_name, collection_name, queries=TEST_QUERIES, top_k=5):
-    """Evaluate a model on a set of test queries.
-    
+    per_query = []
+    latencies_ms = []
+
+    for item in labeled_queries:
+        start_time = time.perf_counter()
+        query_embedding = embedding_service.create_embedding(item["query"], reducer=reducer)
+        results = index.search(query_embedding, limit=top_k)
+        latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+        ranked_ids = [result["id"] for result in results]
+        relevant = set(item["relevant"])
+        per_query.append({
+            "query": item["query"],
+            "relevant": item["relevant"],
+            "results": ranked_ids,
+            "recall": recall_at_k(ranked_ids, relevant, top_k),
+            "reciprocal_rank": reciprocal_rank(ranked_ids, relevant, top_k),
+            "ndcg": ndcg_at_k(ranked_ids, relevant, top_k)
+        })
+
+    def mean(key: str) -> float:
+        return float(np.mean([q[key] for q in per_query])) if per_query else 0.0
+
+    return {
+        f"recall@{top_k}": mean("recall"),
+        "mrr": mean("reciprocal_rank"),
+        f"ndcg@{top_k}": mean("ndcg"),
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)) if latencies_ms else 0.0,
+            "p95": float(np.percentile(latencies_ms, 95)) if latencies_ms else 0.0,
+            "mean": float(np.mean(latencies_ms)) if latencies_ms else 0.0
+        },
+        "queries": per_query
+    }
+
+
+def evaluate_model(
+    model_name: str,
+    labeled_queries: List[Dict[str, Any]],
+    taxonomy_file: Path = DEFAULT_TAXONOMY_FILE,
+    max_level: int = 3,
+    top_k: int = 5
+) -> Dict[str, Any]:
+    """Load a model, embed the taxonomy locally and evaluate it.
+
     Args:
         model_name: Name of the model to evaluate
-        collection_name: Name of the collection to search
-        queries: List of test queries
-        top_k: Number of top results to consider
-    
+        labeled_queries: Queries with their relevant category IDs
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories to index
+        top_k: Number of top results to score
+
     Returns:
-        Dictionary with evaluation results
+        Dictionary with quality, latency and memory figures for the model
     """
-    # Load environment variables
-    load_dotenv()
-    
-    # Initialize services
-    qdrant_url = os.getenv("QDRANT_URL")
-    qdrant_api_key = os.getenv("QDRANT_API_KEY")
-    if not qdrant_url or not qdrant_api_key:
-        print("❌ QDRANT_URL or QDRANT_API_KEY environment variable is not set")
-        return None
-    
-    # Initialize embedding service with the specified model
+    rss_before = process_memory()["rss"]
+
+    load_start = time.perf_counter()
     embedding_service = EmbeddingService(model_name=model_name)
-    vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
-    
-    results = []
-    
-    print(f"\nEvaluating model: {model_name}")
-    print(f"Collection: {collection_name}")
-    print(f"Embedding dimension: {embedding_service.embedding_dimension}")
-    
-    for query in queries:
-        print(f"\nQuery: '{query}'")
-        
-        # Create embedding for the query
-        query_embedding = embedding_service.create_embedding(query)
-        
-        # Search for similar categories
-        search_results = vector_store.search(
-            collection_name=collection_name,
-            query_vector=query_embedding,
-            limit=top_k
-        )
-        
-        # Print results
-        print(f"Top {top_k} results:")
-        for i, result in enumerate(search_results):
-            print(f"  {i+1}. {result['payload'].get('full_path', 'N/A')} (Score: {result['score']:.4f})")
-        
-        # Store the results
-        results.append({
-            "query": query,
-            "results": search_results
-        })
-    
-    return results
+    load_time_s = time.perf_counter() - load_start
+
+    build_start = time.perf_counter()
+    index = build_local_index(taxonomy_file, embedding_service, max_level=max_level)
+    build_time_s = time.perf_counter() - build_start
+
+    # Warm up so one-off allocations don't land in the latency figures
+    embedding_service.create_embedding("warm up")
+
+    metrics = evaluate_index(embedding_service, index, labeled_queries, top_k=top_k)
+    metrics.update({
+        "dimension": embedding_service.embedding_dimension,
+        "indexed_categories": len(index),
+        "load_time_s": load_time_s,
+        "index_build_time_s": build_time_s,
+        "memory_bytes": {
+            "model": model_parameter_bytes(embedding_service.model),
+            "index": index.nbytes,
+            "rss_delta": process_memory()["rss"] - rss_before
+        }
+    })
+    return metrics
+
+
+def compare_models(
+    model_names: Optional[List[str]] = None,
+    labels_file: Path = DEFAULT_LABELS_FILE,
+    taxonomy_file: Path = DEFAULT_TAXONOMY_FILE,
+    max_level: int = 3,
+    top_k: int = 5,
+    output_file: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Evaluate several models and produce a machine-readable report.
 
-def compare_models(model_names=None, use_existing_collections=False):
-    """Compare multiple embedding models.
-    
     Args:
-        model_names: List of model names to compare
-        use_existing_collections: Whether to use existing collections or create new ones
+        model_names: Models to evaluate (defaults to all recommended models)
+        labels_file: Labeled query file
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories to index
+        top_k: Number of top results to score
+        output_file: Optional path to write the JSON report to
+
+    Returns:
+        Report dictionary keyed by model name
     """
     if model_names is None:
         model_names = list(RECOMMENDED_MODELS.keys())
-    
-    # Evaluate each model
-    all_results = {}
+
+    labeled_queries = load_labeled_queries(labels_file)
+    report: Dict[str, Any] = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "labels_file": str(labels_file),
+        "taxonomy_file": str(taxonomy_file),
+        "max_level": max_level,
+        "top_k": top_k,
+        "num_queries": len(labeled_queries),
+        "models": {}
+    }
+
     for model_name in model_names:
-        if use_existing_collections:
-            # Use an existing collection with the model name in it
-            collection_name = f"merchant_categories_{model_name.replace('/', '_')}"
-        else:
-            # Create a new collection for this model
-            collection_name = populate_collection_with_model(model_name)
-        
-        # Evaluate the model
-        results = evaluate_model(model_name, collection_name)
-        all_results[model_name] = results
-    
-    # Summarize the results
-    print("\n" + "=" * 80)
-    print("Model Comparison Summary")
-    print("=" * 80)
-    
-    # Create a table with the model information
+        print(f"Evaluating model: {model_name}")
+        try:
+            report["models"][model_name] = evaluate_model(
+                model_name,
+                labeled_queries,
+                taxonomy_file=taxonomy_file,
+                max_level=max_level,
+                top_k=top_k
+            )
+        except Exception as e:
+            print(f"❌ Error evaluating {model_name}: {str(e)}")
+            report["models"][model_name] = {"error": str(e)}
+
+    print_report(report)
+
+    if output_file is not None:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output_file}")
+
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print a summary table of an evaluation report.
+
+    Args:
+        report: Report produced by ``compare_models``
+    """
+    top_k = report["top_k"]
     table_data = []
-    for model_name in model_names:
-        model_info = RECOMMENDED_MODELS.get(model_name, {})
+    for model_name, metrics in report["models"].items():
+        if "error" in metrics:
+            table_data.append([model_name] + ["error"] * 7)
+            continue
         table_data.append([
             model_name,
-            model_info.get("dimension", "Unknown"),
-            model_info.get("speed", "Unknown"),
-            model_info.get("quality", "Unknown")
+            metrics["dimension"],
+            f"{metrics[f'recall@{top_k}']:.3f}",
+            f"{metrics['mrr']:.3f}",
+            f"{metrics[f'ndcg@{top_k}']:.3f}",
+            f"{metrics['latency_ms']['p50']:.1f}",
+            f"{metrics['latency_ms']['p95']:.1f}",
+            f"{metrics['memory_bytes']['model'] / 2**20:.0f}"
         ])
-    
+
     print(tabulate(
         table_data,
-        headers=["Model", "Dimension", "Speed", "Quality"],
+        headers=[
+            "Model", "Dimension", f"Recall@{top_k}", "MRR", f"nDCG@{top_k}",
+            "p50 ms", "p95 ms", "Model MiB"
+        ],
         tablefmt="grid"
     ))
-    
-    return all_results
+
+
+def reduction_report(
+    model_name: str,
+    methods: Sequence[str] = ("pca", "truncate"),
+    dimensions: Sequence[int] = DEFAULT_REDUCTION_DIMENSIONS,
+    labels_file: Path = DEFAULT_LABELS_FILE,
+    taxonomy_file: Path = DEFAULT_TAXONOMY_FILE,
+    max_level: int = 3,
+    top_k: int = 5,
+    output_file: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Measure the recall lost when reducing a model's embeddings.
+
+    The taxonomy is embedded once at full size; each reduction is fitted on
+    those vectors and evaluated against the same labeled queries.
+
+    Args:
+        model_name: Model to evaluate
+        methods: Reduction methods to try
+        dimensions: Reduced dimensions to try (those at or above the full
+            dimension are skipped)
+        labels_file: Labeled query file
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories to index
+        top_k: Number of top results to score
+        output_file: Optional path to write the JSON report to
+
+    Returns:
+        Report dictionary with one entry per reduction
+    """
+    labeled_queries = load_labeled_queries(labels_file)
+    embedding_service = EmbeddingService(model_name=model_name)
+    index = build_local_index(taxonomy_file, embedding_service, max_level=max_level)
+    matryoshka = RECOMMENDED_MODELS.get(model_name, {}).get("matryoshka", False)
+
+    full = evaluate_index(embedding_service, index, labeled_queries, top_k=top_k)
+    full_recall = full[f"recall@{top_k}"]
+    reductions = [{
+        "reduction": "none",
+        "dimension": index.dimension,
+        f"recall@{top_k}": full_recall,
+        "recall_lost": 0.0,
+        "mrr": full["mrr"],
+        "bytes_per_vector": index.dimension * 4
+    }]
+
+    for method in methods:
+        for dimension in sorted(dimensions):
+            if dimension >= index.dimension:
+                continue
+            reducer = fit_reducer(f"{method}:{dimension}", index.vectors, matryoshka=matryoshka)
+            reduced_index = LocalIndex(index.ids, reducer.transform(index.vectors), index.payloads)
+            metrics = evaluate_index(embedding_service, reduced_index, labeled_queries, top_k=top_k, reducer=reducer)
+            reductions.append({
+                "reduction": reducer.vector_name,
+                "dimension": dimension,
+                f"recall@{top_k}": metrics[f"recall@{top_k}"],
+                "recall_lost": full_recall - metrics[f"recall@{top_k}"],
+                "mrr": metrics["mrr"],
+                "bytes_per_vector": dimension * 4
+            })
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "model": model_name,
+        "matryoshka": matryoshka,
+        "top_k": top_k,
+        "num_queries": len(labeled_queries),
+        "reductions": reductions
+    }
+
+    print(tabulate(
+        [
+            [
+                r["reduction"], r["dimension"], f"{r[f'recall@{top_k}']:.3f}",
+                f"{r['recall_lost']:+.3f}", f"{r['mrr']:.3f}", r["bytes_per_vector"]
+            ]
+            for r in reductions
+        ],
+        headers=["Reduction", "Dimension", f"Recall@{top_k}", "Recall lost", "MRR", "Bytes/vector"],
+        tablefmt="grid"
+    ))
+
+    if output_file is not None:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output_file}")
+
+    return report
+
 
 if __name__ == "__main__":
     import argparse
-    
-    parser = argparse.ArgumentParser(description="Compare embedding models")
+
+    parser = argparse.ArgumentParser(description="Evaluate embedding models on labeled queries")
     parser.add_argument(
         "--models",
         nargs="+",
-        default=["all-MiniLM-L6-v2", "BAAI/bge-small-en-v1.5", "intfloat/e5-small-v2", "Alibaba-NLP/gte-small"],
-        help="Models to compare"
+        default=None,
+        help="Models to compare (defaults to all recommended models)"
     )
     parser.add_argument(
-        "--use-existing",
-        action="store_true",
-        help="Use existing collections instead of creating new ones"
+        "--labels-file",
+        default=str(DEFAULT_LABELS_FILE),
+        help="JSONL file of labeled queries"
     )
-    
+    parser.add_argument(
+        "--taxonomy-file",
+        default=str(DEFAULT_TAXONOMY_FILE),
+        help="Path to the taxonomy file"
+    )
+    parser.add_argument("--max-level", type=int, default=3, help="Maximum level of categories to include")
+    parser.add_argument("--top-k", type=int, default=5, help="Number of top results to score")
+    parser.add_argument("--output", default=None, help="Path to write the JSON report to")
+
     args = parser.parse_args()
-    
-    # Compare the models
-    compare_models(args.models, args.use_existing)
+
+    compare_models(
+        args.models,
+        labels_file=Path(args.labels_file),
+        taxonomy_file=Path(args.taxonomy_file),
+        max_level=args.max_level,
+        top_k=args.top_k,
+        output_file=Path(args.output) if args.output else None
+    )
@@ -1,55 +1,69 @@
 """
 Embedding functionality for generating vector representations of text.
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence
 import logging
 import os
+import shutil
 import tempfile
+import threading
+from distutils.util import strtobool
 from pathlib import Path
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from search_suggest.local_index import normalize_rows
+from search_suggest.reduction import Reducer
+
 logger = logging.getLogger(__name__)
 
 # Dictionary of recommended models with their dimensions and characteristics
 RECOMMENDED_MODELS = {
     "all-MiniLM-L6-v2": {
         "dimension": 384,
+        "matryoshka": False,
         "description": "Fast general-purpose model with decent performance",
         "speed": "Very Fast",
         "quality": "Good"
     },
     "BAAI/bge-small-en-v1.5": {
         "dimension": 384,
+        "matryoshka": False,
         "description": "Small BGE model optimized for search with excellent performance",
         "speed": "Fast",
         "quality": "Very Good"
     },
     "BAAI/bge-base-en-v1.5": {
         "dimension": 768,
+        "matryoshka": False,
         "description": "Base BGE model with superior search performance",
         "speed": "Medium",
         "quality": "Excellent"
     },
     "intfloat/e5-small-v2": {
         "dimension": 384,
+        "matryoshka": False,
         "description": "Small E5 model with strong performance on diverse queries",
         "speed": "Fast",
         "quality": "Very Good"
     },
     "sentence-transformers/all-mpnet-base-v2": {
         "dimension": 768,
+        "matryoshka": False,
         "description": "High quality general purpose model",
         "speed": "Medium",
         "quality": "Excellent"
     },
     "sentence-transformers/multi-qa-MiniLM-L6-cos-v1": {
         "dimension": 384,
+        "matryoshka": False,
         "description": "Specialized for question-answering, good for search queries",
         "speed": "Fast",
         "quality": "Very Good for Q&A"
     },
     "sentence-transformers/msmarco-MiniLM-L6-cos-v5": {
         "dimension": 384,
+        "matryoshka": False,
         "description": "Optimized for search queries from Bing",
         "speed": "Fast",
         "quality": "Very Good for Search"
@@ -59,6 +73,9 @@ RECOMMENDED_MODELS = {
 # Default model to use if none is specified
 DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"
 
+# Instruction BGE models expect in front of retrieval texts
+BGE_PREFIX = "Represent this sentence for searching relevant passages: "
+
 # Check if running on Heroku
 IS_HEROKU = os.environ.get("DYNO") is not None
 
@@ -75,6 +92,99 @@ if CACHE_DIR is not None:
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
     logger.info(f"Using model cache directory: {CACHE_DIR}")
 
+# Directory of models saved by `prefetch-models`, one subdirectory per model;
+# models found there are loaded without contacting the Hugging Face hub
+MODEL_DIR = Path(os.environ["MODEL_DIR"]) if os.getenv("MODEL_DIR") else None
+# Load models only from MODEL_DIR, failing instead of downloading a missing one
+MODEL_OFFLINE = bool(strtobool(os.getenv("MODEL_OFFLINE", "false").lower()))
+
+# Weight precisions `prefetch-models` can save
+PREFETCH_DTYPES = ("float32", "float16")
+
+
+def model_path(model_name: str, model_dir: Optional[Path] = None) -> Optional[Path]:
+    """Directory a prefetched model is saved in.
+    
+    Args:
+        model_name: Name of the model
+        model_dir: Directory of prefetched models (defaults to ``MODEL_DIR``)
+        
+    Returns:
+        The model's directory, or None if no model directory is configured
+    """
+    model_dir = model_dir or MODEL_DIR
+    if model_dir is None:
+        return None
+    return Path(model_dir) / model_name.replace("/", "_")
+
+
+def is_prefetched(model_name: str, model_dir: Optional[Path] = None) -> bool:
+    """Whether a model has been saved to the model directory.
+    
+    Args:
+        model_name: Name of the model
+        model_dir: Directory of prefetched models (defaults to ``MODEL_DIR``)
+        
+    Returns:
+        True if the model can be loaded from the directory
+    """
+    path = model_path(model_name, model_dir)
+    # Only complete saves are renamed into place
+    return path is not None and (path / "modules.json").exists()
+
+
+def prefetch_models(
+    model_names: Sequence[str],
+    model_dir: Path,
+    dtype: str = "float32",
+    force: bool = False
+) -> List[Dict[str, Any]]:
+    """Download models and save each as a self-contained directory.
+    
+    The directories hold the weights (as safetensors), tokenizer and
+    pooling configuration, so the API can load them with no network access.
+    ``float16`` halves the size of the weights on disk; they are widened
+    back to float32 when loaded, which changes scores by far less than
+    anything that affects a ranking.
+    
+    Args:
+        model_names: Names of the models to save
+        model_dir: Directory to save them under
+        dtype: Precision of the saved weights, ``float32`` or ``float16``
+        force: Save models again even if already present
+        
+    Returns:
+        One dictionary per model with its ``model``, ``path``, size in
+        ``bytes`` and whether it was ``downloaded`` or already present
+    """
+    if dtype not in PREFETCH_DTYPES:
+        raise ValueError(f"Invalid dtype '{dtype}', expected one of {PREFETCH_DTYPES}")
+    model_dir.mkdir(parents=True, exist_ok=True)
+    
+    saved = []
+    for model_name in model_names:
+        path = model_path(model_name, model_dir)
+        downloaded = force or not is_prefetched(model_name, model_dir)
+        if downloaded:
+            logger.info(f"Prefetching model {model_name} into {path}")
+            model = SentenceTransformer(model_name, cache_folder=str(CACHE_DIR) if CACHE_DIR else None)
+            if dtype == "float16":
+                model.half()
+            # Save next to the target and rename, so an interrupted prefetch
+            # never leaves a partial model that would be loaded
+            staging = path.with_name(f"{path.name}.partial")
+            shutil.rmtree(staging, ignore_errors=True)
+            model.save(str(staging), create_model_card=False)
+            shutil.rmtree(path, ignore_errors=True)
+            staging.rename(path)
+        saved.append({
+            "model": model_name,
+            "path": path,
+            "bytes": sum(f.stat().st_size for f in path.rglob("*") if f.is_file()),
+            "downloaded": downloaded
+        })
+    return saved
+
 class EmbeddingService:
     """Service for generating embeddings from text."""
     
@@ -94,16 +204,30 @@ class EmbeddingService:
         
         # Cache for other models
         self.models = {model_name: self.model}
+        # Guards self.models so concurrent requests load each model only once
+        self._models_lock = threading.Lock()
         
-    def create_embedding(self, text: str, model_name: Optional[str] = None) -> List[float]:
-        """Create an embedding for a single text.
+    def encode(
+        self,
+        texts: Sequence[str],
+        model_name: Optional[str] = None,
+        reducer: Optional[Reducer] = None,
+        batch_size: int = 32
+    ) -> np.ndarray:
+        """Create embeddings as a single float32 matrix.
+        
+        This is the array-first path for bulk work: the matrix returned by the
+        model is normalized in place and handed on without converting each
+        vector to a list of Python floats.
         
         Args:
-            text: Text to embed
+            texts: Texts to embed
             model_name: Optional model name to use instead of the default
+            reducer: Optional reducer mapping the embeddings to a smaller dimension
+            batch_size: Number of texts the model encodes at once
             
         Returns:
-            Embedding vector
+            C-contiguous float32 matrix of unit-length rows, one per text
         """
         # Use specified model or default
         if model_name and model_name != self.model_name:
@@ -114,34 +238,107 @@ class EmbeddingService:
             
         # For BGE models, add a prefix to improve retrieval performance
         if "bge" in model_name.lower():
-            text = f"Represent this sentence for searching relevant passages: {text}"
+            texts = [f"{BGE_PREFIX}{text}" for text in texts]
+            
+        embeddings = model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        if reducer is not None:
+            return reducer.transform(embeddings)
+        return normalize_rows(embeddings, copy=False)
+        
+    def create_embedding(
+        self,
+        text: str,
+        model_name: Optional[str] = None,
+        reducer: Optional[Reducer] = None
+    ) -> List[float]:
+        """Create an embedding for a single text.
+        
+        Args:
+            text: Text to embed
+            model_name: Optional model name to use instead of the default
+            reducer: Optional reducer mapping the embedding to a smaller dimension
             
-        embedding = model.encode(text)
-        return embedding.tolist()
+        Returns:
+            Embedding vector
+        """
+        return self.encode([text], model_name=model_name, reducer=reducer)[0].tolist()
         
-    def create_embeddings_batch(self, texts: List[str], model_name: Optional[str] = None) -> List[List[float]]:
+    def create_embeddings_batch(
+        self,
+        texts: List[str],
+        model_name: Optional[str] = None,
+        reducer: Optional[Reducer] = None
+    ) -> List[List[float]]:
         """Create embeddings for a batch of texts.
         
+        Prefer ``encode`` for bulk work; this converts every vector to a list.
+        
         Args:
             texts: List of texts to embed
             model_name: Optional model name to use instead of the default
+            reducer: Optional reducer mapping the embeddings to a smaller dimension
             
         Returns:
             List of embedding vectors
         """
-        # Use specified model or default
+        return self.encode(texts, model_name=model_name, reducer=reducer).tolist()
+    
+    def get_embedding_dimension(self, model_name: Optional[str] = None) -> int:
+        """Get the embedding dimension of a model.
+        
+        Args:
+            model_name: Optional model name to use instead of the default
+            
+        Returns:
+            Embedding dimension
+        """
         if model_name and model_name != self.model_name:
-            model = self._get_model(model_name)
-        else:
-            model = self.model
-            model_name = self.model_name
+            return self._get_model(model_name).get_sentence_embedding_dimension()
+        return self.embedding_dimension
+    
+    def count_tokens(self, texts: Sequence[str], model_name: Optional[str] = None) -> List[int]:
+        """Count the tokens of each text, without the model's special tokens.
+        
+        Args:
+            texts: Texts to tokenize
+            model_name: Optional model name to use instead of the default
             
-        # For BGE models, add a prefix to improve retrieval performance
-        if "bge" in model_name.lower():
-            texts = [f"Represent this sentence for searching relevant passages: {text}" for text in texts]
+        Returns:
+            Number of tokens in each text
+        """
+        if not texts:
+            return []
+        model = self._get_model(model_name) if model_name and model_name != self.model_name else self.model
+        return [len(ids) for ids in model.tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+    
+    def token_budget(self, model_name: Optional[str] = None) -> int:
+        """Number of tokens a text can have before the model truncates it.
+        
+        This is the model's ``max_seq_length`` less its special tokens and,
+        for BGE models, the instruction prefix ``encode`` adds.
+        
+        Args:
+            model_name: Optional model name to use instead of the default
             
-        embeddings = model.encode(texts)
-        return embeddings.tolist()
+        Returns:
+            Token budget for a single text
+        """
+        model_name = model_name or self.model_name
+        model = self._get_model(model_name) if model_name != self.model_name else self.model
+        budget = model.max_seq_length - len(model.tokenizer("")["input_ids"])
+        if "bge" in model_name.lower():
+            budget -= self.count_tokens([BGE_PREFIX], model_name)[0]
+        return budget
+    
+    def preload(self, model_names: Sequence[str]) -> None:
+        """Load models ahead of the first request that needs them.
+        
+        Args:
+            model_names: Names of the models to load
+        """
+        for model_name in model_names:
+            self._get_model(model_name)
     
     def _get_model(self, model_name: str) -> SentenceTransformer:
         """Get or load a model by name.
@@ -153,19 +350,34 @@ class EmbeddingService:
             SentenceTransformer model
         """
         if model_name not in self.models:
-            logger.info(f"Loading model: {model_name}")
-            self.models[model_name] = self._load_model(model_name)
+            with self._models_lock:
+                if model_name not in self.models:
+                    logger.info(f"Loading model: {model_name}")
+                    self.models[model_name] = self._load_model(model_name)
         return self.models[model_name]
     
     def _load_model(self, model_name: str) -> SentenceTransformer:
         """Load a model with appropriate caching based on environment.
         
+        Prefetched models are loaded from ``MODEL_DIR``. With
+        ``MODEL_OFFLINE`` nothing else is tried, so a missing model fails
+        at once instead of stalling the boot on a download.
+        
         Args:
             model_name: Name of the model to load
             
         Returns:
             SentenceTransformer model
         """
+        if is_prefetched(model_name):
+            path = model_path(model_name)
+            logger.info(f"Loading prefetched model {model_name} from {path}")
+            return SentenceTransformer(str(path), local_files_only=True)
+        if MODEL_OFFLINE:
+            raise ValueError(
+                f"Model {model_name} is not prefetched into MODEL_DIR ({MODEL_DIR}) and MODEL_OFFLINE is set; "
+                f"run `prefetch-models {model_name}` first"
+            )
         if IS_HEROKU:
             logger.info(f"Loading model on Heroku: {model_name}")
             # Use the temp directory cache on Heroku
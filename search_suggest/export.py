@@ -0,0 +1,284 @@
+"""
+Portable collection files for seeding new nodes without re-embedding.
+
+An export holds a collection's IDs, vectors and payloads in one compressed
+``.npz`` file together with a manifest naming the model, the vector
+dimension and the hash of the taxonomy the vectors were built from. Vectors
+are a float32 (or float16) matrix and payloads a single UTF-8 JSON blob. A new
+node imports it straight into Qdrant or a local index, which only costs the
+time to move the bytes rather than hours of model inference.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from search_suggest.local_index import (
+    LOCAL_INDEX_DIR,
+    LocalIndex,
+    current_index_version,
+    prune_index_versions,
+    publish_index
+)
+from search_suggest.populate_db import (
+    COLLECTION_RETENTION,
+    next_collection_version,
+    publish_collection_version
+)
+from search_suggest.reduction import PCAReducer, delete_reducer, load_reducer, save_reducer
+from search_suggest.vector_store import VectorStore, get_vector_store
+
+EXPORT_FORMAT = "search-suggest-collection"
+EXPORT_FORMAT_VERSION = 2
+EXPORT_DTYPES = ("float32", "float16")
+IMPORT_TARGETS = ("qdrant", "local")
+# Points sent to Qdrant per request when importing
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1024"))
+
+
+def taxonomy_sha256(taxonomy_file: Path) -> str:
+    """Hash a taxonomy file, so imports can check they match the data.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+
+    Returns:
+        Hex SHA-256 digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(taxonomy_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_collection(
+    alias_name: str,
+    output_file: Path,
+    embedding_model: str,
+    dtype: str = "float32",
+    taxonomy_file: Optional[Path] = None,
+    vector_store: Optional[VectorStore] = None
+) -> Dict[str, Any]:
+    """Write a collection's points to a portable file.
+
+    float16 halves the file at a precision loss far below what changes a
+    cosine ranking; vectors are widened back to float32 on import.
+
+    Args:
+        alias_name: Collection or alias to export
+        output_file: Destination ``.npz`` file
+        embedding_model: Model the collection was built with
+        dtype: Vector precision in the file, ``float32`` or ``float16``
+        taxonomy_file: Optional taxonomy the collection was built from,
+            hashed into the manifest
+        vector_store: Optional vector store (defaults to the shared one)
+
+    Returns:
+        The file's manifest
+    """
+    if dtype not in EXPORT_DTYPES:
+        raise ValueError(f"Invalid dtype '{dtype}', expected one of {EXPORT_DTYPES}")
+    vector_store = vector_store or get_vector_store()
+    collection_name = vector_store.get_alias_target(alias_name) or alias_name
+    vector_name, dimension = vector_store.get_vector_spec(collection_name)
+    ids, vectors, payloads = vector_store.export_points(collection_name, vector_name)
+
+    manifest = {
+        "format": EXPORT_FORMAT,
+        "format_version": EXPORT_FORMAT_VERSION,
+        "model": embedding_model,
+        "dimension": dimension,
+        "vector_name": vector_name,
+        "dtype": dtype,
+        "count": len(ids),
+        "taxonomy_sha256": taxonomy_sha256(taxonomy_file) if taxonomy_file else None,
+        "source_collection": collection_name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    arrays = {
+        "manifest": np.array(json.dumps(manifest)),
+        "ids": np.array(ids, dtype=str),
+        "vectors": vectors.astype(dtype),
+        # UTF-8 bytes; a numpy unicode array would take four bytes a character
+        "payloads": np.frombuffer(json.dumps(payloads).encode("utf-8"), dtype=np.uint8)
+    }
+    # Queries against a PCA collection need the projection it was built with
+    reducer = load_reducer(collection_name, vector_name, vector_store)
+    if isinstance(reducer, PCAReducer):
+        arrays["reducer_mean"] = reducer.mean
+        arrays["reducer_components"] = reducer.components
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    print(f"Exported {len(ids)} points of {collection_name} to {output_file}")
+    return manifest
+
+
+def read_export_manifest(input_file: Path) -> Dict[str, Any]:
+    """Read the manifest of an exported collection file.
+
+    Args:
+        input_file: File written by ``export_collection``
+
+    Returns:
+        Manifest dictionary
+    """
+    with np.load(input_file, allow_pickle=False) as data:
+        manifest = json.loads(str(data["manifest"]))
+    if manifest.get("format") != EXPORT_FORMAT:
+        raise ValueError(f"{input_file} is not an exported collection")
+    if manifest.get("format_version", 0) > EXPORT_FORMAT_VERSION:
+        raise ValueError(
+            f"{input_file} uses format version {manifest['format_version']}, "
+            f"this version reads up to {EXPORT_FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def load_payloads(array: np.ndarray) -> List[Dict[str, Any]]:
+    """Decode the payloads of an exported collection file.
+
+    Args:
+        array: UTF-8 JSON bytes, or the unicode string of version 1 files
+
+    Returns:
+        Payload of each point
+    """
+    if array.dtype == np.uint8:
+        return json.loads(array.tobytes().decode("utf-8"))
+    return json.loads(str(array))
+
+
+def import_collection(
+    input_file: Path,
+    alias_name: str,
+    target: str = "qdrant",
+    versioned: bool = False,
+    retention: int = COLLECTION_RETENTION,
+    index_dir: Optional[Path] = LOCAL_INDEX_DIR,
+    expected_model: Optional[str] = None,
+    taxonomy_file: Optional[Path] = None,
+    parallel: int = 1,
+    vector_store: Optional[VectorStore] = None
+) -> str:
+    """Load an exported collection file into Qdrant or a local index.
+
+    Into Qdrant the points are bulk-uploaded as a matrix. With ``versioned``
+    they go into the alias's next ``<alias>_v<N>`` version, which is then
+    published like a freshly populated one (along with a local index under
+    ``index_dir``); otherwise they go into a collection named ``alias_name``.
+    The ``local`` target only publishes a local index version.
+
+    Args:
+        input_file: File written by ``export_collection``
+        alias_name: Collection or alias the API searches for the model
+        target: ``qdrant`` or ``local``
+        versioned: Import into a new collection version behind the alias
+        retention: Number of versions to keep, including the live one
+        index_dir: Directory of local indexes (None to skip the local index
+            of a versioned Qdrant import)
+        expected_model: Optional model the file must have been built with
+        taxonomy_file: Optional taxonomy the file must have been built from
+        parallel: Number of processes uploading to Qdrant
+        vector_store: Optional vector store (defaults to the shared one)
+
+    Returns:
+        Name of the collection or index version that was written
+    """
+    if target not in IMPORT_TARGETS:
+        raise ValueError(f"Invalid target '{target}', expected one of {IMPORT_TARGETS}")
+    manifest = read_export_manifest(input_file)
+    if expected_model and manifest["model"] != expected_model:
+        raise ValueError(f"{input_file} was built with {manifest['model']}, not {expected_model}")
+    if taxonomy_file and manifest["taxonomy_sha256"] not in (None, taxonomy_sha256(taxonomy_file)):
+        raise ValueError(f"{input_file} was built from a different taxonomy than {taxonomy_file}")
+
+    with np.load(input_file, allow_pickle=False) as data:
+        ids = data["ids"].tolist()
+        vectors = data["vectors"].astype(np.float32)
+        payloads = load_payloads(data["payloads"])
+        reducer = (
+            PCAReducer(data["reducer_mean"], data["reducer_components"])
+            if "reducer_mean" in data.files else None
+        )
+    if vectors.shape != (manifest["count"], manifest["dimension"]):
+        raise ValueError(
+            f"{input_file} holds vectors of shape {vectors.shape}, "
+            f"the manifest promises ({manifest['count']}, {manifest['dimension']})"
+        )
+    vector_name = manifest["vector_name"]
+    metadata = {
+        "collection": manifest["source_collection"],
+        "model": manifest["model"],
+        "vector_name": vector_name
+    }
+
+    if target == "local":
+        index_root = (index_dir or LOCAL_INDEX_DIR) / alias_name
+        previous = current_index_version(index_root)
+        version = f"{manifest['source_collection']}.import-{time.strftime('%Y%m%d%H%M%S')}"
+        index = LocalIndex(ids, vectors, payloads, metadata=metadata)
+        index.build_neighbors()
+        index.save(index_root / version)
+        if reducer is not None:
+            save_reducer(reducer, manifest["source_collection"], index_path=index_root / version)
+        publish_index(index_root, version)
+        prune_index_versions(index_root, [version] + ([previous] if previous else []))
+        print(f"Imported {len(ids)} points into local index {index_root / version}")
+        return version
+
+    vector_store = vector_store or get_vector_store()
+    collection_name = next_collection_version(vector_store, alias_name) if versioned else alias_name
+    index_root = index_dir / alias_name if versioned and index_dir is not None else None
+    if index_root is not None and (index_root / collection_name).exists():
+        # Left over from an import that died before cleaning up
+        shutil.rmtree(index_root / collection_name)
+    vector_store.create_collection(
+        collection_name,
+        vector_size=manifest["dimension"],
+        vector_name=vector_name
+    )
+    try:
+        vector_store.upsert_array(
+            collection_name,
+            ids,
+            vectors,
+            payloads,
+            vector_name=vector_name,
+            batch_size=IMPORT_BATCH_SIZE,
+            parallel=parallel
+        )
+        count = vector_store.count(collection_name)
+        if count < len(ids):
+            raise ValueError(f"Imported {len(ids)} points but {collection_name} holds {count}")
+        if index_root is not None:
+            index = LocalIndex(ids, vectors, payloads, metadata=dict(metadata, collection=collection_name))
+            index.build_neighbors()
+            index.save(index_root / collection_name)
+        if reducer is not None:
+            save_reducer(
+                reducer,
+                collection_name,
+                vector_store,
+                index_root / collection_name if index_root is not None else None
+            )
+    except Exception:
+        if versioned:
+            # Never leave a partial version behind for the next build to skip over
+            vector_store.delete_collection(collection_name)
+            delete_reducer(collection_name, vector_store)
+            if index_root is not None:
+                shutil.rmtree(index_root / collection_name, ignore_errors=True)
+        raise
+
+    print(f"Imported {len(ids)} points into {collection_name}")
+    if versioned:
+        publish_collection_version(vector_store, alias_name, collection_name, retention, index_root)
+    return collection_name
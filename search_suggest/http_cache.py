@@ -0,0 +1,82 @@
+"""
+HTTP caching of deterministic responses.
+
+Search results only change when the collection version a model searches
+changes, so a response's ETag is a hash of the request and that version.
+Every worker and node derives the same ETag, and browsers and CDNs that
+revalidate with ``If-None-Match`` get a bodiless 304 while the version is
+unchanged.
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+
+from fastapi import Response
+
+# Seconds browsers and CDNs may reuse a response before revalidating it
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+
+
+def make_etag(*parts: Any) -> str:
+    """Derive a strong ETag from the values a response depends on.
+
+    Args:
+        *parts: JSON-serializable values, such as the endpoint, the request
+            parameters and the collection version
+
+    Returns:
+        Quoted entity tag
+    """
+    encoded = json.dumps(parts, separators=(",", ":"), sort_keys=True, default=str)
+    return f'"{hashlib.sha256(encoded.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header names an ETag.
+
+    ``If-None-Match`` uses weak comparison, so ``W/`` prefixes are ignored.
+
+    Args:
+        if_none_match: Header value, if sent
+        etag: Current ETag of the response
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: Optional[str], max_age: int = HTTP_CACHE_MAX_AGE) -> Dict[str, str]:
+    """Build the caching headers of a response.
+
+    Args:
+        etag: ETag of the response, or None if it must not be cached
+        max_age: Seconds the response may be reused before revalidating
+
+    Returns:
+        ``ETag`` and ``Cache-Control`` headers
+    """
+    if etag is None:
+        return {"Cache-Control": "no-store"}
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    }
+
+
+def not_modified(etag: str, max_age: int = HTTP_CACHE_MAX_AGE) -> Response:
+    """Build a 304 telling the client its cached copy is current.
+
+    Args:
+        etag: ETag of the response
+        max_age: Seconds the response may be reused before revalidating
+
+    Returns:
+        Bodiless 304 response
+    """
+    return Response(status_code=304, headers=cache_headers(etag, max_age))
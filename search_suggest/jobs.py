@@ -0,0 +1,257 @@
+"""
+In-process background jobs for long-running work such as populating collections.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of jobs running at the same time
+POPULATE_MAX_CONCURRENT = int(os.environ.get("POPULATE_MAX_CONCURRENT", "1"))
+# Maximum number of jobs waiting for a free worker
+POPULATE_MAX_QUEUED = int(os.environ.get("POPULATE_MAX_QUEUED", "4"))
+# Nice value for job threads so serving requests win the CPU
+POPULATE_NICE = int(os.environ.get("POPULATE_NICE", "10"))
+# Number of finished jobs kept for status queries
+FINISHED_JOBS_RETAINED = 100
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been asked to stop."""
+
+
+class JobLimitExceeded(Exception):
+    """Raised when a job cannot be queued because the queue is full."""
+
+
+class Job:
+    """State of a single background job."""
+
+    def __init__(self, kind: str, details: Dict[str, Any]):
+        """Initialize the job.
+
+        Args:
+            kind: Type of job (e.g. "populate")
+            details: Job parameters reported back to clients
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.details = details
+        self.status = "queued"
+        self.processed = 0
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether the job has stopped running."""
+        return self.status in ("completed", "failed", "cancelled")
+
+    def update_progress(self, processed: int, total: Optional[int] = None) -> None:
+        """Record progress and stop the job if cancellation was requested.
+
+        Intended as the progress callback of the job's work function.
+
+        Args:
+            processed: Number of items processed so far
+            total: Total number of items, if known
+        """
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the job, including throughput and estimated time left.
+
+        Returns:
+            Dictionary of job information
+        """
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        throughput = self.processed / elapsed if elapsed > 0 else None
+
+        eta_seconds = None
+        if self.status == "running" and throughput and self.total is not None:
+            eta_seconds = max(self.total - self.processed, 0) / throughput
+
+        def timestamp(value: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(value, timezone.utc).isoformat() if value else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "details": self.details,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": self.processed / self.total if self.total else None,
+            "throughput": throughput,
+            "eta_seconds": eta_seconds,
+            "error": self.error,
+            "created_at": timestamp(self.created_at),
+            "started_at": timestamp(self.started_at),
+            "finished_at": timestamp(self.finished_at)
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded pool of low-priority worker threads.
+
+    Jobs run in the serving process so they reuse already-loaded models, but
+    at most ``max_concurrent`` run at once and each worker thread lowers its
+    own scheduling priority. On Linux the nice value applies per thread and
+    is inherited by the intra-op threads the worker starts, so inference for
+    live searches keeps priority over index builds.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = POPULATE_MAX_CONCURRENT,
+        max_queued: int = POPULATE_MAX_QUEUED,
+        nice: int = POPULATE_NICE
+    ):
+        """Initialize the job manager.
+
+        Args:
+            max_concurrent: Maximum number of jobs running at once
+            max_queued: Maximum number of jobs waiting to run
+            nice: Nice value applied to worker threads
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.nice = nice
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent,
+            thread_name_prefix="job-worker"
+        )
+
+    def submit(self, kind: str, details: Dict[str, Any], work: Callable[[Job], None]) -> Job:
+        """Queue a job.
+
+        Args:
+            kind: Type of job
+            details: Job parameters reported back to clients
+            work: Function doing the work; it receives the job and should call
+                ``job.update_progress`` regularly
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobLimitExceeded: If too many jobs are already waiting
+        """
+        job = Job(kind, details)
+        with self._lock:
+            waiting = sum(1 for j in self.jobs.values() if j.status == "queued")
+            if waiting >= self.max_queued:
+                raise JobLimitExceeded(f"{waiting} jobs are already queued")
+            self._prune_finished()
+            self.jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            The job, or None if it is unknown
+        """
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """List known jobs, newest first.
+
+        Returns:
+            List of jobs
+        """
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def find_active(self, **details: Any) -> Optional[Job]:
+        """Find an unfinished job whose details match the given values.
+
+        Returns:
+            Matching job, or None
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if not job.is_finished and all(job.details.get(k) == v for k, v in details.items()):
+                    return job
+        return None
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop.
+
+        Queued jobs never start; running jobs stop at their next progress
+        update.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            The job, or None if it is unknown
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and not job.is_finished:
+                job.cancel_event.set()
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.finished_at = time.time()
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], None]) -> None:
+        """Run a job on a worker thread and record its outcome."""
+        with self._lock:
+            if job.cancel_event.is_set():
+                return
+            job.status = "running"
+            job.started_at = time.time()
+
+        self._lower_priority()
+        try:
+            work(job)
+            job.status = "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _lower_priority(self) -> None:
+        """Lower the scheduling priority of the current worker thread."""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError) as e:
+            # Not supported on this platform, or the thread is already nicer
+            logger.debug(f"Could not lower job thread priority: {e}")
+
+    def _prune_finished(self) -> None:
+        """Forget the oldest finished jobs beyond the retention limit."""
+        finished = sorted(
+            (job for job in self.jobs.values() if job.is_finished),
+            key=lambda j: j.finished_at or 0
+        )
+        for job in finished[:max(len(finished) - FINISHED_JOBS_RETAINED, 0)]:
+            del self.jobs[job.id]
@@ -0,0 +1,415 @@
+"""
+Exact in-process vector index backed by NumPy.
+
+Indexes can be saved to disk and memory-mapped read-only, so every worker
+process on a host searches the same page-cache copy of the vectors. The
+on-disk layout for a published index is::
+
+    <LOCAL_INDEX_DIR>/<name>/CURRENT          name of the live version
+    <LOCAL_INDEX_DIR>/<name>/<version>/vectors.npy
+    <LOCAL_INDEX_DIR>/<name>/<version>/meta.json
+    <LOCAL_INDEX_DIR>/<name>/<version>/neighbors.npy        optional kNN graph
+    <LOCAL_INDEX_DIR>/<name>/<version>/neighbor_scores.npy
+    <LOCAL_INDEX_DIR>/<name>/<version>/pca-<N>.npz          PCA projection, if any
+"""
+from pathlib import Path
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Directory holding published local indexes, one folder per collection alias
+LOCAL_INDEX_DIR = Path(os.environ.get(
+    "LOCAL_INDEX_DIR",
+    str(Path(__file__).parent.parent / "data" / "indexes")
+))
+# Seconds between checks for a newly published index version
+LOCAL_INDEX_CHECK_INTERVAL = float(os.environ.get("LOCAL_INDEX_CHECK_INTERVAL", "5"))
+# Neighbors stored per category for /related
+RELATED_K = int(os.environ.get("RELATED_K", "20"))
+# Rows and columns of the similarity matrix computed at once when building
+# the neighbor graph (a block takes NEIGHBOR_BLOCK_SIZE**2 * 4 bytes)
+NEIGHBOR_BLOCK_SIZE = int(os.environ.get("NEIGHBOR_BLOCK_SIZE", "4096"))
+
+
+class LocalIndex:
+    """Exact cosine-similarity index held in process memory.
+
+    Search results use the same shape as ``VectorStore.search`` so the two can
+    be used interchangeably.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None,
+        normalized: bool = False,
+        metadata: Optional[Dict[str, Any]] = None,
+        neighbors: Optional[np.ndarray] = None,
+        neighbor_scores: Optional[np.ndarray] = None
+    ):
+        """Initialize the index.
+
+        Args:
+            ids: Category IDs, one per row of ``vectors``
+            vectors: Matrix of shape (n, dimension)
+            payloads: Optional payload for each vector
+            normalized: Whether the rows already have unit length (as returned
+                by ``EmbeddingService.encode``), in which case the matrix is
+                used as is instead of being copied
+            metadata: Optional description of how the vectors were built
+            neighbors: Optional (n, k) row numbers of each row's nearest
+                other rows, as built by ``build_neighbors``
+            neighbor_scores: Similarity of each entry of ``neighbors``
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError(
+                f"Expected a ({len(ids)}, dimension) matrix, got shape {vectors.shape}"
+            )
+
+        self.ids = list(ids)
+        self.payloads = payloads if payloads is not None else [{} for _ in self.ids]
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.metadata = metadata or {}
+        self.neighbors = neighbors
+        self.neighbor_scores = neighbor_scores
+        # Directory the index was loaded from, if any
+        self.path: Optional[Path] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        """Dimension of the stored vectors."""
+        return self.vectors.shape[1]
+
+    def save(self, path: Path) -> None:
+        """Write the index to a directory.
+
+        Args:
+            path: Directory to create; it must not exist yet
+        """
+        path.mkdir(parents=True)
+        np.save(path / "vectors.npy", np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"metadata": self.metadata, "ids": self.ids, "payloads": self.payloads}, f)
+        if self.neighbors is not None:
+            np.save(path / "neighbors.npy", self.neighbors)
+            np.save(path / "neighbor_scores.npy", self.neighbor_scores)
+
+    @classmethod
+    def load(cls, path: Path) -> "LocalIndex":
+        """Map a saved index read-only.
+
+        The vectors are not read into memory: they stay a memory-mapped view
+        of the file, so processes loading the same index share its pages.
+
+        Args:
+            path: Directory written by ``save``
+
+        Returns:
+            Index backed by the mapped file
+        """
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        neighbors = neighbor_scores = None
+        if (path / "neighbors.npy").exists():
+            neighbors = np.load(path / "neighbors.npy", mmap_mode="r")
+            neighbor_scores = np.load(path / "neighbor_scores.npy", mmap_mode="r")
+        index = cls(
+            meta["ids"],
+            vectors,
+            meta["payloads"],
+            normalized=True,
+            metadata=meta["metadata"],
+            neighbors=neighbors,
+            neighbor_scores=neighbor_scores
+        )
+        index.path = path
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vector matrix."""
+        return self.vectors.nbytes
+
+    @cached_property
+    def rows(self) -> Dict[str, int]:
+        """Row number of each ID."""
+        return {id_: row for row, id_ in enumerate(self.ids)}
+
+    def build_neighbors(self, k: int = RELATED_K, block_size: int = NEIGHBOR_BLOCK_SIZE) -> None:
+        """Precompute each vector's nearest other vectors.
+
+        Args:
+            k: Neighbors kept per vector
+            block_size: Rows and columns of the similarity matrix computed at once
+        """
+        self.neighbors, self.neighbor_scores = nearest_neighbors(self.vectors, k, block_size)
+
+    def related(self, id_: str, limit: int = 10) -> Optional[List[Dict]]:
+        """Look up the precomputed nearest neighbors of an indexed vector.
+
+        Args:
+            id_: ID of the vector
+            limit: Maximum number of results (at most the ``k`` built)
+
+        Returns:
+            List of results shaped like ``search`` results, or None if the
+            index has no neighbor graph or no vector with that ID
+        """
+        row = self.rows.get(id_)
+        if self.neighbors is None or row is None:
+            return None
+        return [
+            {
+                "id": self.ids[neighbor],
+                "score": float(score),
+                "payload": self.payloads[neighbor]
+            }
+            for neighbor, score in zip(self.neighbors[row, :limit], self.neighbor_scores[row, :limit])
+            if neighbor >= 0
+        ]
+
+    def search(self, query_vector: Sequence[float], limit: int = 10, with_vectors: bool = False) -> List[Dict]:
+        """Search for the vectors most similar to a query.
+
+        Args:
+            query_vector: Query embedding vector
+            limit: Maximum number of results to return
+            with_vectors: Also return each result's stored ``vector``
+
+        Returns:
+            List of search results
+        """
+        return self.search_batch(np.asarray(query_vector, dtype=np.float32)[None, :], limit, with_vectors)[0]
+
+    def search_batch(self, query_vectors: np.ndarray, limit: int = 10, with_vectors: bool = False) -> List[List[Dict]]:
+        """Search for several queries with one matrix multiply.
+
+        Args:
+            query_vectors: Matrix of shape (queries, dimension)
+            limit: Maximum number of results to return per query
+            with_vectors: Also return each result's stored ``vector``
+
+        Returns:
+            List of search results for each query
+        """
+        if len(self) == 0:
+            return [[] for _ in range(len(query_vectors))]
+
+        queries = normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        scores = queries @ self.vectors.T
+        limit = min(limit, len(self))
+
+        # argpartition finds the top-k in linear time; only those get sorted
+        top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = [
+            [
+                {
+                    "id": self.ids[row],
+                    "score": float(score),
+                    "payload": self.payloads[row]
+                }
+                for row, score in zip(rows, row_scores)
+            ]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+        if with_vectors:
+            for rows, row_results in zip(top, results):
+                for row, result in zip(rows, row_results):
+                    result["vector"] = self.vectors[row]
+        return results
+
+
+def nearest_neighbors(
+    vectors: np.ndarray,
+    k: int = RELATED_K,
+    block_size: int = NEIGHBOR_BLOCK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find every row's k most similar other rows of a normalized matrix.
+
+    The all-pairs similarity matrix is never materialized: it is computed in
+    ``block_size`` x ``block_size`` tiles, and each row block keeps a running
+    top-k that every column tile is merged into, so memory stays bounded
+    whatever the number of rows.
+
+    Args:
+        vectors: Unit-length rows of shape (n, dimension)
+        k: Neighbors kept per row
+        block_size: Rows and columns of each tile
+
+    Returns:
+        Tuple of (int32 neighbor rows, float16 similarities), both of shape
+        (n, k) with the most similar first; rows with fewer than k others
+        are padded with -1
+    """
+    n = vectors.shape[0]
+    k = max(min(k, n - 1), 0)
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float16)
+    if k == 0:
+        return neighbors, scores
+
+    for start in range(0, n, block_size):
+        block = np.asarray(vectors[start:start+block_size], dtype=np.float32)
+        rows = np.arange(start, start + len(block))
+        best = np.full((len(block), k), -1, dtype=np.int64)
+        best_scores = np.full((len(block), k), -np.inf, dtype=np.float32)
+        for column_start in range(0, n, block_size):
+            tile = block @ np.asarray(vectors[column_start:column_start+block_size], dtype=np.float32).T
+            # A category is not related to itself
+            diagonal = (rows >= column_start) & (rows < column_start + tile.shape[1])
+            tile[diagonal, rows[diagonal] - column_start] = -np.inf
+
+            # Top k of the tile, merged with the top k of earlier tiles
+            tile_k = min(k, tile.shape[1])
+            tile_top = np.argpartition(-tile, tile_k - 1, axis=1)[:, :tile_k]
+            candidates = np.concatenate([best, tile_top + column_start], axis=1)
+            candidate_scores = np.concatenate([best_scores, np.take_along_axis(tile, tile_top, axis=1)], axis=1)
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            best = np.take_along_axis(candidates, top, axis=1)
+            best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        neighbors[start:start+len(block)] = np.take_along_axis(best, order, axis=1)
+        scores[start:start+len(block)] = np.take_along_axis(best_scores, order, axis=1)
+    return neighbors, scores
+
+
+def normalize_rows(vectors: np.ndarray, copy: bool = True) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities.
+
+    Args:
+        vectors: Float matrix of shape (n, dimension)
+        copy: Return a new matrix; with False the rows are scaled in place
+
+    Returns:
+        Normalized matrix
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    if not copy:
+        vectors /= norms
+        return vectors
+    return vectors / norms
+
+
+def publish_index(root: Path, version: str) -> None:
+    """Make a saved version the live one by atomically rewriting CURRENT.
+
+    Args:
+        root: Directory holding the index versions
+        version: Name of the version directory to publish
+    """
+    if not (root / version / "vectors.npy").exists():
+        raise ValueError(f"No saved index version {version} in {root}")
+    tmp = root / f"CURRENT.{os.getpid()}.tmp"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, root / "CURRENT")
+
+
+def current_index_version(root: Path) -> Optional[str]:
+    """Read the live version of an index, or None if none is published."""
+    try:
+        return (root / "CURRENT").read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def prune_index_versions(root: Path, keep: Sequence[str]) -> None:
+    """Delete saved versions other than the given ones.
+
+    Workers still mapping a deleted version keep reading it until they remap;
+    the file's pages are freed once the last mapping goes away.
+
+    Args:
+        root: Directory holding the index versions
+        keep: Version names to keep
+    """
+    for path in root.iterdir():
+        if path.is_dir() and path.name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class IndexRegistry:
+    """Per-process view of the published local indexes.
+
+    Each index is mapped on first use and remapped when a new version is
+    published, checked at most every ``check_interval`` seconds, so running
+    workers pick up new versions without a restart.
+    """
+
+    def __init__(self, root: Path = LOCAL_INDEX_DIR, check_interval: float = LOCAL_INDEX_CHECK_INTERVAL):
+        """Initialize the registry.
+
+        Args:
+            root: Directory holding one folder per index name
+            check_interval: Seconds between checks for a new version
+        """
+        self.root = root
+        self.check_interval = check_interval
+        # name -> (version, index, time of last check)
+        self._indexes: Dict[str, Tuple[Optional[str], Optional[LocalIndex], float]] = {}
+        self._lock = threading.Lock()
+
+    def loaded(self) -> List[Tuple[str, str, LocalIndex]]:
+        """List the indexes this process has mapped.
+
+        Returns:
+            Tuples of (index name, version, index)
+        """
+        with self._lock:
+            return [
+                (name, version, index)
+                for name, (version, index, _) in self._indexes.items()
+                if index is not None
+            ]
+
+    def get(self, name: str) -> Optional[LocalIndex]:
+        """Get the live version of an index.
+
+        Args:
+            name: Index name (the collection alias it mirrors)
+
+        Returns:
+            Index, or None if none has been published
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._indexes.get(name)
+            if entry is not None and now - entry[2] < self.check_interval:
+                return entry[1]
+
+            version = current_index_version(self.root / name)
+            if entry is not None and entry[0] == version:
+                self._indexes[name] = (version, entry[1], now)
+                return entry[1]
+
+            index = None
+            if version is not None:
+                try:
+                    index = LocalIndex.load(self.root / name / version)
+                    logger.info(f"Mapped local index {name} version {version}")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Could not load local index {name} version {version}: {e}")
+                    index = entry[1] if entry is not None else None
+            self._indexes[name] = (version, index, now)
+            return index
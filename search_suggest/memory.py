@@ -0,0 +1,206 @@
+"""
+Memory accounting helpers for processes and loaded models.
+"""
+from collections import deque
+from typing import Any, Dict, Optional
+import os
+import re
+import resource
+import sys
+import types
+
+import numpy as np
+from tabulate import tabulate
+
+# Objects deep_sizeof counts but does not look inside
+OPAQUE_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType
+)
+
+SMAPS_HEADER = re.compile(r"^[0-9a-f]+-[0-9a-f]+\s")
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Report the memory footprint of a process in bytes.
+
+    On Linux this reads ``/proc/<pid>/smaps_rollup`` which gives the resident
+    set size (RSS), the proportional set size (PSS) and the unique set size
+    (USS, memory no other process shares). Elsewhere only the peak RSS of the
+    current process is available.
+
+    Args:
+        pid: Process ID to inspect (defaults to the current process)
+
+    Returns:
+        Dictionary with ``rss``, ``pss`` and ``uss`` keys (bytes)
+    """
+    pid = pid or os.getpid()
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        # No procfs (macOS, Windows): fall back to the peak RSS of this process
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        rss = peak if os.uname().sysname == "Darwin" else peak * 1024
+        return {"rss": rss, "pss": rss, "uss": rss}
+
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def model_parameter_bytes(model: Any) -> int:
+    """Count the bytes held by a torch model's parameters and buffers.
+
+    Args:
+        model: A ``torch.nn.Module`` such as a ``SentenceTransformer``
+
+    Returns:
+        Total size of parameters and buffers in bytes
+    """
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total
+
+
+def tokenizer_bytes(tokenizer: Any) -> int:
+    """Estimate the memory held by a Hugging Face tokenizer.
+
+    A fast tokenizer keeps its vocabulary and merges in Rust, out of reach
+    of ``sys.getsizeof``; the size of its serialized form is used instead.
+
+    Args:
+        tokenizer: Tokenizer of a ``SentenceTransformer``
+
+    Returns:
+        Estimated size in bytes
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        return len(backend.to_str().encode())
+    return deep_sizeof(tokenizer.get_vocab())
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Estimate the bytes held by an object and everything it references.
+
+    Containers and instance attributes are followed; functions, classes
+    and modules are not. A numpy array counts its data only if it owns it,
+    so memory-mapped arrays, whose data is in the page cache, count just
+    their header.
+
+    Args:
+        obj: Object to measure
+
+    Returns:
+        Estimated size in bytes
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, (OPAQUE_TYPES, np.ndarray, str, bytes)):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.append(vars(item))
+    return total
+
+
+def mapped_files(pid: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Report the files mapped into a process and how much of each is resident.
+
+    Args:
+        pid: Process ID to inspect (defaults to the current process)
+
+    Returns:
+        Dictionary from file path to its mapped ``size`` and resident
+        ``rss`` in bytes; empty where ``/proc/<pid>/smaps`` is unavailable
+    """
+    pid = pid or os.getpid()
+    mappings: Dict[str, Dict[str, int]] = {}
+    path = None
+    try:
+        with open(f"/proc/{pid}/smaps", "r", encoding="utf-8") as f:
+            for line in f:
+                if SMAPS_HEADER.match(line):
+                    parts = line.split(maxsplit=5)
+                    path = parts[5].strip() if len(parts) == 6 and parts[5].startswith("/") else None
+                    if path is not None:
+                        mappings.setdefault(path, {"size": 0, "rss": 0})
+                elif path is not None and line.startswith(("Size:", "Rss:")):
+                    key, value = line.split()[:2]
+                    mappings[path][key.rstrip(":").lower()] += int(value) * 1024
+    except OSError:
+        return {}
+    return mappings
+
+
+def print_memory_report(report: Dict[str, Any]) -> None:
+    """Print a memory report as tables.
+
+    Args:
+        report: Report built by the API's ``memory_report``
+    """
+    def mib(n: Optional[int]) -> str:
+        return f"{n / 2**20:.1f}" if n is not None else "-"
+
+    process = report["process"]
+    print(f"Process {report['pid']}: RSS {mib(process['rss'])} MiB, "
+          f"PSS {mib(process['pss'])} MiB, USS {mib(process['uss'])} MiB")
+    if report["models"]:
+        print(tabulate(
+            [[m["model"], m["dtype"], mib(m["parameter_bytes"]), mib(m["tokenizer_bytes"])] for m in report["models"]],
+            headers=["Model", "Dtype", "Parameters (MiB)", "Tokenizer (MiB)"],
+            tablefmt="grid"
+        ))
+    if report["local_indexes"]:
+        print(tabulate(
+            [
+                [
+                    index["name"],
+                    index["version"],
+                    index["count"],
+                    mib(index["vector_bytes"]),
+                    mib(index["neighbor_bytes"]),
+                    mib(index["resident_bytes"]),
+                    mib(index["payload_bytes"])
+                ]
+                for index in report["local_indexes"]
+            ],
+            headers=["Index", "Version", "Rows", "Vectors (MiB)", "Neighbors (MiB)", "Resident (MiB)", "Payloads (MiB)"],
+            tablefmt="grid"
+        ))
+    print(tabulate(
+        [
+            [name, structure.get("entries"), structure.get("maxsize", "-"), mib(structure.get("bytes"))]
+            for section in ("taxonomy", "caches")
+            for name, structure in report[section].items()
+        ],
+        headers=["Structure", "Entries", "Limit", "Size (MiB)"],
+        tablefmt="grid"
+    ))
+    print(f"Accounted for: {mib(report['accounted_bytes'])} MiB of {mib(process['rss'])} MiB RSS "
+          "(the rest is the interpreter, libraries, allocator slack and client buffers)")
@@ -1,30 +1,135 @@
 """
 Script to populate the Qdrant database with taxonomy embeddings.
 """
+import functools
+import itertools
 import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple, TypeVar
 
+import numpy as np
 from dotenv import load_dotenv
 
-from search_suggest.taxonomy import TaxonomyParser
-from search_suggest.embeddings import EmbeddingService
-from search_suggest.vector_store import VectorStore
+from search_suggest.taxonomy import (
+    TaxonomyParser,
+    check_streaming_order,
+    iter_rich_categories,
+    sort_taxonomy_file
+)
+from search_suggest.embeddings import EmbeddingService, RECOMMENDED_MODELS
+from search_suggest.local_index import (
+    LOCAL_INDEX_DIR,
+    LocalIndex,
+    current_index_version,
+    prune_index_versions,
+    publish_index
+)
+from search_suggest.reduction import Reducer, delete_reducer, fit_reducer, load_reducer, save_reducer
+from search_suggest.vector_store import VectorStore, get_vector_store
+
+# Number of collection versions kept per alias, including the live one
+COLLECTION_RETENTION = int(os.getenv("COLLECTION_RETENTION", "2"))
+# Sample queries run against a new version before it goes live
+VERIFY_SAMPLE_SIZE = 20
+VERIFY_MIN_HIT_RATE = 0.8
+# Categories embedded to fit PCA when streaming a taxonomy
+STREAM_FIT_SAMPLE = int(os.getenv("STREAM_FIT_SAMPLE", "20000"))
+# Categories sorted by token length together, so model batches hold texts of similar length
+POPULATE_SORT_WINDOW = int(os.getenv("POPULATE_SORT_WINDOW", "1024"))
+
+T = TypeVar("T")
+
+
+def build_category_payload(parser: TaxonomyParser, category_id: str) -> Dict[str, Any]:
+    """Build the payload stored alongside a category vector.
+
+    Args:
+        parser: Parsed taxonomy
+        category_id: ID of the category
+
+    Returns:
+        Payload dictionary
+    """
+    category = parser.categories[category_id]
+    return {
+        "id": category_id,
+        "name": category["name"],
+        "full_path": category["full_path"],
+        "level": category["level"],
+        "path_parts": category["path_parts"]
+    }
+
+
+@contextmanager
+def streamable_taxonomy(taxonomy_file: Path, max_level: int = 3) -> Iterator[Tuple[Path, int]]:
+    """Provide a taxonomy file in the order ``iter_rich_categories`` needs.
+
+    Files already in hierarchical order are used as they are; others are
+    sorted into a temporary file with an external merge sort.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories included
+
+    Yields:
+        Tuple of (streamable taxonomy file, number of categories it yields)
+    """
+    total = check_streaming_order(taxonomy_file, max_level)
+    if total is not None:
+        yield taxonomy_file, total
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sorted_file = Path(tmp_dir) / "taxonomy.txt"
+        print(f"Sorting {taxonomy_file} into hierarchical order")
+        sort_taxonomy_file(taxonomy_file, sorted_file)
+        total = check_streaming_order(sorted_file, max_level)
+        if total is None:
+            # Sorted by path, only a category whose parent is missing can be out of place
+            raise ValueError(f"{taxonomy_file} has categories whose parent category is missing")
+        yield sorted_file, total
 
 
 def populate_taxonomy_embeddings(
     taxonomy_file: Path,
     max_level: int = 3,
     collection_name: str = "merchant_categories",
-    embedding_model: str = "all-MiniLM-L6-v2"
-) -> None:
+    embedding_model: str = "all-MiniLM-L6-v2",
+    embedding_service: Optional[EmbeddingService] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    reduction: Optional[str] = None,
+    index_path: Optional[Path] = None,
+    stream: bool = False
+) -> int:
     """Populate the Qdrant database with taxonomy embeddings.
 
+    With ``stream`` the taxonomy is never loaded whole: categories are read,
+    embedded and written one chunk at a time, so peak memory does not grow
+    with the taxonomy. PCA is then fitted on an evenly spaced sample of
+    ``STREAM_FIT_SAMPLE`` categories instead of all of them.
+
     Args:
         taxonomy_file: Path to the taxonomy file
         max_level: Maximum level of categories to include
         collection_name: Name of the Qdrant collection
         embedding_model: Name of the sentence-transformers model to use
+        embedding_service: Optional already-loaded embedding service to reuse
+        progress_callback: Optional function called with (processed, total)
+            after every batch; raising from it aborts the populate
+        reduction: Optional reduction spec such as "pca:128" or "truncate:256";
+            the reduced vectors are stored under a vector of the same name
+        index_path: Optional directory to also save the vectors to as a
+            local index, mapped by API workers when SEARCH_BACKEND=local
+            (not supported with ``stream``)
+        stream: Read the taxonomy incrementally, for taxonomies too large to
+            hold in memory
+
+    Returns:
+        Number of categories written
     """
     # Load environment variables
     load_dotenv()
@@ -34,63 +139,566 @@ def populate_taxonomy_embeddings(
     qdrant_api_key = os.getenv("QDRANT_API_KEY")
     if not qdrant_url or not qdrant_api_key:
         raise ValueError("QDRANT_URL or QDRANT_API_KEY environment variable is not set")
+    if stream and index_path is not None:
+        raise ValueError("A local index cannot be built while streaming the taxonomy")
+    
+    # Initialize embedding service with local model unless one was provided
+    if embedding_service is None:
+        embedding_service = EmbeddingService(model_name=embedding_model)
+    vector_store = get_vector_store()
     
-    # Initialize embedding service with local model
-    embedding_service = EmbeddingService(model_name=embedding_model)
-    vector_store = VectorStore(url=qdrant_url, api_key=qdrant_api_key)
+    # Rich texts are built to fit what the model reads, nearest subcategories first
+    token_budget = embedding_service.token_budget(embedding_model)
+    count_tokens = functools.partial(embedding_service.count_tokens, model_name=embedding_model)
+    
+    if stream:
+        with streamable_taxonomy(taxonomy_file, max_level) as (stream_file, total):
+            return write_category_embeddings(
+                lambda: iter_rich_categories(stream_file, max_level, token_budget=token_budget, count_tokens=count_tokens),
+                total,
+                collection_name,
+                embedding_model,
+                embedding_service,
+                vector_store,
+                progress_callback,
+                reduction
+            )
     
     # Parse taxonomy
     parser = TaxonomyParser(taxonomy_file)
-    rich_categories = parser.get_rich_categories_for_embedding(max_level)
-    
+    rich_categories = parser.get_rich_categories_for_embedding(max_level, token_budget, count_tokens)
+    return write_category_embeddings(
+        lambda: ((id_, text, build_category_payload(parser, id_)) for id_, text in rich_categories),
+        len(rich_categories),
+        collection_name,
+        embedding_model,
+        embedding_service,
+        vector_store,
+        progress_callback,
+        reduction,
+        index_path,
+        fit_on_all=True
+    )
+
+
+def write_category_embeddings(
+    records: Callable[[], Iterable[Tuple[str, str, Dict[str, Any]]]],
+    total: int,
+    collection_name: str,
+    embedding_model: str,
+    embedding_service: EmbeddingService,
+    vector_store: VectorStore,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    reduction: Optional[str] = None,
+    index_path: Optional[Path] = None,
+    fit_on_all: bool = False,
+    batch_size: int = 32
+) -> int:
+    """Embed categories chunk by chunk and write them to a new collection.
+
+    Args:
+        records: Function returning a fresh iterable of (category_id,
+            rich_text, payload); called twice when a reducer is fitted on
+            a sample
+        total: Number of records
+        collection_name: Name of the Qdrant collection
+        embedding_model: Name of the sentence-transformers model to use
+        embedding_service: Embedding service
+        vector_store: Vector store
+        progress_callback: Optional function called with (processed, total)
+        reduction: Optional reduction spec such as "pca:128"
+        index_path: Optional directory to also save the vectors to as a local index
+        fit_on_all: Fit the reducer on every embedding, keeping them all in
+            memory, rather than on a sample of ``STREAM_FIT_SAMPLE``
+        batch_size: Number of texts the model encodes at once
+
+    Returns:
+        Number of categories written
+    """
     # Get vector dimension from the model
-    vector_dimension = embedding_service.model.get_sentence_embedding_dimension()
+    vector_dimension = embedding_service.get_embedding_dimension(embedding_model)
+    
+    reducer = None
+    reduced_embeddings = None
+    if reduction:
+        # Every embedding is kept when fitting on all of them; otherwise only
+        # an evenly spaced sample is embedded for fitting
+        step = 1 if fit_on_all else max(total // STREAM_FIT_SAMPLE, 1)
+        sample_size = (total + step - 1) // step
+        print(f"Embedding {sample_size} categories to fit reduction {reduction}")
+        fit_matrix = np.empty((sample_size, vector_dimension), dtype=np.float32)
+        filled = 0
+        for window in iter_batches(itertools.islice(records(), 0, None, step), POPULATE_SORT_WINDOW):
+            texts = [item[1] for item in window]
+            fit_matrix[filled:filled+len(texts)] = encode_length_sorted(
+                embedding_service,
+                texts,
+                embedding_model,
+                batch_size=batch_size
+            )
+            filled += len(texts)
+            if progress_callback is not None:
+                progress_callback(0, total)
+        fit_matrix = fit_matrix[:filled]
+        
+        matryoshka = RECOMMENDED_MODELS.get(embedding_model, {}).get("matryoshka", False)
+        reducer = fit_reducer(reduction, fit_matrix, matryoshka=matryoshka)
+        if fit_on_all:
+            reduced_embeddings = reducer.transform(fit_matrix)
+        del fit_matrix
+        vector_dimension = reducer.dimension
     
     # Create collection with the correct vector size
     vector_store.create_collection(
         collection_name=collection_name,
-        vector_size=vector_dimension
+        vector_size=vector_dimension,
+        vector_name=reducer.vector_name if reducer else None
     )
     
-    # Process in batches
-    batch_size = 32
-    total_batches = (len(rich_categories) + batch_size - 1) // batch_size
+    total_windows = (total + POPULATE_SORT_WINDOW - 1) // POPULATE_SORT_WINDOW
     
-    print(f"Processing {len(rich_categories)} categories in {total_batches} batches")
+    print(f"Processing {total} categories in {total_windows} windows of up to {POPULATE_SORT_WINDOW}")
     print(f"Using enriched category text with subcategories included")
     print(f"Using local embedding model: {embedding_model} (dimension: {vector_dimension})")
     
-    for i in range(0, len(rich_categories), batch_size):
-        batch = rich_categories[i:i+batch_size]
-        ids = [item[0] for item in batch]
-        texts = [item[1] for item in batch]
-        
-        print(f"Processing batch {i//batch_size + 1}/{total_batches}")
+    if progress_callback is not None:
+        progress_callback(0, total)
+    
+    # Every stored vector is also kept for the local index, if one is wanted
+    index_vectors = None
+    index_ids: List[str] = []
+    index_payloads: List[Dict[str, Any]] = []
+    if index_path is not None:
+        index_vectors = np.empty((total, vector_dimension), dtype=np.float32)
+    
+    written = 0
+    for window_number, window in enumerate(iter_batches(records(), POPULATE_SORT_WINDOW), 1):
+        ids = [item[0] for item in window]
+        texts = [item[1] for item in window]
+        payloads = [item[2] for item in window]
         
-        # Create embeddings
-        embeddings = embedding_service.create_embeddings_batch(texts)
+        print(f"Processing window {window_number}/{total_windows}")
         
-        # Prepare payloads
-        payloads = []
-        for id_, text in batch:
-            category = parser.categories[id_]
-            payloads.append({
-                "id": id_,
-                "name": category["name"],
-                "full_path": category["full_path"],
-                "level": category["level"],
-                "path_parts": category["path_parts"]
-            })
+        # Create embeddings, kept as a float32 matrix all the way to Qdrant
+        if reduced_embeddings is not None:
+            embeddings = reduced_embeddings[written:written+len(window)]
+        else:
+            embeddings = encode_length_sorted(
+                embedding_service,
+                texts,
+                embedding_model,
+                reducer=reducer,
+                batch_size=batch_size
+            )
         
         # Upsert to Qdrant
-        vector_store.upsert_vectors(
+        vector_store.upsert_array(
             collection_name=collection_name,
             ids=ids,
             vectors=embeddings,
-            payloads=payloads
+            payloads=payloads,
+            vector_name=reducer.vector_name if reducer else None
         )
         
-    print(f"Successfully populated {len(rich_categories)} categories into Qdrant")
+        if index_vectors is not None:
+            index_vectors[written:written+len(window)] = embeddings
+            index_ids.extend(ids)
+            index_payloads.extend(payloads)
+        
+        written += len(window)
+        if progress_callback is not None:
+            progress_callback(written, total)
+        
+    print(f"Successfully populated {written} categories into Qdrant")
+    
+    if index_vectors is not None:
+        index = LocalIndex(
+            index_ids,
+            index_vectors[:written],
+            index_payloads,
+            normalized=True,
+            metadata={
+                "collection": collection_name,
+                "model": embedding_model,
+                "vector_name": reducer.vector_name if reducer else None
+            }
+        )
+        index.build_neighbors()
+        index.save(index_path)
+        print(f"Saved local index and related categories to {index_path}")
+
+    if reducer is not None:
+        # Stored next to the collection, so every process searching it finds it
+        save_reducer(reducer, collection_name, vector_store, index_path)
+
+    return written
+
+
+def encode_length_sorted(
+    embedding_service: EmbeddingService,
+    texts: List[str],
+    embedding_model: Optional[str],
+    reducer: Optional[Reducer] = None,
+    batch_size: int = 32
+) -> np.ndarray:
+    """Encode texts in order of length, returning rows in input order.
+
+    Each model batch is padded to its longest text, so batching texts of
+    similar length avoids spending most of the compute on padding. Texts are
+    sorted by character count, a close proxy for token count that spares
+    tokenizing every text twice; ``encode`` tokenizes them anyway.
+
+    Args:
+        embedding_service: Embedding service
+        texts: Texts to encode
+        embedding_model: Model to encode with (None for the service's default)
+        reducer: Optional reducer applied to the embeddings
+        batch_size: Number of texts the model encodes at once
+
+    Returns:
+        Embedding matrix with one row per text, in the order given
+    """
+    order = np.argsort([len(text) for text in texts], kind="stable")
+    encoded = embedding_service.encode(
+        [texts[i] for i in order],
+        model_name=embedding_model,
+        reducer=reducer,
+        batch_size=batch_size
+    )
+    embeddings = np.empty_like(encoded)
+    embeddings[order] = encoded
+    return embeddings
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of up to ``batch_size`` items.
+
+    Args:
+        items: Items to group
+        batch_size: Maximum number of items per list
+
+    Yields:
+        Lists of consecutive items
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def populate_versioned_collection(
+    taxonomy_file: Path,
+    max_level: int = 3,
+    alias_name: str = "merchant_categories",
+    embedding_model: str = "all-MiniLM-L6-v2",
+    embedding_service: Optional[EmbeddingService] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    retention: int = COLLECTION_RETENTION,
+    reduction: Optional[str] = None,
+    index_dir: Optional[Path] = LOCAL_INDEX_DIR,
+    stream: bool = False
+) -> str:
+    """Build a new collection version and atomically switch an alias to it.
+
+    The taxonomy is written to ``<alias>_v<N>``, a fresh collection nobody
+    searches yet. Once the point count and a sample of self-retrieval queries
+    check out, the alias is repointed in one operation, so searches never see
+    a half-populated collection. Versions beyond ``retention`` are deleted.
+
+    The same vectors are saved as a local index version under
+    ``<index_dir>/<alias>`` and published right after the alias swap, so
+    workers searching locally move to the new version too.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories to include
+        alias_name: Alias that searches use
+        embedding_model: Name of the sentence-transformers model to use
+        embedding_service: Optional already-loaded embedding service to reuse
+        progress_callback: Optional function called with (processed, total)
+        retention: Number of versions to keep, including the live one
+        reduction: Optional reduction spec such as "pca:128"
+        index_dir: Directory of local indexes (None to skip the local index)
+        stream: Read the taxonomy incrementally (see
+            ``populate_taxonomy_embeddings``); no local index is built
+
+    Returns:
+        Name of the collection the alias now points to
+    """
+    if embedding_service is None:
+        embedding_service = EmbeddingService(model_name=embedding_model)
+    vector_store = get_vector_store()
+    if stream and index_dir is not None:
+        print("Skipping the local index: streamed taxonomies are too large to search in-process")
+        index_dir = None
+
+    collection_name = next_collection_version(vector_store, alias_name)
+    index_root = index_dir / alias_name if index_dir is not None else None
+    index_path = index_root / collection_name if index_root is not None else None
+    if index_path is not None and index_path.exists():
+        # Left over from a build that died before cleaning up
+        shutil.rmtree(index_path)
+
+    try:
+        with ExitStack() as stack:
+            if stream:
+                # Sort once, if needed, for both the populate and the verification
+                taxonomy_file, _ = stack.enter_context(streamable_taxonomy(taxonomy_file, max_level))
+            expected = populate_taxonomy_embeddings(
+                taxonomy_file=taxonomy_file,
+                max_level=max_level,
+                collection_name=collection_name,
+                embedding_model=embedding_model,
+                embedding_service=embedding_service,
+                progress_callback=progress_callback,
+                reduction=reduction,
+                index_path=index_path,
+                stream=stream
+            )
+            verify_collection(
+                vector_store,
+                embedding_service,
+                embedding_model,
+                collection_name,
+                taxonomy_file,
+                max_level,
+                expected,
+                stream=stream
+            )
+    except Exception:
+        # Never leave a partial version behind for the next build to skip over
+        vector_store.delete_collection(collection_name)
+        delete_reducer(collection_name, vector_store)
+        if index_path is not None:
+            shutil.rmtree(index_path, ignore_errors=True)
+        raise
+
+    publish_collection_version(vector_store, alias_name, collection_name, retention, index_root)
+    return collection_name
+
+
+def next_collection_version(vector_store: VectorStore, alias_name: str) -> str:
+    """Name the next ``<alias>_v<N>`` collection to build for an alias.
+
+    Args:
+        vector_store: Vector store
+        alias_name: Alias that searches use
+
+    Returns:
+        Name of a collection no version uses yet
+    """
+    versions = vector_store.list_versions(alias_name)
+    return f"{alias_name}_v{versions[-1][0] + 1 if versions else 1}"
+
+
+def publish_collection_version(
+    vector_store: VectorStore,
+    alias_name: str,
+    collection_name: str,
+    retention: int = COLLECTION_RETENTION,
+    index_root: Optional[Path] = None
+) -> None:
+    """Point an alias at a finished collection version and drop old versions.
+
+    Args:
+        vector_store: Vector store
+        alias_name: Alias that searches use
+        collection_name: Complete, verified collection version
+        retention: Number of versions to keep, including the live one
+        index_root: Optional directory of the alias's local index versions;
+            the version named after the collection is published with it
+    """
+    # A plain collection still using the alias name has to make way once
+    if vector_store.get_alias_target(alias_name) is None and alias_name in {
+        collection.name for collection in vector_store.client.get_collections().collections
+    }:
+        print(f"Replacing unversioned collection {alias_name} with an alias")
+        vector_store.delete_collection(alias_name)
+        delete_reducer(alias_name, vector_store)
+
+    vector_store.swap_alias(alias_name, collection_name)
+    print(f"Alias {alias_name} now points to {collection_name}")
+    if index_root is not None:
+        publish_index(index_root, collection_name)
+
+    # Garbage-collect old versions, never the one just published
+    for _, old_collection in vector_store.list_versions(alias_name)[:-max(retention, 1)]:
+        if old_collection != collection_name:
+            print(f"Deleting old version {old_collection}")
+            vector_store.delete_collection(old_collection)
+            delete_reducer(old_collection, vector_store)
+    if index_root is not None:
+        prune_index_versions(index_root, [name for _, name in vector_store.list_versions(alias_name)])
+
+
+def snapshot_collection(
+    alias_name: str,
+    embedding_model: Optional[str] = None,
+    index_dir: Path = LOCAL_INDEX_DIR,
+    vector_store: Optional[VectorStore] = None
+) -> Path:
+    """Copy a collection from Qdrant into a published local index.
+
+    The API falls back to this index while Qdrant is unavailable, and
+    serves ``/related`` from the neighbor graph saved with it. The
+    previously published snapshot is kept so workers still mapping it can
+    finish; older ones are deleted.
+
+    Args:
+        alias_name: Collection or alias searched by the API
+        embedding_model: Model the collection was built with, for the metadata
+        index_dir: Directory of local indexes
+        vector_store: Optional vector store (defaults to the shared one)
+
+    Returns:
+        Directory of the published index version
+    """
+    vector_store = vector_store or get_vector_store()
+    collection_name = vector_store.get_alias_target(alias_name) or alias_name
+    vector_name, _ = vector_store.get_vector_spec(collection_name)
+    ids, vectors, payloads = vector_store.export_points(collection_name, vector_name)
+    reducer = load_reducer(collection_name, vector_name, vector_store)
+
+    index_root = index_dir / alias_name
+    previous = current_index_version(index_root)
+    version = f"{collection_name}.snapshot-{time.strftime('%Y%m%d%H%M%S')}"
+    index = LocalIndex(
+        ids,
+        vectors,
+        payloads,
+        metadata={
+            "collection": collection_name,
+            "model": embedding_model,
+            "vector_name": vector_name
+        }
+    )
+    index.build_neighbors()
+    index.save(index_root / version)
+    if reducer is not None:
+        # Ship the projection with the index, for searches while Qdrant is down
+        save_reducer(reducer, collection_name, index_path=index_root / version)
+    publish_index(index_root, version)
+    prune_index_versions(index_root, [version] + ([previous] if previous else []))
+    print(f"Snapshotted {len(ids)} points of {collection_name} to {index_root / version}")
+    return index_root / version
+
+
+def verify_collection(
+    vector_store: VectorStore,
+    embedding_service: EmbeddingService,
+    embedding_model: str,
+    collection_name: str,
+    taxonomy_file: Path,
+    max_level: int,
+    expected_count: int,
+    sample_size: int = VERIFY_SAMPLE_SIZE,
+    stream: bool = False
+) -> None:
+    """Check that a freshly built collection is complete and searchable.
+
+    Every point must be present, and a sample of categories spread across the
+    taxonomy must find themselves in the top results when searched by path.
+
+    Args:
+        vector_store: Vector store holding the collection
+        embedding_service: Embedding service for the sample queries
+        embedding_model: Model the collection was built with
+        collection_name: Collection to verify
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories included
+        expected_count: Number of points that should be present
+        sample_size: Number of categories to search for
+        stream: Sample the taxonomy while streaming it instead of parsing it
+            whole; the file must already be in hierarchical order
+
+    Raises:
+        ValueError: If the collection fails verification
+    """
+    count = vector_store.count(collection_name)
+    if count != expected_count:
+        raise ValueError(f"Collection {collection_name} has {count} points, expected {expected_count}")
+
+    if stream:
+        step = max(expected_count // sample_size, 1)
+        records = iter_rich_categories(taxonomy_file, max_level, max_descendants=0)
+        sample = [payload for _, _, payload in itertools.islice(records, 0, step * sample_size, step)]
+    else:
+        categories = TaxonomyParser(taxonomy_file).get_categories_up_to_level(max_level)
+        step = max(len(categories) // sample_size, 1)
+        sample = categories[::step][:sample_size]
+    if not sample:
+        return
+
+    # Reduced collections are searched the same way the API will search them
+    vector_name, _ = vector_store.get_vector_spec(collection_name)
+    reducer = load_reducer(collection_name, vector_name, vector_store)
+
+    query_vectors = embedding_service.encode(
+        [category["full_path"] for category in sample],
+        model_name=embedding_model,
+        reducer=reducer
+    )
+    batch_results = vector_store.search_batch(
+        collection_name=collection_name,
+        query_vectors=query_vectors,
+        limit=10,
+        vector_name=vector_name
+    )
+    hits = sum(
+        any(result["id"] == category["id"] for result in results)
+        for category, results in zip(sample, batch_results)
+    )
+
+    if hits / len(sample) < VERIFY_MIN_HIT_RATE:
+        raise ValueError(
+            f"Collection {collection_name} found only {hits}/{len(sample)} sample categories"
+        )
+
+
+def build_local_index(
+    taxonomy_file: Path,
+    embedding_service: EmbeddingService,
+    max_level: int = 3,
+    batch_size: int = 32
+) -> LocalIndex:
+    """Embed the taxonomy into an in-process index without touching Qdrant.
+
+    The category texts and payloads are identical to what
+    ``populate_taxonomy_embeddings`` writes, so searches against the local
+    index reflect what the API would return.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        embedding_service: Embedding service with the model to use
+        max_level: Maximum level of categories to include
+        batch_size: Number of texts to encode per batch
+
+    Returns:
+        Local index over the taxonomy
+    """
+    parser = TaxonomyParser(taxonomy_file)
+    rich_categories = parser.get_rich_categories_for_embedding(
+        max_level,
+        embedding_service.token_budget(),
+        embedding_service.count_tokens
+    )
+    ids = [item[0] for item in rich_categories]
+    texts = [item[1] for item in rich_categories]
+
+    # Windows are written straight into one preallocated matrix
+    vectors = np.empty((len(texts), embedding_service.get_embedding_dimension()), dtype=np.float32)
+    for i in range(0, len(texts), POPULATE_SORT_WINDOW):
+        vectors[i:i+POPULATE_SORT_WINDOW] = encode_length_sorted(
+            embedding_service,
+            texts[i:i+POPULATE_SORT_WINDOW],
+            None,
+            batch_size=batch_size
+        )
+    payloads = [build_category_payload(parser, id_) for id_ in ids]
+
+    return LocalIndex(ids, vectors, payloads, normalized=True)
 
 
 if __name__ == "__main__":
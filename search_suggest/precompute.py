@@ -0,0 +1,230 @@
+"""
+Precomputed results for the most frequent queries.
+
+A small head of queries makes up most traffic. Their results are computed
+ahead of time, per model, and stored in a table the API loads at startup, so
+those queries skip both embedding and vector search. Each model's entry
+records the concrete collection version it was computed against; once the
+alias points elsewhere the entry is ignored until the table is rebuilt.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import re
+import unicodedata
+
+from search_suggest.embeddings import EmbeddingService
+from search_suggest.reduction import load_reducer
+from search_suggest.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Table of precomputed results loaded by the API
+PRECOMPUTE_FILE = Path(os.environ.get(
+    "PRECOMPUTE_FILE",
+    str(Path(__file__).parent.parent / "data" / "precomputed.json")
+))
+
+
+def canonicalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share one entry.
+
+    Unicode is NFKC-normalized and case-folded, surrounding punctuation is
+    dropped and runs of whitespace collapse to one space.
+
+    Args:
+        query: Raw query
+
+    Returns:
+        Canonical form of the query
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" \t\n.,;:!?\"'")
+
+
+def load_query_counts(path: Path) -> Counter:
+    """Count canonical queries from a query log or a frequency list.
+
+    Each line may be a JSON object with a ``query`` field (and an optional
+    ``count``), as written by the query log, or ``<query>\\t<count>``, or just
+    a query.
+
+    Args:
+        path: Path to the query file
+
+    Returns:
+        Counter of canonical queries
+    """
+    counts: Counter = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                query, count = item.get("query"), int(item.get("count", 1))
+            elif "\t" in line:
+                query, count_text = line.rsplit("\t", 1)
+                count = int(count_text)
+            else:
+                query, count = line, 1
+            if query:
+                canonical = canonicalize_query(query)
+                if canonical:
+                    counts[canonical] += count
+    return counts
+
+
+def build_precomputed_table(
+    query_counts: Counter,
+    model_names: Sequence[str],
+    collection_for_model: Dict[str, str],
+    embedding_service: EmbeddingService,
+    vector_store: VectorStore,
+    top_n: int = 1000,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """Compute results for the most frequent queries of each model.
+
+    Args:
+        query_counts: Counter of canonical queries
+        model_names: Models to compute results for
+        collection_for_model: Collection alias searched for each model
+        embedding_service: Embedding service
+        vector_store: Vector store
+        top_n: Number of most frequent queries to include
+        limit: Number of results stored per query
+
+    Returns:
+        Table keyed by model name
+    """
+    queries = [query for query, _ in query_counts.most_common(top_n)]
+    table: Dict[str, Any] = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "limit": limit,
+        "models": {}
+    }
+
+    for model_name in model_names:
+        alias_name = collection_for_model[model_name]
+        collection_name = vector_store.get_alias_target(alias_name) or alias_name
+        vector_name, _ = vector_store.get_vector_spec(collection_name)
+        print(f"Precomputing {len(queries)} queries for {model_name} against {collection_name}")
+
+        query_vectors = embedding_service.encode(
+            queries,
+            model_name=model_name,
+            reducer=load_reducer(collection_name, vector_name)
+        )
+        batch_results = vector_store.search_batch(
+            collection_name=collection_name,
+            query_vectors=query_vectors,
+            limit=limit,
+            vector_name=vector_name
+        )
+
+        table["models"][model_name] = {
+            "collection": collection_name,
+            "results": {
+                query: [
+                    {
+                        "id": result["id"],
+                        "score": result["score"],
+                        "payload": {
+                            "full_path": result["payload"].get("full_path"),
+                            "level": result["payload"].get("level")
+                        }
+                    }
+                    for result in results
+                ]
+                for query, results in zip(queries, batch_results)
+            }
+        }
+
+    return table
+
+
+def save_precomputed_table(table: Dict[str, Any], path: Path = PRECOMPUTE_FILE) -> None:
+    """Write a table atomically, so a running API never reads half a file.
+
+    Args:
+        table: Table built by ``build_precomputed_table``
+        path: Destination file
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class PrecomputedResults:
+    """In-memory lookup of precomputed results, keyed by model and query."""
+
+    def __init__(self, table: Optional[Dict[str, Any]] = None):
+        """Initialize the lookup.
+
+        Args:
+            table: Table built by ``build_precomputed_table``
+        """
+        table = table or {}
+        self.limit = table.get("limit", 0)
+        self.models: Dict[str, Dict[str, Any]] = table.get("models", {})
+
+    @classmethod
+    def load(cls, path: Path = PRECOMPUTE_FILE) -> "PrecomputedResults":
+        """Load a table, or an empty one if it is missing or unreadable.
+
+        Args:
+            path: Table file
+
+        Returns:
+            Lookup over the table
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                table = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable precomputed table {path}: {e}")
+            return cls()
+        results = cls(table)
+        logger.info(f"Loaded {len(results)} precomputed queries from {path}")
+        return results
+
+    def __len__(self) -> int:
+        return sum(len(entry["results"]) for entry in self.models.values())
+
+    def lookup(
+        self,
+        model_name: str,
+        query: str,
+        limit: int,
+        collection_name: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Find precomputed results for a query.
+
+        Args:
+            model_name: Embedding model the query is searched with
+            query: Raw query
+            limit: Number of results wanted
+            collection_name: Concrete collection the model currently searches
+
+        Returns:
+            Results shaped like ``VectorStore.search`` results (with only the
+            ``full_path`` and ``level`` payload fields), or None if the query
+            is not in the table, more results
+            are wanted than were stored, or the table is for another version
+        """
+        entry = self.models.get(model_name)
+        if entry is None or limit > self.limit or entry["collection"] != collection_name:
+            return None
+        results = entry["results"].get(canonicalize_query(query))
+        return results[:limit] if results is not None else None
@@ -0,0 +1,228 @@
+"""
+Opt-in profiling of the running API.
+
+Nothing here is installed unless ``PROFILING_TOKEN`` is set. With it, a
+request carrying the token in ``X-Profile-Token`` has its endpoint profiled
+with cProfile, in the thread that runs it, and the stats are stored under
+``PROFILE_DIR`` for download. The sampling profiler snapshots the stacks of
+every thread of the worker at a fixed interval for a number of seconds and
+reports them in the collapsed format read by flamegraph.pl and speedscope.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+# Secret that enables profiling; unset, no profiling hook is installed
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+# Directory per-request profiles are stored in
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or Path(tempfile.gettempdir()) / "search_suggest_profiles")
+# Longest run of the sampling profiler, in seconds
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Header carrying the token, on profiled requests and on the debug endpoints
+PROFILE_HEADER = "X-Profile-Token"
+# Header naming the stored profile of a profiled request
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9]+-[0-9a-f]{8}$")
+
+# Set for the duration of a profiled request; collects the profile's ID
+_profiled_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profiled_request", default=None)
+# cProfile can only run one profiler per process at a time
+_profiler_lock = threading.Lock()
+_sampler_lock = threading.Lock()
+
+
+def token_matches(token: Optional[str]) -> bool:
+    """Whether a request carries the profiling token.
+
+    Args:
+        token: Value of ``X-Profile-Token``, if sent
+
+    Returns:
+        True if profiling is enabled and the token is correct
+    """
+    return (
+        PROFILING_TOKEN is not None
+        and token is not None
+        and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+    )
+
+
+def save_profile(profiler: cProfile.Profile) -> str:
+    """Store a profile under ``PROFILE_DIR``.
+
+    Args:
+        profiler: Finished profiler
+
+    Returns:
+        ID the profile can be fetched by
+    """
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(PROFILE_DIR / f"{profile_id}.prof"))
+    return profile_id
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """Find a stored profile.
+
+    Args:
+        profile_id: ID from ``X-Profile-Id``
+
+    Returns:
+        Path of the ``.prof`` file, or None if the ID is malformed or unknown
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def profile_text(path: Path, limit: int = 50) -> str:
+    """Render a stored profile as text.
+
+    Args:
+        path: ``.prof`` file
+        limit: Number of functions listed
+
+    Returns:
+        The functions with the most cumulative time
+    """
+    stream = io.StringIO()
+    pstats.Stats(str(path), stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def profile_calls(func: Callable) -> Callable:
+    """Wrap a sync endpoint so profiled requests run it under cProfile.
+
+    FastAPI runs sync endpoints in its thread pool, where the request's
+    context is copied, so the profile covers the endpoint's own thread. On
+    Python 3.12 and later cProfile sees every thread, so work of requests
+    running concurrently shows up too. A request that arrives while another
+    is being profiled runs unprofiled.
+
+    Args:
+        func: Endpoint function
+
+    Returns:
+        Wrapped function with the same signature
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        state = _profiled_request.get()
+        if state is None or not _profiler_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            _profiler_lock.release()
+            state["id"] = save_profile(profiler)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose sync endpoint can be profiled per request."""
+
+    def get_route_handler(self) -> Callable:
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = profile_calls(self.dependant.call)
+        return super().get_route_handler()
+
+
+async def profile_requests(request: Request, call_next: Callable) -> Response:
+    """Middleware marking requests that carry the token for profiling.
+
+    Args:
+        request: Incoming request
+        call_next: Rest of the application
+
+    Returns:
+        The response, with ``X-Profile-Id`` if a profile was stored
+    """
+    if not token_matches(request.headers.get(PROFILE_HEADER)):
+        return await call_next(request)
+    state: Dict[str, Any] = {}
+    reset_token = _profiled_request.set(state)
+    try:
+        response = await call_next(request)
+    finally:
+        _profiled_request.reset(reset_token)
+    if "id" in state:
+        response.headers[PROFILE_ID_HEADER] = state["id"]
+    # A profiled response must never be served to someone else from a cache
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Sample the stacks of every other thread in this process.
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+
+    Returns:
+        Counter of collapsed stacks (root first, frames joined by ``;``)
+    """
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Pool threads share a name, so their samples merge in the graph
+            thread_name = re.sub(r"[_-]?\d+$", "", names.get(ident, "thread")) or "thread"
+            counts[";".join([thread_name] + stack[::-1])] += 1
+        time.sleep(interval)
+    return counts
+
+
+def sample_profile(seconds: float, interval: float = 0.005) -> Optional[str]:
+    """Run the sampling profiler, unless it is already running.
+
+    Args:
+        seconds: How long to sample (at most ``PROFILE_MAX_SECONDS``)
+        interval: Seconds between samples
+
+    Returns:
+        Collapsed stacks, one ``stack count`` line each, or None if another
+        sampling run is in progress
+    """
+    if not _sampler_lock.acquire(blocking=False):
+        return None
+    try:
+        counts = sample_stacks(min(seconds, PROFILE_MAX_SECONDS), interval)
+    finally:
+        _sampler_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,174 @@
+"""
+Sampled, append-only logging of the queries the API receives.
+
+Entries are written as JSON lines to size-rotated files by a background
+thread, so a request only pays for a random draw and, when sampled, a
+non-blocking queue put. If the writer falls behind, entries are dropped
+rather than slowing requests down. The logs feed the ``replay`` command and
+the head-query precomputation.
+"""
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+# Query logging is off unless a file is configured
+QUERY_LOG_FILE = os.environ.get("QUERY_LOG_FILE", "")
+# Fraction of requests logged
+QUERY_LOG_SAMPLE_RATE = float(os.environ.get("QUERY_LOG_SAMPLE_RATE", "0.1"))
+# Size at which a log file is rotated, and number of rotated files kept
+QUERY_LOG_MAX_BYTES = int(os.environ.get("QUERY_LOG_MAX_BYTES", str(50 * 2**20)))
+QUERY_LOG_BACKUPS = int(os.environ.get("QUERY_LOG_BACKUPS", "5"))
+# Entries buffered for the writer thread before new ones are dropped
+QUERY_LOG_QUEUE_SIZE = int(os.environ.get("QUERY_LOG_QUEUE_SIZE", "10000"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Serializing is left to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueryLogger:
+    """Samples requests and hands them to a background writer."""
+
+    def __init__(
+        self,
+        path: Path,
+        sample_rate: float = QUERY_LOG_SAMPLE_RATE,
+        max_bytes: int = QUERY_LOG_MAX_BYTES,
+        backups: int = QUERY_LOG_BACKUPS,
+        queue_size: int = QUERY_LOG_QUEUE_SIZE
+    ):
+        """Initialize the query logger.
+
+        Each process writes its own file, ``<stem>.<pid><suffix>``, because
+        size-based rotation is not safe with several writers on one file.
+
+        Args:
+            path: Base path of the log files
+            sample_rate: Fraction of requests to log (0 to 1)
+            max_bytes: Size at which a file is rotated
+            backups: Number of rotated files kept
+            queue_size: Maximum number of entries waiting to be written
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self._pid: Optional[int] = None
+        self._handler: Optional[DroppingQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._file_handler: Optional[RotatingFileHandler] = None
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """Number of sampled entries dropped because the writer fell behind."""
+        return self._handler.dropped if self._handler is not None else 0
+
+    def log(
+        self,
+        endpoint: str,
+        query: str,
+        model: str,
+        limit: int,
+        timings_ms: Dict[str, float],
+        result_ids: List[str],
+        source: Optional[str] = None
+    ) -> None:
+        """Record a request if it is sampled.
+
+        Args:
+            endpoint: Endpoint that served the request
+            query: Search query
+            model: Embedding model used
+            limit: Maximum number of results requested
+            timings_ms: Latency breakdown in milliseconds (e.g. embed, search, total)
+            result_ids: IDs of the returned categories, in rank order
+            source: What answered the query (e.g. qdrant, local, precomputed)
+        """
+        if random.random() >= self.sample_rate:
+            return
+        entry = {
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "query": query,
+            "model": model,
+            "limit": limit,
+            "source": source,
+            "timings_ms": {name: round(value, 3) for name, value in timings_ms.items()},
+            "result_ids": result_ids
+        }
+        self._ensure_started()
+        self._handler.handle(logging.makeLogRecord({"msg": entry}))
+
+    def close(self) -> None:
+        """Flush pending entries and stop the writer thread."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                self._file_handler.close()
+            self._listener = None
+            self._file_handler = None
+            self._handler = None
+            self._pid = None
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread, once per process (forked workers included)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                self.path.with_name(f"{self.path.stem}.{os.getpid()}{self.path.suffix}"),
+                maxBytes=self.max_bytes,
+                backupCount=self.backups,
+                encoding="utf-8"
+            )
+            file_handler.setFormatter(JSONLineFormatter())
+            log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            self._handler = DroppingQueueHandler(log_queue)
+            self._listener = QueueListener(log_queue, file_handler)
+            self._listener.start()
+            self._file_handler = file_handler
+            self._pid = os.getpid()
+
+
+class JSONLineFormatter(logging.Formatter):
+    """Formats a record whose message is a dictionary as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, separators=(",", ":"))
+
+
+def create_query_logger() -> Optional[QueryLogger]:
+    """Create the query logger configured by the environment.
+
+    Returns:
+        Query logger, or None if query logging is disabled
+    """
+    if not QUERY_LOG_FILE or QUERY_LOG_SAMPLE_RATE <= 0:
+        return None
+    return QueryLogger(Path(QUERY_LOG_FILE))
@@ -0,0 +1,288 @@
+"""
+Dimensionality reduction for embeddings: Matryoshka truncation and PCA.
+
+A reduced collection stores its vectors under a named vector such as
+``pca-128`` or ``truncate-256``, so the collection config itself records how
+query embeddings must be reduced before searching it. A PCA projection is
+stored in Qdrant next to the collection it was used to build, so every
+process searching the collection can load it; local copies only cache it.
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+import os
+import re
+import shutil
+
+import numpy as np
+
+from search_suggest.local_index import normalize_rows
+from search_suggest.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Directory where fitted projections are cached, one folder per collection
+REDUCTION_DIR = Path(os.environ.get(
+    "REDUCTION_DIR",
+    str(Path(__file__).parent.parent / "data" / "reductions")
+))
+
+REDUCTION_METHODS = ("truncate", "pca")
+
+# Suffix of the collection holding a PCA collection's projection
+PROJECTION_SUFFIX = "_projection"
+
+
+class ReducerNotFound(FileNotFoundError):
+    """Raised when the projection of a reduced collection can't be found."""
+
+
+class Reducer(ABC):
+    """Maps full-size embeddings to a smaller dimension."""
+
+    method = ""
+
+    def __init__(self, dimension: int):
+        """Initialize the reducer.
+
+        Args:
+            dimension: Output dimension
+        """
+        self.dimension = dimension
+
+    @property
+    def vector_name(self) -> str:
+        """Name of the Qdrant vector holding reduced embeddings."""
+        return f"{self.method}-{self.dimension}"
+
+    @abstractmethod
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Reduce a matrix of embeddings.
+
+        Args:
+            vectors: Matrix of shape (n, full dimension)
+
+        Returns:
+            Unit-length float32 matrix of shape (n, dimension)
+        """
+
+
+class TruncationReducer(Reducer):
+    """Keeps the leading dimensions of Matryoshka-trained embeddings."""
+
+    method = "truncate"
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return normalize_rows(np.asarray(vectors, dtype=np.float32)[:, :self.dimension])
+
+
+class PCAReducer(Reducer):
+    """Projects embeddings onto principal components fitted on the taxonomy."""
+
+    method = "pca"
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        """Initialize the reducer.
+
+        Args:
+            mean: Mean of the fitted vectors, shape (full dimension,)
+            components: Principal axes, shape (dimension, full dimension)
+        """
+        super().__init__(components.shape[0])
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dimension: int) -> "PCAReducer":
+        """Fit a PCA projection.
+
+        Args:
+            vectors: Matrix of embeddings to fit on
+            dimension: Number of components to keep
+
+        Returns:
+            Fitted reducer
+        """
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if dimension > min(vectors.shape):
+            raise ValueError(
+                f"Cannot fit {dimension} components on a {vectors.shape[0]}x{vectors.shape[1]} matrix"
+            )
+        mean = vectors.mean(axis=0)
+        # Rows of vt are the principal axes, ordered by explained variance
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean, vt[:dimension])
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        return normalize_rows((vectors - self.mean) @ self.components.T)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The mean followed by the principal axes, as one matrix."""
+        return np.vstack([self.mean, self.components])
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "PCAReducer":
+        """Rebuild a reducer from its ``matrix``.
+
+        Args:
+            matrix: Mean followed by the principal axes
+
+        Returns:
+            Reducer
+        """
+        return cls(matrix[0], matrix[1:])
+
+    def save(self, path: Path) -> None:
+        """Persist the projection, replacing the file atomically.
+
+        Args:
+            path: Destination ``.npz`` file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, mean=self.mean, components=self.components)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "PCAReducer":
+        """Load a persisted projection.
+
+        Args:
+            path: ``.npz`` file written by ``save``
+
+        Returns:
+            Reducer
+        """
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"])
+
+
+def parse_reduction(spec: str) -> Tuple[str, int]:
+    """Parse a reduction spec such as ``pca:128``, ``truncate:256`` or ``pca-128``.
+
+    Args:
+        spec: Reduction spec (the vector name format is accepted too)
+
+    Returns:
+        Tuple of (method, dimension)
+    """
+    match = re.fullmatch(r"([a-z]+)[:-](\d+)", spec.strip().lower())
+    if not match or match.group(1) not in REDUCTION_METHODS:
+        raise ValueError(f"Invalid reduction '{spec}', expected one of {REDUCTION_METHODS} like 'pca:128'")
+    return match.group(1), int(match.group(2))
+
+
+def reducer_path(collection_name: str, vector_name: str) -> Path:
+    """Location of a collection's cached projection."""
+    return REDUCTION_DIR / collection_name / f"{vector_name}.npz"
+
+
+def projection_collection(collection_name: str) -> str:
+    """Name of the Qdrant collection holding a collection's projection."""
+    return f"{collection_name}{PROJECTION_SUFFIX}"
+
+
+def fit_reducer(spec: str, vectors: np.ndarray, matryoshka: bool = False) -> Reducer:
+    """Create a reducer from a spec, fitting it if needed.
+
+    Args:
+        spec: Reduction spec such as ``pca:128``
+        vectors: Full-size embeddings to fit on (used by PCA)
+        matryoshka: Whether the model was trained for prefix truncation
+
+    Returns:
+        Reducer
+    """
+    method, dimension = parse_reduction(spec)
+    if dimension >= vectors.shape[1]:
+        raise ValueError(f"Reduced dimension {dimension} must be below {vectors.shape[1]}")
+    if method == "truncate":
+        if not matryoshka:
+            logger.warning("Truncating embeddings of a model not trained with Matryoshka loss; expect recall loss")
+        return TruncationReducer(dimension)
+    return PCAReducer.fit(vectors, dimension)
+
+
+def save_reducer(
+    reducer: Reducer,
+    collection_name: str,
+    vector_store: Optional[VectorStore] = None,
+    index_path: Optional[Path] = None
+) -> None:
+    """Persist a reducer for a collection (truncation needs no state).
+
+    Args:
+        reducer: Reducer to persist
+        collection_name: Concrete collection the reducer was used to build
+        vector_store: Optional vector store to store the projection in, next
+            to the collection
+        index_path: Optional local index version to ship a copy with
+    """
+    if not isinstance(reducer, PCAReducer):
+        return
+    reducer.save(reducer_path(collection_name, reducer.vector_name))
+    if index_path is not None:
+        reducer.save(index_path / f"{reducer.vector_name}.npz")
+    if vector_store is not None:
+        vector_store.save_matrix(projection_collection(collection_name), reducer.matrix)
+
+
+def load_reducer(
+    collection_name: str,
+    vector_name: Optional[str],
+    vector_store: Optional[VectorStore] = None,
+    index_path: Optional[Path] = None
+) -> Optional[Reducer]:
+    """Load the reducer matching a collection's named vector.
+
+    A projection is looked up in the local index version, then in
+    ``REDUCTION_DIR``, then in Qdrant, and cached in ``REDUCTION_DIR`` once
+    fetched from Qdrant.
+
+    Args:
+        collection_name: Concrete collection name
+        vector_name: Name of the collection's vector (None for unreduced)
+        vector_store: Optional vector store holding the projection
+        index_path: Optional local index version built from the collection
+
+    Returns:
+        Reducer, or None when the collection stores full-size vectors
+
+    Raises:
+        ReducerNotFound: If a PCA collection's projection is nowhere to be found
+    """
+    if not vector_name:
+        return None
+    method, dimension = parse_reduction(vector_name)
+    if method == "truncate":
+        return TruncationReducer(dimension)
+    path = reducer_path(collection_name, vector_name)
+    for candidate in ([index_path / f"{vector_name}.npz"] if index_path is not None else []) + [path]:
+        if candidate.exists():
+            return PCAReducer.load(candidate)
+    matrix = vector_store.load_matrix(projection_collection(collection_name)) if vector_store is not None else None
+    if matrix is None or matrix.shape[0] != dimension + 1:
+        raise ReducerNotFound(f"No PCA projection {vector_name} for collection {collection_name}")
+    reducer = PCAReducer.from_matrix(matrix)
+    try:
+        reducer.save(path)
+    except OSError as e:
+        logger.warning(f"Could not cache the projection of {collection_name}: {e}")
+    return reducer
+
+
+def delete_reducer(collection_name: str, vector_store: Optional[VectorStore] = None) -> None:
+    """Drop the stored and cached projections of a collection.
+
+    Args:
+        collection_name: Concrete collection name
+        vector_store: Optional vector store holding the projection
+    """
+    if vector_store is not None:
+        vector_store.delete_collection(projection_collection(collection_name))
+    shutil.rmtree(REDUCTION_DIR / collection_name, ignore_errors=True)
+
@@ -0,0 +1,194 @@
+"""
+Replay logged queries against a running API to measure latency under load.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import glob
+import json
+import threading
+import time
+
+import httpx
+import numpy as np
+from tabulate import tabulate
+
+
+def load_log_entries(patterns: Sequence[str]) -> List[Dict[str, Any]]:
+    """Read query log entries from files or glob patterns.
+
+    Args:
+        patterns: Log files or glob patterns (e.g. ``logs/queries.*.jsonl*``)
+
+    Returns:
+        Entries ordered by timestamp
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)} or set(patterns))
+    entries = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry.get("ts", 0))
+    return entries
+
+
+def send_request(client: httpx.Client, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one logged query and time it.
+
+    ``/compare`` entries are logged per model, so each is replayed as a
+    single-model comparison.
+
+    Args:
+        client: HTTP client pointing at the API
+        entry: Query log entry
+
+    Returns:
+        Dictionary with ``latency_ms``, ``status`` (None on a transport
+        error) and ``endpoint``
+    """
+    endpoint = entry.get("endpoint", "/search")
+    start_time = time.perf_counter()
+    try:
+        if endpoint == "/compare":
+            response = client.post("/compare", json={
+                "query": entry["query"],
+                "models": [entry["model"]],
+                "limit": entry.get("limit", 10)
+            })
+        else:
+            response = client.get("/search", params={
+                "query": entry["query"],
+                "model": entry["model"],
+                "limit": entry.get("limit", 10)
+            })
+        status = response.status_code
+    except httpx.HTTPError:
+        status = None
+    return {
+        "endpoint": endpoint,
+        "status": status,
+        "latency_ms": (time.perf_counter() - start_time) * 1000
+    }
+
+
+def replay(
+    base_url: str,
+    entries: List[Dict[str, Any]],
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    max_requests: Optional[int] = None,
+    timeout: float = 30.0
+) -> Dict[str, Any]:
+    """Play query log entries against an API.
+
+    Without ``rate`` the replay is closed-loop: ``concurrency`` clients send
+    requests back to back. With ``rate`` it is open-loop: requests start at
+    a fixed rate whether or not earlier ones have finished (up to
+    ``concurrency`` in flight), which shows how latency grows with load.
+
+    Args:
+        base_url: Base URL of the API
+        entries: Query log entries to replay, cycled if ``max_requests`` is larger
+        concurrency: Maximum number of requests in flight
+        rate: Optional target requests per second
+        max_requests: Number of requests to send (defaults to one per entry)
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        Report with throughput, error rate and latency percentiles
+    """
+    if not entries:
+        raise ValueError("No query log entries to replay")
+    total = max_requests or len(entries)
+
+    def schedule() -> Iterator[Dict[str, Any]]:
+        for i in range(total):
+            if rate:
+                delay = start_time + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield entries[i % len(entries)]
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    slots = threading.Semaphore(concurrency)
+    outcomes: List[Dict[str, Any]] = []
+
+    def run(client: httpx.Client, entry: Dict[str, Any]) -> None:
+        try:
+            outcomes.append(send_request(client, entry))
+        finally:
+            slots.release()
+
+    with httpx.Client(base_url=base_url, timeout=timeout, limits=limits) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start_time = time.perf_counter()
+            for entry in schedule():
+                slots.acquire()
+                executor.submit(run, client, entry)
+        elapsed = time.perf_counter() - start_time
+
+    return summarize(outcomes, elapsed)
+
+
+def summarize(outcomes: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate request outcomes into a load report.
+
+    Args:
+        outcomes: Results of ``send_request``
+        elapsed: Wall-clock duration of the replay in seconds
+
+    Returns:
+        Report dictionary
+    """
+    latencies = np.array([outcome["latency_ms"] for outcome in outcomes])
+    errors = sum(1 for outcome in outcomes if outcome["status"] is None or outcome["status"] >= 400)
+    status_counts: Dict[str, int] = {}
+    for outcome in outcomes:
+        key = str(outcome["status"]) if outcome["status"] is not None else "transport_error"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    def percentile(q: float) -> float:
+        return float(np.percentile(latencies, q)) if len(latencies) else 0.0
+
+    return {
+        "requests": len(outcomes),
+        "duration_s": elapsed,
+        "throughput_rps": len(outcomes) / elapsed if elapsed > 0 else 0.0,
+        "errors": errors,
+        "error_rate": errors / len(outcomes) if outcomes else 0.0,
+        "status_counts": status_counts,
+        "latency_ms": {
+            "p50": percentile(50),
+            "p90": percentile(90),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": float(latencies.max()) if len(latencies) else 0.0,
+            "mean": float(latencies.mean()) if len(latencies) else 0.0
+        }
+    }
+
+
+def print_replay_report(report: Dict[str, Any]) -> None:
+    """Print a summary of a replay report.
+
+    Args:
+        report: Report produced by ``replay``
+    """
+    latency = report["latency_ms"]
+    print(tabulate(
+        [[
+            report["requests"],
+            f"{report['throughput_rps']:.1f}",
+            f"{report['error_rate']:.2%}",
+            f"{latency['p50']:.1f}",
+            f"{latency['p90']:.1f}",
+            f"{latency['p95']:.1f}",
+            f"{latency['p99']:.1f}",
+            f"{latency['max']:.1f}"
+        ]],
+        headers=["Requests", "Req/s", "Errors", "p50 ms", "p90 ms", "p95 ms", "p99 ms", "max ms"],
+        tablefmt="grid"
+    ))
+    print(f"Status codes: {report['status_counts']}")
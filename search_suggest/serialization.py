@@ -0,0 +1,207 @@
+"""
+Fast JSON responses for the search endpoints.
+
+FastAPI normally validates an endpoint's return value against its
+``response_model`` and encodes the result with the standard library. For
+search results this work repeats validation the endpoint already did while
+building one Pydantic object per hit. The search endpoints therefore shape
+plain rows once, with types coerced where the data comes in, and return them
+encoded with orjson when it is installed. Their ``response_model`` still
+documents the schema in OpenAPI.
+"""
+from typing import Any, Dict, List, Sequence
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from tabulate import tabulate
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+else:
+    FastJSONResponse = JSONResponse
+
+
+def dumps(content: Any) -> str:
+    """Encode content as compact JSON, with orjson when it is installed.
+
+    Args:
+        content: JSON-compatible content
+
+    Returns:
+        JSON text
+    """
+    if orjson is not None:
+        return orjson.dumps(content).decode()
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+
+
+def search_rows(raw_results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shape raw results as ``SearchResult`` rows, skipping malformed ones.
+
+    Args:
+        raw_results: Results of a vector search or local index
+
+    Returns:
+        Rows with ``id``, ``score``, ``full_path`` and ``level``
+    """
+    rows = []
+    for result in raw_results:
+        payload = result["payload"]
+        if "full_path" not in payload or "level" not in payload:
+            continue
+        rows.append({
+            "id": str(result["id"]),
+            "score": float(result["score"]),
+            "full_path": str(payload["full_path"]),
+            "level": int(payload["level"])
+        })
+    return rows
+
+
+def sample_results(limit: int) -> List[Dict[str, Any]]:
+    """Make raw results shaped like a Qdrant search's, for benchmarking.
+
+    Args:
+        limit: Number of results
+
+    Returns:
+        Raw results with realistic payloads
+    """
+    return [
+        {
+            "id": str(1000 + i),
+            "score": 0.9 - i * 0.0123456789,
+            "payload": {
+                "id": str(1000 + i),
+                "name": f"Category {i}",
+                "full_path": f"Home & Garden > Kitchen & Dining > Kitchen Appliances > Category {i}",
+                "level": 4,
+                "parent_id": "730"
+            }
+        }
+        for i in range(limit)
+    ]
+
+
+def benchmark_serialization(
+    limit: int = 20,
+    models: int = 3,
+    iterations: int = 2000
+) -> List[Dict[str, Any]]:
+    """Measure the CPU time of encoding ``/search`` and ``/compare`` responses.
+
+    The Pydantic path builds one ``SearchResult`` per hit and runs FastAPI's
+    own response validation and encoding for the route, as the endpoints
+    did before; the fast path shapes rows and renders ``FastJSONResponse``.
+    Only serialization is timed, not search.
+
+    Args:
+        limit: Results per model
+        models: Models per ``/compare`` request
+        iterations: Requests encoded per measurement
+
+    Returns:
+        One row per endpoint with microseconds of CPU per request for each
+        path and the share saved
+    """
+    from fastapi.routing import serialize_response
+    from search_suggest.api import ComparisonResult, SearchResult, app
+
+    fields = {route.path: route.response_field for route in app.routes if hasattr(route, "response_field")}
+    raw_results = sample_results(limit)
+
+    def pydantic_search() -> List[SearchResult]:
+        results = []
+        for result in raw_results:
+            try:
+                results.append(SearchResult(
+                    id=result["id"],
+                    score=result["score"],
+                    full_path=result["payload"]["full_path"],
+                    level=result["payload"]["level"]
+                ))
+            except KeyError:
+                continue
+        return results
+
+    def pydantic_compare() -> List[ComparisonResult]:
+        return [
+            ComparisonResult(model=f"model-{i}", query_time_ms=12.5, results=pydantic_search())
+            for i in range(models)
+        ]
+
+    def fast_compare() -> List[Dict[str, Any]]:
+        return [
+            {
+                "model": f"model-{i}",
+                "query_time_ms": 12.5,
+                "results": search_rows(raw_results),
+                "model_info": None,
+                "degraded": False,
+                "corrected_query": None
+            }
+            for i in range(models)
+        ]
+
+    async def cpu_seconds(path: str, build, fast: bool) -> float:
+        start = time.process_time()
+        for _ in range(iterations):
+            if fast:
+                FastJSONResponse(build())
+            else:
+                # Sync endpoints validate in the thread pool, as here
+                content = await serialize_response(field=fields[path], response_content=build(), is_coroutine=False)
+                JSONResponse(content)
+        return time.process_time() - start
+
+    async def measure() -> List[Dict[str, Any]]:
+        report = []
+        for path, slow, fast in (
+            ("/search", pydantic_search, lambda: search_rows(raw_results)),
+            ("/compare", pydantic_compare, fast_compare)
+        ):
+            # Warm up both paths before timing them
+            await cpu_seconds(path, slow, False)
+            await cpu_seconds(path, fast, True)
+            pydantic_us = await cpu_seconds(path, slow, False) / iterations * 1e6
+            fast_us = await cpu_seconds(path, fast, True) / iterations * 1e6
+            report.append({
+                "endpoint": path,
+                "pydantic_us": pydantic_us,
+                "fast_us": fast_us,
+                "saved_us": pydantic_us - fast_us,
+                "saved": 1 - fast_us / pydantic_us if pydantic_us else 0.0
+            })
+        return report
+
+    return asyncio.run(measure())
+
+
+def print_serialization_report(report: List[Dict[str, Any]]) -> None:
+    """Print the rows of ``benchmark_serialization`` as a table.
+
+    Args:
+        report: Benchmark rows
+    """
+    print(f"Fast path encoder: {'orjson' if orjson is not None else 'json'}")
+    print(tabulate(
+        [
+            [
+                row["endpoint"],
+                f"{row['pydantic_us']:.1f}",
+                f"{row['fast_us']:.1f}",
+                f"{row['saved_us']:.1f}",
+                f"{row['saved']:.0%}"
+            ]
+            for row in report
+        ],
+        headers=["Endpoint", "Pydantic (µs CPU)", "Fast (µs CPU)", "Saved (µs)", "Saved"],
+        tablefmt="grid"
+    ))
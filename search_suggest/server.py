@@ -0,0 +1,292 @@
+"""
+Pre-fork production server for the search suggestions API.
+
+The master process loads the embedding models once, then forks the worker
+processes. Workers inherit the loaded weights and share them copy-on-write
+instead of each loading its own copy, so adding a worker costs only its
+unique memory (USS), not another set of models.
+
+Model weights live in tensor storage allocated apart from the Python object
+headers, so reference count updates in a worker dirty only the small header
+pages, never the weight pages. ``gc.freeze()`` runs just before forking so
+the garbage collector never writes to the inherited objects either.
+
+uvicorn's own ``--workers`` option starts workers with ``spawn``, and each
+one imports the app and loads every model again, which is why it is not
+used here.
+"""
+from typing import Dict, List, Optional
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+from tabulate import tabulate
+
+from search_suggest.embeddings import DEFAULT_MODEL
+from search_suggest.memory import process_memory
+from search_suggest.vector_store import reset_clients
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Number of worker processes (Heroku sets WEB_CONCURRENCY per dyno size)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Comma-separated models loaded before forking
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", DEFAULT_MODEL).split(",") if m.strip()]
+# Seconds between per-worker memory reports (0 disables them)
+MEMORY_REPORT_INTERVAL = float(os.getenv("MEMORY_REPORT_INTERVAL", "300"))
+# Seconds workers get to finish in-flight requests on shutdown
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+
+def preload(model_names: List[str]) -> None:
+    """Load the models the workers will share.
+
+    Nothing is encoded here: running inference would start torch and
+    tokenizer thread pools, which do not survive a fork.
+
+    Args:
+        model_names: Models to load in addition to the default one
+    """
+    from search_suggest.api import get_embedding_service
+
+    get_embedding_service().preload(model_names)
+    logger.info(f"Preloaded models: {', '.join(model_names)}")
+
+
+def threads_per_worker(workers: int) -> int:
+    """Split the CPU cores between workers for torch's intra-op threads."""
+    return max((os.cpu_count() or 1) // max(workers, 1), 1)
+
+
+def init_worker(workers: int) -> None:
+    """Prepare a freshly forked worker process.
+
+    Args:
+        workers: Total number of workers, used to size thread pools
+    """
+    import torch
+    from search_suggest.api import get_embedding_service
+
+    gc.unfreeze()
+    gc.enable()
+    # Connections opened by the master must not be shared across processes
+    reset_clients()
+    if "OMP_NUM_THREADS" not in os.environ:
+        torch.set_num_threads(threads_per_worker(workers))
+
+    # Warm up the inference path so the first request doesn't pay for it
+    get_embedding_service().encode(["warm up"])
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Open the listening socket shared by all workers.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+
+    Returns:
+        Bound, listening socket
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_memory(pids: List[int]) -> List[Dict[str, int]]:
+    """Report the memory of each worker.
+
+    Args:
+        pids: Worker process IDs
+
+    Returns:
+        List of dictionaries with ``pid``, ``rss``, ``pss`` and ``uss`` (bytes)
+    """
+    return [dict(pid=pid, **process_memory(pid)) for pid in pids]
+
+
+def log_worker_memory(pids: List[int]) -> None:
+    """Log a per-worker memory table; USS is what each extra worker costs."""
+    rows = worker_memory([os.getpid()] + pids)
+    table = tabulate(
+        [
+            [
+                "master" if row["pid"] == os.getpid() else "worker",
+                row["pid"],
+                f"{row['rss'] / 2**20:.0f}",
+                f"{row['pss'] / 2**20:.0f}",
+                f"{row['uss'] / 2**20:.0f}"
+            ]
+            for row in rows
+        ],
+        headers=["Process", "PID", "RSS MiB", "PSS MiB", "USS MiB"]
+    )
+    logger.info(f"Worker memory:\n{table}")
+
+
+class Master:
+    """Forks and supervises worker processes sharing one listening socket."""
+
+    def __init__(self, host: str, port: int, workers: int, log_level: str = "info"):
+        """Initialize the master.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind
+            workers: Number of worker processes
+            log_level: uvicorn log level
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.sock: Optional[socket.socket] = None
+        self.pids: List[int] = []
+        self.stopping = False
+
+    def run(self, model_names: List[str]) -> None:
+        """Preload models, fork the workers and supervise them until stopped.
+
+        Args:
+            model_names: Models to load before forking
+        """
+        preload(model_names)
+        self.sock = bind_socket(self.host, self.port)
+
+        # Objects that exist now are shared with every worker; keep the
+        # collector from touching them so their pages stay shared
+        gc.disable()
+        gc.collect()
+        gc.freeze()
+
+        for _ in range(self.workers):
+            self.spawn_worker()
+        logger.info(f"Started {self.workers} workers on {self.host}:{self.port}")
+
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+
+        next_report = time.monotonic() + min(MEMORY_REPORT_INTERVAL, 30) if MEMORY_REPORT_INTERVAL else None
+        while not self.stopping:
+            self.reap_workers(restart=True)
+            if next_report is not None and time.monotonic() >= next_report:
+                log_worker_memory(self.pids)
+                next_report = time.monotonic() + MEMORY_REPORT_INTERVAL
+            time.sleep(1)
+
+        self.stop_workers()
+
+    def spawn_worker(self) -> None:
+        """Fork one worker process."""
+        pid = os.fork()
+        if pid:
+            self.pids.append(pid)
+            return
+
+        # Worker process: serve until told to stop, never return to the master loop
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            init_worker(self.workers)
+            from search_suggest.api import app
+
+            config = uvicorn.Config(app, log_level=self.log_level, timeout_graceful_shutdown=int(GRACEFUL_TIMEOUT))
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except Exception:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def reap_workers(self, restart: bool) -> None:
+        """Collect exited workers, replacing them unless shutting down.
+
+        Args:
+            restart: Fork a replacement for each exited worker
+        """
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.pids = []
+                return
+            if pid == 0:
+                return
+            if pid in self.pids:
+                self.pids.remove(pid)
+                if self.stopping:
+                    logger.info(f"Worker {pid} stopped")
+                    continue
+                logger.warning(f"Worker {pid} exited with status {status}")
+                if restart:
+                    self.spawn_worker()
+
+    def handle_stop(self, signum: int, frame) -> None:
+        """Signal handler starting a graceful shutdown."""
+        self.stopping = True
+
+    def stop_workers(self) -> None:
+        """Ask workers to finish in-flight requests, then kill stragglers."""
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.pids and time.monotonic() < deadline:
+            self.reap_workers(restart=False)
+            time.sleep(0.1)
+
+        for pid in self.pids:
+            logger.warning(f"Killing worker {pid} after {GRACEFUL_TIMEOUT}s")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.reap_workers(restart=False)
+
+
+def main():
+    """Run the pre-fork server."""
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the search suggestions API")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port to bind")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Number of worker processes")
+    parser.add_argument(
+        "--preload-models",
+        nargs="+",
+        default=PRELOAD_MODELS,
+        help="Models loaded once in the master and shared by all workers"
+    )
+    parser.add_argument("--log-level", default="info", help="Log level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+
+    if not hasattr(os, "fork"):
+        # No fork on this platform: a single process still gets the preload
+        preload(args.preload_models)
+        from search_suggest.api import app
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    Master(args.host, args.port, args.workers, log_level=args.log_level).run(args.preload_models)
+
+
+if __name__ == "__main__":
+    main()
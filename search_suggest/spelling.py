@@ -0,0 +1,311 @@
+"""
+Typo correction of query terms against the taxonomy's vocabulary.
+
+The index uses symmetric deletes (as in SymSpell): every vocabulary word is
+stored under each string obtained by deleting up to ``max_distance``
+characters from its prefix. A misspelled term generates its own deletes,
+and any word sharing one of them is a candidate within that edit distance.
+Lookups touch a handful of dictionary keys instead of scanning the
+vocabulary, so correcting a query takes microseconds.
+
+The vocabulary holds only the taxonomy's words, so many valid product words
+("sneakers", "airpods") are a single edit from an unrelated category word
+("speakers", "airpots"). A candidate is therefore accepted only if every
+edit is one a typist plausibly makes: a dropped letter, swapped letters, or
+a neighbouring key hit instead of or next to the right one.
+"""
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import os
+import re
+
+from search_suggest.taxonomy import TaxonomyParser
+
+logger = logging.getLogger(__name__)
+
+# Maximum edit distance of a correction
+SPELLING_MAX_DISTANCE = int(os.getenv("SPELLING_MAX_DISTANCE", "2"))
+# Terms shorter than this are never corrected; terms shorter than twice it
+# are corrected by at most one edit
+SPELLING_MIN_LENGTH = int(os.getenv("SPELLING_MIN_LENGTH", "4"))
+# Characters of each word the deletes are generated from
+SPELLING_PREFIX_LENGTH = 7
+# Distinct terms whose lookups are remembered
+SPELLING_CACHE_SIZE = 65536
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm")
+
+
+def keyboard_neighbours(rows: Tuple[str, ...]) -> Dict[str, Set[str]]:
+    """Keys next to each key of a keyboard, including the rows above and below.
+
+    Args:
+        rows: Letters of each keyboard row, top to bottom
+
+    Returns:
+        Mapping of each letter to the letters of the keys around it
+    """
+    neighbours: Dict[str, Set[str]] = {}
+    for r, row in enumerate(rows):
+        for c, key in enumerate(row):
+            keys = neighbours.setdefault(key, set())
+            for other_r in (r - 1, r, r + 1):
+                if 0 <= other_r < len(rows):
+                    keys.update(rows[other_r][max(c - 1, 0):c + 2])
+            keys.discard(key)
+    return neighbours
+
+
+KEYBOARD_NEIGHBOURS = keyboard_neighbours(KEYBOARD_ROWS)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein distance (optimal string alignment) between two strings.
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Distances above this are reported as ``max_distance + 1``
+
+    Returns:
+        Number of insertions, deletions, substitutions and adjacent
+        transpositions turning ``a`` into ``b``
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def typo_distance(term: str, word: str, max_distance: int) -> int:
+    """Edit distance from a word to a term, counting only plausible typos.
+
+    Like ``edit_distance``, but a substitution must hit a neighbouring key,
+    and an extra letter in the term must repeat or neighbour a letter next
+    to it. Other edits make the pair unreachable.
+
+    Args:
+        term: Term as typed
+        word: Vocabulary word it may be a typo of
+        max_distance: Distances above this are reported as ``max_distance + 1``
+
+    Returns:
+        Number of plausible edits turning ``word`` into ``term``, or
+        ``max_distance + 1``
+    """
+    unreachable = max_distance + 1
+    if abs(len(term) - len(word)) > max_distance:
+        return unreachable
+
+    def substitution(typed: str, intended: str) -> int:
+        if typed == intended:
+            return 0
+        if typed in KEYBOARD_NEIGHBOURS.get(intended, ()):
+            return 1
+        return unreachable
+
+    def insertion(i: int) -> int:
+        extra = term[i]
+        around = term[max(i - 1, 0):i] + term[i + 1:i + 2]
+        if any(extra == key or extra in KEYBOARD_NEIGHBOURS.get(key, ()) for key in around):
+            return 1
+        return unreachable
+
+    previous2: List[int] = []
+    previous = list(range(len(word) + 1))
+    for i in range(1, len(term) + 1):
+        current = [min(previous[0] + insertion(i - 1), unreachable)] + [0] * len(word)
+        for j in range(1, len(word) + 1):
+            current[j] = min(
+                previous[j] + insertion(i - 1),
+                current[j - 1] + 1,
+                previous[j - 1] + substitution(term[i - 1], word[j - 1]),
+                unreachable
+            )
+            if i > 1 and j > 1 and term[i - 1] == word[j - 2] and term[i - 2] == word[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return unreachable
+        previous2, previous = previous, current
+    return min(previous[-1], unreachable)
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings made by deleting up to ``max_distance`` characters from a word.
+
+    Args:
+        word: Word to delete characters from
+        max_distance: Maximum number of characters deleted
+
+    Returns:
+        Set of variants, including the word itself
+    """
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {
+            variant[:i] + variant[i + 1:]
+            for variant in frontier if len(variant) > 1
+            for i in range(len(variant))
+        }
+        variants |= frontier
+    return variants
+
+
+class SpellingIndex:
+    """Symmetric-delete index over a vocabulary."""
+
+    def __init__(
+        self,
+        word_counts: Dict[str, int],
+        max_distance: int = SPELLING_MAX_DISTANCE,
+        min_length: int = SPELLING_MIN_LENGTH
+    ):
+        """Build the index.
+
+        Args:
+            word_counts: Vocabulary words and how often each occurs; the
+                more frequent word wins between equally close candidates
+            max_distance: Maximum edit distance of a correction
+            min_length: Terms shorter than this are never corrected
+        """
+        self.word_counts = dict(word_counts)
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self._deletes: Dict[str, List[str]] = {}
+        for word in self.word_counts:
+            for variant in deletes(word[:SPELLING_PREFIX_LENGTH], max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+        # Queries repeat, so most terms are looked up many times
+        self.lookup = lru_cache(maxsize=SPELLING_CACHE_SIZE)(self.lookup)
+
+    @classmethod
+    def from_taxonomy(cls, taxonomy_file: Path, **kwargs) -> "SpellingIndex":
+        """Build an index over the words of a taxonomy's category names.
+
+        Args:
+            taxonomy_file: Path to the taxonomy file
+            **kwargs: Passed on to the constructor
+
+        Returns:
+            Spelling index
+        """
+        parser = TaxonomyParser(taxonomy_file)
+        return cls(vocabulary(category["name"] for category in parser.categories.values()), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.word_counts)
+
+    def lookup(self, term: str) -> Optional[str]:
+        """Find the vocabulary word closest to a term.
+
+        Only words starting with the same letter are considered: typos
+        rarely hit the first letter, while brand names ("iphone") and
+        compounds often differ from a vocabulary word right there. The
+        remaining edits must all be plausible typos (see ``typo_distance``).
+
+        Args:
+            term: Lowercase term
+
+        Returns:
+            Correction, or None if the term is known (or the singular or
+            plural of a known word), too short, or nothing in the vocabulary
+            is close enough
+        """
+        if len(term) < self.min_length or self.is_known(term):
+            return None
+        max_distance = self.max_distance if len(term) >= 2 * self.min_length else min(self.max_distance, 1)
+
+        best: Optional[Tuple[int, int, str]] = None
+        seen: Set[str] = set()
+        for variant in deletes(term[:SPELLING_PREFIX_LENGTH], max_distance):
+            for word in self._deletes.get(variant, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                if word[0] != term[0]:
+                    continue
+                distance = typo_distance(term, word, max_distance)
+                if distance > max_distance:
+                    continue
+                candidate = (distance, -self.word_counts[word], word)
+                if best is None or candidate < best:
+                    best = candidate
+        return best[2] if best is not None else None
+
+    def is_known(self, term: str) -> bool:
+        """Whether a term, or its singular or plural, is in the vocabulary."""
+        return any(
+            form in self.word_counts
+            for form in (term, term + "s", term + "es", term[:-1] if term.endswith("s") else term)
+        )
+
+    def correct(self, query: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """Replace misspelled words of a query with their corrections.
+
+        Words are compared case-insensitively; a corrected word is written in
+        lowercase, everything else in the query is kept as typed.
+
+        Args:
+            query: Raw query
+
+        Returns:
+            Tuple of (corrected query, list of (original word, correction))
+        """
+        corrections: List[Tuple[str, str]] = []
+
+        def replace(match: "re.Match[str]") -> str:
+            word = match.group(0)
+            correction = self.lookup(word.lower())
+            if correction is None:
+                return word
+            corrections.append((word, correction))
+            return correction
+
+        corrected = WORD_PATTERN.sub(replace, query)
+        return corrected, corrections
+
+
+def vocabulary(texts: Iterable[str]) -> Counter:
+    """Count the lowercase words of some texts.
+
+    Args:
+        texts: Texts such as category names
+
+    Returns:
+        Counter of words
+    """
+    return Counter(word.lower() for text in texts for word in WORD_PATTERN.findall(text))
+
+
+def load_spelling_index(taxonomy_file: Path) -> Optional[SpellingIndex]:
+    """Build the spelling index the API corrects queries with.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+
+    Returns:
+        Spelling index, or None if the taxonomy file is missing
+    """
+    if not taxonomy_file.exists():
+        logger.warning(f"No taxonomy at {taxonomy_file}; queries will not be spell-corrected")
+        return None
+    index = SpellingIndex.from_taxonomy(taxonomy_file)
+    logger.info(f"Built spelling index over {len(index)} words")
+    return index
@@ -2,7 +2,44 @@
 Taxonomy parser for Google Merchant Categories.
 """
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Set
+import heapq
+import itertools
+import json
+import tempfile
+
+# Descendant names kept per level below a category when streaming; past this
+# the rich text is longer than any supported model reads
+STREAM_MAX_DESCENDANTS = 512
+# Lines sorted in memory at a time by the external sort
+SORT_CHUNK_LINES = 500_000
+
+
+def parse_category_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parse one ``<id> - <path>`` taxonomy line.
+
+    Args:
+        line: Line from a taxonomy file
+
+    Returns:
+        Category dictionary, or None for comments, blank and malformed lines
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    try:
+        id_part, category_part = line.split(" - ", 1)
+    except ValueError:
+        return None
+    category_path = category_part.strip()
+    categories = category_path.split(" > ")
+    return {
+        "id": id_part.strip(),
+        "full_path": category_path,
+        "path_parts": categories,
+        "level": len(categories),
+        "name": categories[-1]
+    }
 
 
 class TaxonomyParser:
@@ -23,30 +60,9 @@ class TaxonomyParser:
         """Parse the taxonomy file and build the category hierarchy."""
         with open(self.taxonomy_file, "r", encoding="utf-8") as f:
             for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-
-                # Parse the category line
-                try:
-                    id_part, category_part = line.split(" - ", 1)
-                    category_id = id_part.strip()
-                    category_path = category_part.strip()
-                    
-                    # Split the category path into individual categories
-                    categories = category_path.split(" > ")
-                    
-                    # Store the category with its full path and ID
-                    self.categories[category_id] = {
-                        "id": category_id,
-                        "full_path": category_path,
-                        "path_parts": categories,
-                        "level": len(categories),
-                        "name": categories[-1]
-                    }
-                except ValueError:
-                    # Skip malformed lines
-                    continue
+                category = parse_category_line(line)
+                if category is not None:
+                    self.categories[category["id"]] = category
 
     def _build_category_hierarchy(self) -> None:
         """Build a hierarchy of categories for efficient lookup of subcategories."""
@@ -104,11 +120,20 @@ class TaxonomyParser:
         
         return subcategory_names
 
-    def create_rich_category_text(self, category_id: str) -> str:
+    def create_rich_category_text(
+        self,
+        category_id: str,
+        token_budget: Optional[int] = None,
+        token_counts: Optional[Dict[str, int]] = None
+    ) -> str:
         """Create rich text for a category by combining it with its subcategories.
 
         Args:
             category_id: ID of the category
+            token_budget: Optional number of tokens the text must fit in;
+                nearer subcategories are kept first (see ``select_within_budget``)
+            token_counts: Token count of the path and of every subcategory
+                name, required with ``token_budget``
 
         Returns:
             Rich text representation of the category
@@ -121,20 +146,240 @@ class TaxonomyParser:
         rich_text = category["full_path"]
         
         # Add subcategory names
-        subcategory_names = self.get_subcategory_names(category_id)
+        if token_budget is None:
+            subcategory_names = self.get_subcategory_names(category_id)
+        else:
+            descendants = [
+                (self.categories[sub_id]["level"], self.categories[sub_id]["name"])
+                for sub_id in category.get("subcategory_ids", [])
+                if sub_id != category_id and sub_id in self.categories
+            ]
+            subcategory_names = select_within_budget(
+                token_counts[category["full_path"]],
+                descendants,
+                token_counts,
+                token_budget
+            )
         if subcategory_names:
             rich_text += " " + " ".join(subcategory_names)
         
         return rich_text
 
-    def get_rich_categories_for_embedding(self, max_level: int = 3) -> List[Tuple[str, str]]:
+    def get_rich_categories_for_embedding(
+        self,
+        max_level: int = 3,
+        token_budget: Optional[int] = None,
+        count_tokens: Optional[Callable[[List[str]], List[int]]] = None
+    ) -> List[Tuple[str, str]]:
         """Get categories with rich text for embedding.
 
         Args:
             max_level: Maximum level of categories to include
+            token_budget: Optional number of tokens each text must fit in,
+                usually the model's ``EmbeddingService.token_budget``
+            count_tokens: Function counting the tokens of each text, required
+                with ``token_budget``
 
         Returns:
             List of tuples with (category_id, rich_text)
         """
         categories = self.get_categories_up_to_level(max_level)
-        return [(cat["id"], self.create_rich_category_text(cat["id"])) for cat in categories]
+        token_counts = None
+        if token_budget is not None:
+            # Every path and name is tokenized once, in one batch
+            texts = list({cat["full_path"] for cat in categories} | {cat["name"] for cat in self.categories.values()})
+            token_counts = dict(zip(texts, count_tokens(texts)))
+        return [
+            (cat["id"], self.create_rich_category_text(cat["id"], token_budget, token_counts))
+            for cat in categories
+        ]
+
+
+def select_within_budget(
+    path_tokens: int,
+    descendants: Sequence[Tuple[int, str]],
+    token_counts: Dict[str, int],
+    token_budget: int
+) -> List[str]:
+    """Choose the descendant names that fit a token budget, nearest first.
+
+    Children are taken before grandchildren and so on; within a level the
+    file order decides. Selection stops at the first name that does not
+    fit. Names past the budget would be cut off by the model anyway, and
+    nearer descendants describe a category better than distant ones.
+
+    Args:
+        path_tokens: Tokens used by the category's own path
+        descendants: (level, name) of every descendant, in file order
+        token_counts: Token count of every name
+        token_budget: Tokens available for the whole text
+
+    Returns:
+        Chosen names, in file order
+    """
+    remaining = token_budget - path_tokens
+    chosen = set()
+    for i in sorted(range(len(descendants)), key=lambda i: descendants[i][0]):
+        cost = token_counts[descendants[i][1]]
+        if cost > remaining:
+            break
+        remaining -= cost
+        chosen.add(i)
+    return [name for i, (_, name) in enumerate(descendants) if i in chosen]
+
+
+def iter_rich_categories(
+    taxonomy_file: Path,
+    max_level: int = 3,
+    max_descendants: int = STREAM_MAX_DESCENDANTS,
+    token_budget: Optional[int] = None,
+    count_tokens: Optional[Callable[[List[str]], List[int]]] = None
+) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Stream categories with their rich text without loading the taxonomy.
+
+    The file must list every category directly after its parent's subtree
+    has started, with each subtree contiguous, as the Google taxonomy does
+    (``sort_taxonomy_file`` puts any file in that order). Only the chain of
+    open ancestors is held in memory, so memory depends on the taxonomy's
+    depth and ``max_descendants``, not on its size. A category is yielded
+    once its subtree is complete, so children come before their parents.
+
+    The rich text matches ``TaxonomyParser.create_rich_category_text`` for
+    categories with up to ``max_descendants`` descendants on each level.
+    Every name costs at least one token, so with a ``token_budget`` no
+    larger than ``max_descendants`` the cap never changes the text.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories to yield (deeper ones still
+            contribute their names to their ancestors)
+        max_descendants: Maximum number of descendant names kept per level
+            below a category
+        token_budget: Optional number of tokens each text must fit in
+        count_tokens: Function counting the tokens of each text, required
+            with ``token_budget``
+
+    Yields:
+        Tuples of (category_id, rich_text, payload)
+
+    Raises:
+        ValueError: If a category does not follow its parent's subtree
+    """
+    # Open ancestors of the current line, outermost first, each with its
+    # descendants so far as {level: [(line number, name)]}
+    stack: List[Tuple[Dict[str, Any], Dict[int, List[Tuple[int, str]]]]] = []
+
+    def close(entry: Tuple[Dict[str, Any], Dict[int, List[Tuple[int, str]]]]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        category, levels = entry
+        if category["level"] > max_level:
+            return None
+        descendants = sorted(
+            (number, level, name) for level, names in levels.items() for number, name in names
+        )
+        names = [name for _, _, name in descendants]
+        if token_budget is not None and names:
+            texts = list({category["full_path"], *names})
+            token_counts = dict(zip(texts, count_tokens(texts)))
+            names = select_within_budget(
+                token_counts[category["full_path"]],
+                [(level, name) for _, level, name in descendants],
+                token_counts,
+                token_budget
+            )
+        rich_text = " ".join([category["full_path"]] + names)
+        payload = {key: category[key] for key in ("id", "name", "full_path", "level", "path_parts")}
+        return category["id"], rich_text, payload
+
+    with open(taxonomy_file, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            category = parse_category_line(line)
+            if category is None:
+                continue
+            parts = category["path_parts"]
+
+            # Leaving a subtree completes every category in it
+            while stack and stack[-1][0]["path_parts"] != parts[:len(stack[-1][0]["path_parts"])]:
+                item = close(stack.pop())
+                if item is not None:
+                    yield item
+            if stack and stack[-1][0]["path_parts"] == parts:
+                # Duplicate line for a category already open
+                continue
+            if len(parts) > 1 and (not stack or stack[-1][0]["path_parts"] != parts[:-1]):
+                raise ValueError(
+                    f"Category {category['id']} ({category['full_path']}) does not follow its parent; "
+                    f"sort the taxonomy with sort_taxonomy_file first"
+                )
+
+            for _, levels in stack:
+                names = levels.setdefault(category["level"], [])
+                if len(names) < max_descendants:
+                    names.append((number, category["name"]))
+            stack.append((category, {}))
+
+    while stack:
+        item = close(stack.pop())
+        if item is not None:
+            yield item
+
+
+def check_streaming_order(taxonomy_file: Path, max_level: int = 3) -> Optional[int]:
+    """Check that a taxonomy can be streamed, counting what it would yield.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        max_level: Maximum level of categories counted
+
+    Returns:
+        Number of categories ``iter_rich_categories`` yields, or None if the
+        file is not in hierarchical order
+    """
+    try:
+        return sum(1 for _ in iter_rich_categories(taxonomy_file, max_level, max_descendants=0))
+    except ValueError:
+        return None
+
+
+def sort_taxonomy_file(
+    taxonomy_file: Path,
+    output_file: Path,
+    chunk_lines: int = SORT_CHUNK_LINES
+) -> None:
+    """Sort a taxonomy by path with an external merge sort.
+
+    Sorted by path, every category follows its parent and every subtree is
+    contiguous, which is what ``iter_rich_categories`` needs. Chunks of
+    ``chunk_lines`` lines are sorted in memory and spilled to temporary
+    files, which are then merged, so files larger than RAM can be sorted.
+
+    Args:
+        taxonomy_file: Path to the taxonomy file
+        output_file: Path to write the sorted taxonomy to
+        chunk_lines: Number of lines sorted in memory at a time
+    """
+    def sort_key(category: Dict[str, Any]) -> List[str]:
+        return category["path_parts"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs: List[Path] = []
+        with open(taxonomy_file, "r", encoding="utf-8") as f:
+            categories = (category for category in map(parse_category_line, f) if category is not None)
+            while True:
+                chunk = sorted(itertools.islice(categories, chunk_lines), key=sort_key)
+                if not chunk:
+                    break
+                run = Path(tmp_dir) / f"run{len(runs)}.jsonl"
+                with open(run, "w", encoding="utf-8") as out:
+                    for category in chunk:
+                        out.write(json.dumps([category["path_parts"], category["id"]]) + "\n")
+                runs.append(run)
+
+        files = [open(run, "r", encoding="utf-8") for run in runs]
+        try:
+            merged = heapq.merge(*(map(json.loads, f) for f in files))
+            with open(output_file, "w", encoding="utf-8") as out:
+                for path_parts, category_id in merged:
+                    out.write(f"{category_id} - {' > '.join(path_parts)}\n")
+        finally:
+            for f in files:
+                f.close()
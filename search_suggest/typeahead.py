@@ -0,0 +1,106 @@
+"""
+Per-connection state for incremental type-ahead search.
+
+Each keystroke extends the text of the previous one, and its best matches
+are almost always among the previous matches. A session therefore keeps
+the top ``TYPEAHEAD_CANDIDATES`` results of its last full search together
+with their vectors. While the text only grows from that search's query, new
+keystrokes are answered by a dot product against those few vectors instead
+of another search over the whole collection.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import os
+
+import numpy as np
+
+# Results of a full search kept as candidates for the following keystrokes
+TYPEAHEAD_CANDIDATES = int(os.getenv("TYPEAHEAD_CANDIDATES", "100"))
+# Characters the text may grow past the last full search before searching again
+TYPEAHEAD_MAX_EXTENSION = int(os.getenv("TYPEAHEAD_MAX_EXTENSION", "8"))
+# Quiet time after a keystroke before it is searched; newer keystrokes replace it
+TYPEAHEAD_DEBOUNCE_MS = float(os.getenv("TYPEAHEAD_DEBOUNCE_MS", "30"))
+
+
+class Superseded(Exception):
+    """Raised inside a keystroke's search once a newer keystroke replaced it."""
+
+
+class TypeaheadSession:
+    """Candidates of one connection's last full search."""
+
+    def __init__(
+        self,
+        candidates: int = TYPEAHEAD_CANDIDATES,
+        max_extension: int = TYPEAHEAD_MAX_EXTENSION
+    ):
+        """Initialize the session.
+
+        Args:
+            candidates: Results of a full search kept for rescoring
+            max_extension: Characters the text may grow past the last full
+                search before searching again
+        """
+        self.candidates = candidates
+        self.max_extension = max_extension
+        self.base_query: Optional[str] = None
+        self.collection: Optional[str] = None
+        self.vector_name: Optional[str] = None
+        self._results: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None
+
+    def can_rescore(self, query: str, collection: Optional[str]) -> bool:
+        """Whether a query can be answered from the candidates.
+
+        Args:
+            query: New text
+            collection: Concrete collection the model searches now
+
+        Returns:
+            True if the text extends the last full search's query by at most
+            ``max_extension`` characters and the collection is unchanged
+        """
+        if self._vectors is None or self.base_query is None or collection != self.collection:
+            return False
+        base = self.base_query.casefold()
+        text = query.casefold()
+        return text.startswith(base) and len(text) - len(base) <= self.max_extension
+
+    def reset(
+        self,
+        query: str,
+        collection: Optional[str],
+        vector_name: Optional[str],
+        results: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Keep the results of a full search as the new candidates.
+
+        Args:
+            query: Query of the full search
+            collection: Concrete collection that was searched
+            vector_name: Name of its vector, if it has one
+            results: Search results, each with its ``vector``
+        """
+        results = [result for result in results if result.get("vector") is not None]
+        self.base_query = query
+        self.collection = collection
+        self.vector_name = vector_name
+        self._results = [{key: value for key, value in result.items() if key != "vector"} for result in results]
+        self._vectors = (
+            np.array([result["vector"] for result in results], dtype=np.float32) if results else None
+        )
+
+    def rescore(self, query_vector: Sequence[float], limit: int = 10) -> List[Dict[str, Any]]:
+        """Rank the candidates against a new query embedding.
+
+        Args:
+            query_vector: Unit-length embedding of the new text
+            limit: Maximum number of results to return
+
+        Returns:
+            Results shaped like search results, best first
+        """
+        if self._vectors is None:
+            return []
+        scores = self._vectors @ np.asarray(query_vector, dtype=np.float32)
+        order = np.argsort(-scores)[:limit]
+        return [dict(self._results[i], score=float(scores[i])) for i in order]
@@ -1,24 +1,164 @@
 """
 Vector store functionality using Qdrant.
 """
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any, TypeVar
+import json
+import re
 import uuid
 import os
+import threading
+import time
 from distutils.util import strtobool
 
+import httpx
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import ResponseHandlingException
+
+T = TypeVar("T")
+
+# Connection settings shared by every client in the process
+QDRANT_POOL_SIZE = int(os.environ.get("QDRANT_POOL_SIZE", "20"))
+QDRANT_KEEPALIVE_EXPIRY = float(os.environ.get("QDRANT_KEEPALIVE_EXPIRY", "30"))
+QDRANT_TIMEOUT = int(os.environ.get("QDRANT_TIMEOUT", "10"))
+QDRANT_RETRIES = int(os.environ.get("QDRANT_RETRIES", "2"))
+QDRANT_PREFER_GRPC = bool(strtobool(os.environ.get("QDRANT_PREFER_GRPC", "false").lower()))
+QDRANT_GRPC_PORT = int(os.environ.get("QDRANT_GRPC_PORT", "6334"))
+
+# Pooled clients keyed by (url, api_key, prefer_grpc), and the shared store
+_clients: Dict[Tuple[str, Optional[str], bool], QdrantClient] = {}
+_clients_lock = threading.Lock()
+_shared_vector_store: Optional["VectorStore"] = None
+
+
+def create_qdrant_client(
+    url: str,
+    api_key: Optional[str] = None,
+    prefer_grpc: bool = QDRANT_PREFER_GRPC
+) -> QdrantClient:
+    """Create a Qdrant client with pooled, keep-alive connections and retries.
+
+    Over REST the client uses a bounded httpx connection pool that keeps idle
+    connections alive. With ``prefer_grpc`` searches and upserts go over a
+    single multiplexed gRPC channel instead, which avoids JSON-encoding every
+    vector float; the channel itself retries unavailable calls.
+
+    Args:
+        url: Qdrant server URL
+        api_key: Qdrant API key
+        prefer_grpc: Use the gRPC transport where the client supports it
+
+    Returns:
+        Configured Qdrant client
+    """
+    limits = httpx.Limits(
+        max_connections=QDRANT_POOL_SIZE,
+        max_keepalive_connections=QDRANT_POOL_SIZE,
+        keepalive_expiry=QDRANT_KEEPALIVE_EXPIRY
+    )
+
+    # gRPC keeps its channel open with pings and retries unavailable calls
+    grpc_options = {
+        "grpc.keepalive_time_ms": int(QDRANT_KEEPALIVE_EXPIRY * 1000),
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.enable_retries": 1 if QDRANT_RETRIES else 0,
+        "grpc.service_config": json.dumps({
+            "methodConfig": [{
+                "name": [{}],
+                "retryPolicy": {
+                    "maxAttempts": min(QDRANT_RETRIES + 1, 5),
+                    "initialBackoff": "0.1s",
+                    "maxBackoff": "1s",
+                    "backoffMultiplier": 2,
+                    "retryableStatusCodes": ["UNAVAILABLE"]
+                }
+            }]
+        }) if QDRANT_RETRIES else "{}"
+    }
+
+    return QdrantClient(
+        url=url,
+        api_key=api_key or None,
+        prefer_grpc=prefer_grpc,
+        grpc_port=QDRANT_GRPC_PORT,
+        grpc_options=grpc_options,
+        timeout=QDRANT_TIMEOUT,
+        limits=limits
+    )
+
+
+def get_qdrant_client(
+    url: str,
+    api_key: Optional[str] = None,
+    prefer_grpc: Optional[bool] = None
+) -> QdrantClient:
+    """Get the process-wide pooled client for a Qdrant server.
+
+    Args:
+        url: Qdrant server URL
+        api_key: Qdrant API key
+        prefer_grpc: Use the gRPC transport (defaults to QDRANT_PREFER_GRPC)
+
+    Returns:
+        Shared Qdrant client
+    """
+    if prefer_grpc is None:
+        prefer_grpc = QDRANT_PREFER_GRPC
+    key = (url, api_key or None, prefer_grpc)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = create_qdrant_client(url, api_key, prefer_grpc)
+        return _clients[key]
+
+
+def reset_clients() -> None:
+    """Forget pooled clients and the shared store.
+
+    Forked worker processes call this so they open their own connections
+    instead of sharing the parent's sockets and gRPC channels.
+    """
+    global _clients_lock, _shared_vector_store
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    _shared_vector_store = None
+
+
+def get_vector_store() -> "VectorStore":
+    """Get the process-wide vector store configured from the environment.
+
+    Returns:
+        Shared vector store
+    """
+    global _shared_vector_store
+    with _clients_lock:
+        store = _shared_vector_store
+    if store is None:
+        store = VectorStore()
+        with _clients_lock:
+            if _shared_vector_store is None:
+                _shared_vector_store = store
+            store = _shared_vector_store
+    return store
 
 
 class VectorStore:
     """Vector store for managing embeddings in Qdrant."""
 
-    def __init__(self, url: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        prefer_grpc: Optional[bool] = None
+    ):
         """Initialize the vector store.
 
+        Stores pointing at the same server share one pooled client.
+
         Args:
             url: Qdrant server URL (optional if using environment variables)
             api_key: Qdrant API key (optional if using environment variables)
+            prefer_grpc: Use the gRPC transport (defaults to QDRANT_PREFER_GRPC)
         """
         # Check if we should use a local Qdrant instance
         use_local_qdrant = bool(strtobool(os.environ.get("USE_LOCAL_QDRANT", "false").lower()))
@@ -26,7 +166,7 @@ class VectorStore:
         if use_local_qdrant:
             # Use the local Qdrant URL from environment variable or default to the container service name
             local_url = os.environ.get("LOCAL_QDRANT_URL", "http://qdrant:6333")
-            self.client = QdrantClient(url=local_url)
+            self.client = get_qdrant_client(local_url, prefer_grpc=prefer_grpc)
             print(f"Using local Qdrant instance at {local_url}")
         else:
             # Use the provided URL and API key or get from environment variables
@@ -36,14 +176,36 @@ class VectorStore:
             if not url:
                 raise ValueError("Qdrant URL must be provided either directly or via QDRANT_URL environment variable")
                 
-            self.client = QdrantClient(url=url, api_key=api_key)
+            self.client = get_qdrant_client(url, api_key, prefer_grpc=prefer_grpc)
             print(f"Using remote Qdrant instance at {url}")
         
+    def _with_retries(self, operation: Callable[[], T]) -> T:
+        """Run a client call, retrying REST transport failures with backoff.
+
+        gRPC calls are retried by the channel's own retry policy.
+
+        Args:
+            operation: Zero-argument callable making the client call
+
+        Returns:
+            Result of the call
+        """
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except ResponseHandlingException:
+                if attempt >= QDRANT_RETRIES:
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+                attempt += 1
+
     def create_collection(
         self, 
         collection_name: str, 
         vector_size: int = 1536,
-        distance: str = "cosine"
+        distance: str = "cosine",
+        vector_name: Optional[str] = None
     ) -> None:
         """Create a collection for storing vectors.
 
@@ -51,6 +213,8 @@ class VectorStore:
             collection_name: Name of the collection
             vector_size: Size of the embedding vectors
             distance: Distance metric to use (cosine, euclid, dot)
+            vector_name: Optional name for the vector, used to record how
+                reduced embeddings were produced (e.g. "pca-128")
         """
         # Check if collection already exists
         collections = self.client.get_collections().collections
@@ -67,14 +231,39 @@ class VectorStore:
         
         distance_enum = distance_map.get(distance.lower(), models.Distance.COSINE)
         
+        vector_params = models.VectorParams(
+            size=vector_size,
+            distance=distance_enum,
+        )
+        
         # Create the collection
         self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=models.VectorParams(
-                size=vector_size,
-                distance=distance_enum,
-            )
+            vectors_config={vector_name: vector_params} if vector_name else vector_params
         )
+
+    def get_vector_spec(self, collection_name: str) -> Tuple[Optional[str], int]:
+        """Get the vector name and size of a collection.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Tuple of (vector name or None for an unnamed vector, vector size)
+        """
+        vectors = self.client.get_collection(collection_name).config.params.vectors
+        if isinstance(vectors, dict):
+            name, params = next(iter(vectors.items()))
+            return name, params.size
+        return None, vectors.size if vectors else 0
+    
+    def collection_names(self) -> List[str]:
+        """List the names of all collections in the vector store.
+        
+        Returns:
+            Collection names
+        """
+        return [collection.name for collection in self.client.get_collections().collections]
     
     def list_collections(self) -> List[Dict[str, Any]]:
         """List all collections in the vector store.
@@ -91,9 +280,11 @@ class VectorStore:
                 collection_info = self.client.get_collection(collection.name)
                 vector_count = collection_info.vectors_count
                 
-                # Get collection config
-                config = collection_info.config
-                vector_size = config.params.vectors.size if config.params.vectors else 0
+                # Get collection config (named vectors hold reduced embeddings)
+                vectors = collection_info.config.params.vectors
+                if isinstance(vectors, dict):
+                    vectors = next(iter(vectors.values()), None)
+                vector_size = vectors.size if vectors else 0
                 
                 result.append({
                     "name": collection.name,
@@ -115,7 +306,8 @@ class VectorStore:
         collection_name: str, 
         ids: List[str], 
         vectors: List[List[float]], 
-        payloads: Optional[List[Dict[str, Any]]] = None
+        payloads: Optional[List[Dict[str, Any]]] = None,
+        vector_name: Optional[str] = None
     ) -> None:
         """Insert or update vectors in the collection.
 
@@ -124,35 +316,251 @@ class VectorStore:
             ids: List of vector IDs (strings)
             vectors: List of embedding vectors
             payloads: Optional list of payloads for each vector
+            vector_name: Name of the collection's vector, if it has one
         """
-        if payloads is None:
-            payloads = [{} for _ in ids]
-            
-        # Ensure each payload has the original ID stored
-        for i, (id_str, payload) in enumerate(zip(ids, payloads)):
-            # Make a copy of the payload to avoid modifying the original
-            payloads[i] = payload.copy()
-            # Store the original ID in the payload
-            payloads[i]["original_id"] = id_str
-            
-        # Convert string IDs to numeric IDs for Qdrant
-        # We'll use a hash of the string ID to generate a numeric ID
-        numeric_ids = [abs(hash(id_str)) % (2**63) for id_str in ids]
+        numeric_ids, payloads = self._prepare_points(ids, payloads)
             
         points = [
             models.PointStruct(
                 id=numeric_id,
-                vector=vector,
+                vector={vector_name: vector} if vector_name else vector,
                 payload=payload
             )
             for numeric_id, vector, payload in zip(numeric_ids, vectors, payloads)
         ]
         
-        self.client.upsert(
+        self._with_retries(lambda: self.client.upsert(
             collection_name=collection_name,
             points=points
+        ))
+    
+    def upsert_array(
+        self,
+        collection_name: str,
+        ids: List[str],
+        vectors: np.ndarray,
+        payloads: Optional[List[Dict[str, Any]]] = None,
+        vector_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        parallel: int = 1
+    ) -> None:
+        """Insert or update a matrix of vectors in the collection.
+        
+        The matrix is handed to the client's bulk uploader as is, skipping
+        the per-point ``PointStruct`` objects ``upsert_vectors`` builds.
+        
+        Args:
+            collection_name: Name of the collection
+            ids: List of vector IDs (strings), one per row
+            vectors: float32 matrix of shape (len(ids), dimension)
+            payloads: Optional list of payloads for each vector
+            vector_name: Name of the collection's vector, if it has one
+            batch_size: Points per request (defaults to all in one request)
+            parallel: Number of processes uploading batches concurrently
+        """
+        if vectors.shape[0] != len(ids):
+            raise ValueError(f"Got {len(ids)} IDs for {vectors.shape[0]} vectors")
+        
+        numeric_ids, payloads = self._prepare_points(ids, payloads)
+        self.client.upload_collection(
+            collection_name=collection_name,
+            vectors={vector_name: vectors} if vector_name else vectors,
+            payload=payloads,
+            ids=numeric_ids,
+            batch_size=batch_size or max(len(ids), 1),
+            parallel=parallel,
+            max_retries=QDRANT_RETRIES + 1,
+            wait=True
         )
     
+    def _prepare_points(
+        self,
+        ids: List[str],
+        payloads: Optional[List[Dict[str, Any]]]
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Map string IDs to Qdrant point IDs and record them in the payloads.
+        
+        Args:
+            ids: List of vector IDs (strings)
+            payloads: Optional list of payloads for each vector
+            
+        Returns:
+            Tuple of (numeric point IDs, payload copies with ``original_id``)
+        """
+        if payloads is None:
+            payloads = [{} for _ in ids]
+        
+        # Copy each payload to avoid modifying the original, and store the
+        # original ID in it
+        payloads = [dict(payload, original_id=id_str) for id_str, payload in zip(ids, payloads)]
+        
+        # Convert string IDs to numeric IDs for Qdrant
+        # We'll use a hash of the string ID to generate a numeric ID
+        numeric_ids = [abs(hash(id_str)) % (2**63) for id_str in ids]
+        return numeric_ids, payloads
+    
+    def count(self, collection_name: str) -> int:
+        """Count the points in a collection exactly.
+
+        Args:
+            collection_name: Name of the collection (or alias)
+
+        Returns:
+            Number of points
+        """
+        return self.client.count(collection_name=collection_name, exact=True).count
+
+    def export_points(
+        self,
+        collection_name: str,
+        vector_name: Optional[str] = None,
+        batch_size: int = 256
+    ) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+        """Read every point of a collection, vectors included.
+
+        Vectors are written batch by batch into one float32 matrix sized
+        from the point count, so no list of per-point float lists is built.
+
+        Args:
+            collection_name: Name of the collection (or alias)
+            vector_name: Name of the collection's vector, if it has one
+            batch_size: Number of points fetched per scroll request
+
+        Returns:
+            Tuple of (original IDs, float32 vector matrix, payloads)
+        """
+        ids: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        dimension = self.get_vector_spec(collection_name)[1]
+        vectors = np.empty((self.count(collection_name), dimension), dtype=np.float32)
+        offset = None
+        while True:
+            points, offset = self._with_retries(lambda: self.client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=[vector_name] if vector_name else True
+            ))
+            start = len(ids)
+            if start + len(points) > len(vectors):
+                # Points were added since the count
+                missing = start + len(points) - len(vectors)
+                vectors = np.concatenate([vectors, np.empty((missing, vectors.shape[1]), dtype=np.float32)])
+            for i, point in enumerate(points, start):
+                payload = dict(point.payload or {})
+                ids.append(payload.pop("original_id", str(point.id)))
+                vectors[i] = point.vector[vector_name] if vector_name else point.vector
+                payloads.append(payload)
+            if offset is None:
+                break
+        return ids, vectors[:len(ids)], payloads
+
+    def save_matrix(self, collection_name: str, matrix: np.ndarray) -> None:
+        """Store a matrix in a collection of its own, one point per row.
+
+        The collection uses dot-product distance, which stores vectors as
+        given; cosine collections would normalize the rows. An existing
+        collection of that name is replaced.
+
+        Args:
+            collection_name: Name of the collection
+            matrix: Matrix of shape (rows, columns)
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.delete_collection(collection_name)
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=matrix.shape[1], distance=models.Distance.DOT)
+        )
+        self.client.upload_collection(
+            collection_name=collection_name,
+            vectors=matrix,
+            ids=list(range(matrix.shape[0])),
+            batch_size=256,
+            max_retries=QDRANT_RETRIES + 1,
+            wait=True
+        )
+
+    def load_matrix(self, collection_name: str) -> Optional[np.ndarray]:
+        """Read a matrix stored by ``save_matrix``.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            float32 matrix, or None if the collection does not exist
+        """
+        if collection_name not in self.collection_names():
+            return None
+        rows: Dict[int, List[float]] = {}
+        offset = None
+        while True:
+            points, offset = self._with_retries(lambda: self.client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True
+            ))
+            rows.update((int(point.id), point.vector) for point in points)
+            if offset is None:
+                break
+        return np.array([rows[i] for i in sorted(rows)], dtype=np.float32)
+
+    def get_alias_target(self, alias_name: str) -> Optional[str]:
+        """Get the collection an alias points to.
+
+        Args:
+            alias_name: Name of the alias
+
+        Returns:
+            Collection name, or None if the alias does not exist
+        """
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == alias_name:
+                return alias.collection_name
+        return None
+
+    def list_versions(self, alias_name: str) -> List[Tuple[int, str]]:
+        """List the versioned collections built for an alias.
+
+        Versioned collections are named ``<alias>_v<N>``.
+
+        Args:
+            alias_name: Name of the alias
+
+        Returns:
+            List of (version, collection name) tuples, oldest first
+        """
+        pattern = re.compile(rf"^{re.escape(alias_name)}_v(\d+)$")
+        versions = []
+        for collection in self.client.get_collections().collections:
+            match = pattern.match(collection.name)
+            if match:
+                versions.append((int(match.group(1)), collection.name))
+        return sorted(versions)
+
+    def swap_alias(self, alias_name: str, collection_name: str) -> None:
+        """Point an alias at a collection in a single atomic operation.
+
+        Searches against the alias see either the old or the new collection,
+        never a mix or a missing alias.
+
+        Args:
+            alias_name: Name of the alias
+            collection_name: Collection the alias should point to
+        """
+        operations: List[Any] = []
+        if self.get_alias_target(alias_name) is not None:
+            operations.append(models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=alias_name)
+            ))
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias_name)
+        ))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection from the vector store.
         
@@ -172,7 +580,10 @@ class VectorStore:
         self, 
         collection_name: str, 
         query_vector: List[float], 
-        limit: int = 10
+        limit: int = 10,
+        vector_name: Optional[str] = None,
+        timeout: Optional[int] = None,
+        with_vectors: bool = False
     ) -> List[Dict]:
         """Search for similar vectors in the collection.
 
@@ -180,23 +591,72 @@ class VectorStore:
             collection_name: Name of the collection
             query_vector: Query embedding vector
             limit: Maximum number of results to return
+            vector_name: Name of the collection's vector, if it has one
+            timeout: Optional server-side timeout in seconds, e.g. the time
+                left before the request's deadline
+            with_vectors: Also return each result's stored ``vector``
 
         Returns:
             List of search results
         """
-        results = self.client.search(
+        results = self._with_retries(lambda: self.client.search(
             collection_name=collection_name,
-            query_vector=query_vector,
+            query_vector=(vector_name, query_vector) if vector_name else query_vector,
             limit=limit,
             with_payload=True,
-            with_vectors=False
-        )
+            with_vectors=([vector_name] if vector_name else True) if with_vectors else False,
+            timeout=timeout
+        ))
         
-        return [
-            {
+        return self._format_results(results, vector_name)
+    
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: np.ndarray,
+        limit: int = 10,
+        vector_name: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """Search for several query vectors in one request.
+        
+        Args:
+            collection_name: Name of the collection
+            query_vectors: Matrix of shape (queries, dimension)
+            limit: Maximum number of results to return per query
+            vector_name: Name of the collection's vector, if it has one
+            
+        Returns:
+            List of search results for each query
+        """
+        requests = [
+            models.SearchRequest(
+                vector=models.NamedVector(name=vector_name, vector=vector) if vector_name else vector,
+                limit=limit,
+                with_payload=True,
+                with_vector=False
+            )
+            for vector in np.asarray(query_vectors, dtype=np.float32).tolist()
+        ]
+        batches = self._with_retries(lambda: self.client.search_batch(
+            collection_name=collection_name,
+            requests=requests
+        ))
+        return [self._format_results(results) for results in batches]
+    
+    def _format_results(
+        self,
+        results: List[models.ScoredPoint],
+        vector_name: Optional[str] = None
+    ) -> List[Dict]:
+        """Convert scored points to result dictionaries, with vectors if fetched."""
+        formatted = []
+        for result in results:
+            item = {
                 "id": result.payload.get("original_id", str(result.id)),
                 "score": result.score,
                 "payload": result.payload
             }
-            for result in results
-        ]
+            if result.vector is not None:
+                item["vector"] = result.vector[vector_name] if vector_name else result.vector
+            formatted.append(item)
+        return formatted
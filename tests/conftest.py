@@ -2,9 +2,15 @@
 Shared fixtures for pytest.
 """
 import os
+import zlib
+import numpy as np
 import pytest
 from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from transformers import BertConfig, BertModel, BertTokenizer
+from search_suggest import populate_db
 from search_suggest.embeddings import EmbeddingService
+from search_suggest.local_index import normalize_rows
 from search_suggest.vector_store import VectorStore
 
 # Load environment variables before tests
@@ -39,3 +45,78 @@ def embedding_services():
         services[model_name] = EmbeddingService(model_name=model_name)
     
     return services
+
+TAXONOMY = """# Google_Product_Taxonomy_Version: test
+1 - Animals & Pet Supplies
+2 - Animals & Pet Supplies > Pet Supplies
+3 - Animals & Pet Supplies > Pet Supplies > Bird Supplies
+4 - Animals & Pet Supplies > Pet Supplies > Cat Supplies
+222 - Electronics
+278 - Electronics > Computers
+328 - Electronics > Computers > Laptops
+"""
+
+class HashingEmbeddingService:
+    """Deterministic stand-in for EmbeddingService that needs no model download."""
+    dimension = 16
+
+    def get_embedding_dimension(self, model_name=None):
+        return self.dimension
+
+    def count_tokens(self, texts, model_name=None):
+        return [len(text.split()) for text in texts]
+
+    def token_budget(self, model_name=None):
+        return 512
+
+    def encode(self, texts, model_name=None, reducer=None, batch_size=32):
+        vectors = np.array([
+            np.random.default_rng(zlib.crc32(text.encode())).standard_normal(self.dimension)
+            for text in texts
+        ], dtype=np.float32)
+        if reducer is not None:
+            return reducer.transform(vectors)
+        return normalize_rows(vectors)
+
+    def create_embedding(self, text, model_name=None, reducer=None):
+        return self.encode([text], reducer=reducer)[0].tolist()
+
+@pytest.fixture
+def hashing_service():
+    """Embedding service stand-in that needs no model download."""
+    return HashingEmbeddingService()
+
+@pytest.fixture
+def memory_store(monkeypatch):
+    """Vector store backed by Qdrant's in-memory mode."""
+    store = VectorStore.__new__(VectorStore)
+    store.client = QdrantClient(":memory:")
+    monkeypatch.setattr(populate_db, "get_vector_store", lambda: store)
+    monkeypatch.setenv("QDRANT_URL", "http://unused")
+    monkeypatch.setenv("QDRANT_API_KEY", "unused")
+    return store
+
+@pytest.fixture
+def taxonomy_file(tmp_path):
+    """Small taxonomy file."""
+    path = tmp_path / "taxonomy.txt"
+    path.write_text(TAXONOMY, encoding="utf-8")
+    return path
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    """Tiny BERT checkpoint on disk, standing in for a hub model."""
+    path = tmp_path / "tiny-bert"
+    path.mkdir()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "laptop", "bags", "coffee", "maker"]
+    (path / "vocab.txt").write_text("\n".join(vocab), encoding="utf-8")
+    BertTokenizer(str(path / "vocab.txt")).save_pretrained(str(path))
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32
+    )
+    BertModel(config).save_pretrained(str(path))
+    return str(path)
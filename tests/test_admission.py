@@ -0,0 +1,143 @@
+"""
+Tests for admission control and load shedding.
+"""
+import threading
+import time
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from search_suggest import api
+from search_suggest.admission import (
+    AdmissionController,
+    DeadlineExceeded,
+    Overloaded,
+    deadline_after,
+    remaining_seconds
+)
+
+def test_admission_rejects_when_queue_is_full():
+    """Test that requests beyond the queue depth are shed immediately."""
+    admission = AdmissionController(max_concurrent=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    def hold_slot():
+        with admission.admit("model"):
+            started.set()
+            release.wait(5)
+
+    def wait_for_slot():
+        with admission.admit("model"):
+            pass
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    started.wait(5)
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    while admission.stats()["model"]["waiting"] < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(Overloaded) as excinfo:
+        with admission.admit("model"):
+            pass
+    assert not isinstance(excinfo.value, DeadlineExceeded)
+    assert excinfo.value.retry_after >= 1
+
+    # Other models have their own slots and queue
+    with admission.admit("other"):
+        pass
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert admission.stats()["model"] == {"in_flight": 0, "running": 0, "waiting": 0, "rejected": 1, "expired": 0}
+
+def test_admission_drops_requests_past_their_deadline():
+    """Test that a request whose deadline passes while queued never runs."""
+    admission = AdmissionController(max_concurrent=1, max_queue=4)
+    ran = []
+
+    with admission.admit("model"):
+        with pytest.raises(DeadlineExceeded):
+            with admission.admit("model", deadline_after(50)):
+                ran.append(True)
+        # An already expired deadline is dropped without waiting
+        with pytest.raises(DeadlineExceeded):
+            with admission.admit("model", time.monotonic() - 1):
+                ran.append(True)
+
+    assert ran == []
+    assert admission.stats()["model"]["expired"] == 2
+
+    # The slot is free again once its holder finishes
+    with admission.admit("model", deadline_after(50)):
+        ran.append(True)
+    assert ran == [True]
+
+def test_remaining_seconds_rounds_up():
+    """Test that deadlines become whole-second Qdrant timeouts of at least one."""
+    assert remaining_seconds(time.monotonic() + 1.2) == 2
+    assert remaining_seconds(time.monotonic() - 5) == 1
+
+def test_reserve_bounds_requests_in_flight():
+    """Test that reservations count running plus queued requests per model."""
+    admission = AdmissionController(max_concurrent=1, max_queue=1)
+    with admission.reserve(["model", "other"]):
+        with admission.reserve(["model"]):
+            with pytest.raises(Overloaded):
+                with admission.reserve(["other", "model"]):
+                    pass
+            assert admission.stats()["other"]["in_flight"] == 1
+    assert admission.stats()["model"] == {"in_flight": 0, "running": 0, "waiting": 0, "rejected": 1, "expired": 0}
+
+def test_search_sheds_before_waiting_for_a_worker_thread(monkeypatch):
+    """Test that a saturated /search rejects on arrival, and that the deadline covers the thread pool wait."""
+    monkeypatch.setattr(api, "admission", AdmissionController(max_concurrent=1, max_queue=1))
+    monkeypatch.setattr(api, "get_search_version", lambda model_name, vector_store: None)
+    entered, release = threading.Event(), threading.Event()
+
+    def blocking_search(query, model_name, limit, embedding_service, vector_store, trace=None, deadline=None):
+        with api.admit_inference(model_name, deadline):
+            entered.set()
+            release.wait(5)
+        return []
+
+    monkeypatch.setattr(api, "search_categories", blocking_search)
+    api.app.dependency_overrides[api.get_embedding_service] = lambda: None
+    api.app.dependency_overrides[api.get_vector_store] = lambda: None
+    responses = {}
+
+    def get(name, headers=None):
+        responses[name] = client.get("/search", params={"query": "laptops", "correct": False}, headers=headers)
+
+    try:
+        with TestClient(api.app) as client:
+            # A single worker thread, so further requests queue for it
+            client.portal.call(lambda: setattr(anyio.to_thread.current_default_thread_limiter(), "total_tokens", 1))
+            first = threading.Thread(target=get, args=("first",))
+            first.start()
+            assert entered.wait(5)
+            second = threading.Thread(target=get, args=("second", {"X-Request-Timeout-Ms": "100"}))
+            second.start()
+            while api.admission.stats()["BAAI/bge-small-en-v1.5"]["in_flight"] < 2:
+                time.sleep(0.01)
+
+            # The queue is full while the second request waits for the thread
+            start_time = time.monotonic()
+            get("third")
+            assert responses["third"].status_code == 503
+            assert responses["third"].headers["Retry-After"] == "1"
+            assert time.monotonic() - start_time < 1
+
+            time.sleep(0.2)
+            release.set()
+            first.join(5)
+            second.join(5)
+    finally:
+        api.app.dependency_overrides.clear()
+
+    assert responses["first"].status_code == 200
+    # The second request's deadline ran out while it waited for the thread
+    assert responses["second"].status_code == 503
+    assert "deadline" in responses["second"].json()["detail"]
@@ -1,6 +1,7 @@
 """
 Tests for the API endpoints.
 """
+import json
 import pytest
 import httpx
 from fastapi.testclient import TestClient
@@ -93,3 +94,31 @@ def test_compare_endpoint(client):
         assert "query_time_ms" in model_result
         assert "results" in model_result
         assert isinstance(model_result["results"], list)
+
+def test_compare_stream_endpoint(client):
+    """Test the streaming compare endpoint."""
+    models = ["all-MiniLM-L6-v2", "BAAI/bge-small-en-v1.5"]
+    response = client.post("/compare/stream", json={
+        "query": "kitchen appliances",
+        "models": models,
+        "limit": 3
+    })
+    assert response.status_code == 200
+    assert "application/x-ndjson" in response.headers["content-type"]
+    
+    # One line per model, in completion order
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert sorted(line["model"] for line in lines) == sorted(models)
+    for model_result in lines:
+        assert "results" in model_result or "error" in model_result
+    
+    # Server-sent events variant
+    response = client.post("/compare/stream?format=sse", json={
+        "query": "kitchen appliances",
+        "models": models[:1],
+        "limit": 3
+    })
+    assert response.status_code == 200
+    assert "text/event-stream" in response.headers["content-type"]
+    assert "event: result" in response.text
+    assert "event: done" in response.text
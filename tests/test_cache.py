@@ -0,0 +1,20 @@
+"""
+Tests for the in-process caches.
+"""
+from search_suggest.cache import LRUCache
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test that reading an entry protects it from the next eviction."""
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "hit_rate": 0.75}
+    
+    disabled = LRUCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
@@ -0,0 +1,49 @@
+"""
+Tests for the vector store circuit breaker.
+"""
+import time
+
+import pytest
+from search_suggest.circuit_breaker import CircuitBreaker, CircuitOpen
+
+def fail():
+    raise ConnectionError("Qdrant unreachable")
+
+def test_breaker_opens_on_failure_rate():
+    """Test that the breaker opens once enough of the window has failed."""
+    breaker = CircuitBreaker("qdrant", failure_rate=0.5, window=4, min_calls=4, open_seconds=60)
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    # Three calls are below min_calls, so one more failure is needed
+    assert breaker.state == "closed"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == "open"
+    
+    # Open: calls are refused without running
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.call(lambda: pytest.fail("called through an open breaker"))
+    assert excinfo.value.retry_after >= 1
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+def test_breaker_counts_slow_calls_and_recovers():
+    """Test that slow calls trip the breaker and a successful trial closes it."""
+    breaker = CircuitBreaker("qdrant", failure_rate=1.0, slow_call_ms=1, window=2, min_calls=2, open_seconds=0.05)
+    for _ in range(2):
+        assert breaker.call(lambda: time.sleep(0.01) or "slow") == "slow"
+    assert breaker.state == "open"
+    
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.check()
+    # A failed trial reopens the breaker
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == "open"
+    
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.stats() == {"state": "closed", "calls": 0, "failure_rate": 0.0}
@@ -0,0 +1,116 @@
+"""
+Tests for bulk title classification.
+"""
+import json
+
+from search_suggest import classify, populate_db, reduction
+
+TITLES = [
+    "Gaming laptop 16GB",
+    "Wireless mouse",
+    "Stainless steel cookware set",
+    "Dog leash",
+    "Laptop sleeve 15 inch"
+]
+
+def write_titles(path):
+    path.write_text("".join(json.dumps({"id": str(i), "title": title}) + "\n" for i, title in enumerate(TITLES)))
+    return path
+
+def test_classify_matches_single_searches(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that pooled, chunked classification returns each title's search results in input order."""
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service
+    )
+    input_file = write_titles(tmp_path / "titles.jsonl")
+    output_file = tmp_path / "categories.jsonl"
+    
+    stats = classify.classify_file(
+        input_file,
+        output_file,
+        "categories",
+        "hashing",
+        limit=2,
+        workers=2,
+        chunk_size=2,
+        embedding_service=hashing_service,
+        vector_store=memory_store
+    )
+    assert stats["rows"] == len(TITLES)
+    
+    rows = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert [row["title"] for row in rows] == TITLES
+    for row in rows:
+        expected = memory_store.search("categories", hashing_service.create_embedding(row["title"]), limit=2)
+        assert [c["id"] for c in row["categories"]] == [r["id"] for r in expected]
+        assert row["categories"][0]["full_path"] == expected[0]["payload"]["full_path"]
+
+def test_classify_resumes_after_interruption(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that a resumed run drops a torn line and continues after the last complete row."""
+    populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        index_dir=tmp_path / "indexes"
+    )
+    input_file = tmp_path / "titles.csv"
+    input_file.write_text("sku,name\n" + "".join(f"{i},{title}\n" for i, title in enumerate(TITLES)))
+    run = dict(
+        collection="categories",
+        embedding_model="hashing",
+        backend="local",
+        index_dir=tmp_path / "indexes",
+        workers=1,
+        chunk_size=2,
+        title_field="name",
+        id_field="sku",
+        embedding_service=hashing_service
+    )
+    
+    complete_file = tmp_path / "complete.jsonl"
+    classify.classify_file(input_file, complete_file, **run)
+    complete = complete_file.read_text().splitlines()
+    
+    output_file = tmp_path / "resumed.jsonl"
+    output_file.write_text("\n".join(complete[:2]) + "\n" + complete[2][:10])
+    stats = classify.classify_file(input_file, output_file, resume=True, **run)
+    assert stats["skipped"] == 2 and stats["rows"] == 3
+    assert output_file.read_text().splitlines() == complete
+
+def test_classify_reduced_collection_without_cached_projection(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that a PCA collection classifies on both backends with an empty REDUCTION_DIR."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "built")
+    collection = populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        reduction="pca:4",
+        index_dir=tmp_path / "indexes"
+    )
+    # Another host: the projection was never cached here
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "empty")
+    input_file = write_titles(tmp_path / "titles.jsonl")
+    run = dict(
+        collection="categories",
+        embedding_model="hashing",
+        workers=1,
+        embedding_service=hashing_service,
+        vector_store=memory_store
+    )
+    
+    stats = classify.classify_file(input_file, tmp_path / "qdrant.jsonl", backend="qdrant", **run)
+    assert stats["rows"] == len(TITLES)
+    reducer = reduction.load_reducer(collection, "pca-4", memory_store)
+    for line in (tmp_path / "qdrant.jsonl").read_text().splitlines():
+        row = json.loads(line)
+        query_vector = reducer.transform([hashing_service.create_embedding(row["title"])])[0].tolist()
+        expected = memory_store.search(collection, query_vector, limit=3, vector_name="pca-4")
+        assert [c["id"] for c in row["categories"]] == [r["id"] for r in expected]
+    
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "empty_local")
+    stats = classify.classify_file(
+        input_file, tmp_path / "local.jsonl", backend="local", index_dir=tmp_path / "indexes", **run
+    )
+    assert stats["rows"] == len(TITLES)
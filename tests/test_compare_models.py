@@ -0,0 +1,65 @@
+"""
+Tests for the model evaluation harness.
+"""
+import json
+import pytest
+import numpy as np
+from search_suggest.compare_models import (
+    evaluate_index,
+    load_labeled_queries,
+    ndcg_at_k,
+    recall_at_k,
+    reciprocal_rank,
+)
+from search_suggest.local_index import LocalIndex
+
+class KeywordEmbeddingService:
+    """Embeds text as a bag of known keywords so results are predictable."""
+    vocabulary = ["kitchen", "shoes", "toys"]
+
+    def create_embedding(self, text, model_name=None, reducer=None):
+        return [float(word in text) for word in self.vocabulary]
+
+def test_metrics():
+    """Test recall, reciprocal rank and nDCG on a known ranking."""
+    ranked = ["a", "b", "c", "d"]
+    
+    assert recall_at_k(ranked, {"b", "z"}, k=2) == 0.5
+    assert recall_at_k(ranked, {"d"}, k=3) == 0.0
+    
+    assert reciprocal_rank(ranked, {"c"}, k=5) == pytest.approx(1 / 3)
+    assert reciprocal_rank(ranked, {"z"}, k=5) == 0.0
+    
+    assert ndcg_at_k(ranked, {"a"}, k=3) == pytest.approx(1.0)
+    assert ndcg_at_k(ranked, {"b"}, k=3) == pytest.approx(1 / np.log2(3))
+
+def test_load_labeled_queries(tmp_path):
+    """Test loading labels and rejecting lines without relevant IDs."""
+    labels_file = tmp_path / "labels.jsonl"
+    labels_file.write_text(
+        json.dumps({"query": "sneakers", "relevant": [187]}) + "\n\n"
+    )
+    assert load_labeled_queries(labels_file) == [{"query": "sneakers", "relevant": ["187"]}]
+    
+    labels_file.write_text(json.dumps({"query": "sneakers"}) + "\n")
+    with pytest.raises(ValueError):
+        load_labeled_queries(labels_file)
+
+def test_evaluate_index():
+    """Test that the harness scores a local index and reports latency."""
+    index = LocalIndex(
+        ids=["638", "187", "1239"],
+        vectors=np.eye(3),
+        payloads=[{"full_path": "Kitchen"}, {"full_path": "Shoes"}, {"full_path": "Toys"}]
+    )
+    labeled = [
+        {"query": "kitchen things", "relevant": ["638"]},
+        {"query": "toys", "relevant": ["187"]},
+    ]
+    
+    metrics = evaluate_index(KeywordEmbeddingService(), index, labeled, top_k=1)
+    
+    assert metrics["recall@1"] == 0.5
+    assert metrics["mrr"] == 0.5
+    assert metrics["latency_ms"]["p95"] >= metrics["latency_ms"]["p50"] >= 0
+    assert [q["results"] for q in metrics["queries"]] == [["638"], ["1239"]]
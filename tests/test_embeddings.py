@@ -1,6 +1,7 @@
 """
 Tests for the embedding service functionality.
 """
+import numpy as np
 import pytest
 from search_suggest.embeddings import EmbeddingService
 
@@ -51,6 +52,22 @@ def test_create_embeddings_batch():
     assert all(isinstance(emb, list) for emb in embeddings)
     assert all(len(emb) > 0 for emb in embeddings)
 
+def test_encode_returns_normalized_matrix():
+    """Test that the array-first path returns unit-length float32 rows."""
+    service = EmbeddingService()
+    
+    texts = ["First test text", "Second test text", "Third test text"]
+    embeddings = service.encode(texts)
+    
+    assert isinstance(embeddings, np.ndarray)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
+    assert embeddings.shape == (len(texts), service.embedding_dimension)
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+    
+    # The list API returns the same vectors
+    assert np.allclose(service.create_embeddings_batch(texts), embeddings)
+
 def test_model_caching():
     """Test that models are properly cached."""
     service = EmbeddingService()
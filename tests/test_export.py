@@ -0,0 +1,90 @@
+"""
+Tests for exporting and importing collection files.
+"""
+import numpy as np
+import pytest
+from search_suggest import export, populate_db, reduction
+from search_suggest.local_index import IndexRegistry
+
+def test_export_import_round_trip(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that an imported collection searches like the one it was exported from."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "reductions")
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service,
+        reduction="pca:4"
+    )
+    output_file = tmp_path / "categories.npz"
+    
+    manifest = export.export_collection(
+        "categories", output_file, "hashing", taxonomy_file=taxonomy_file, vector_store=memory_store
+    )
+    assert manifest["count"] == 7
+    assert manifest["vector_name"] == "pca-4"
+    assert export.read_export_manifest(output_file) == manifest
+    with np.load(output_file) as data:
+        assert data["vectors"].dtype == np.float32
+        # Payloads are one UTF-8 JSON blob, not a four-bytes-a-character string
+        assert data["payloads"].dtype == np.uint8
+        assert export.load_payloads(data["payloads"])[0] == memory_store.export_points("categories", "pca-4")[2][0]
+    
+    collection = export.import_collection(
+        output_file,
+        "seeded",
+        versioned=True,
+        index_dir=tmp_path / "indexes",
+        expected_model="hashing",
+        taxonomy_file=taxonomy_file,
+        vector_store=memory_store
+    )
+    assert collection == "seeded_v1"
+    assert memory_store.get_alias_target("seeded") == "seeded_v1"
+    assert memory_store.get_vector_spec(collection) == ("pca-4", 4)
+    
+    # Queries go through the projection the import saved for the new collection
+    reducer = reduction.load_reducer(collection, "pca-4")
+    query = hashing_service.encode(["Electronics > Computers > Laptops"], reducer=reducer)[0].tolist()
+    original = memory_store.search("categories", query, limit=3, vector_name="pca-4")
+    imported = memory_store.search("seeded", query, limit=3, vector_name="pca-4")
+    assert [r["id"] for r in imported] == [r["id"] for r in original]
+    assert imported[0]["payload"] == original[0]["payload"]
+    assert len(IndexRegistry(tmp_path / "indexes", check_interval=0).get("seeded")) == 7
+
+def test_float16_import_to_local_index(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that a float16 export loads into a local index with the same ranking."""
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service
+    )
+    output_file = tmp_path / "categories.npz"
+    export.export_collection("categories", output_file, "hashing", dtype="float16", vector_store=memory_store)
+    
+    version = export.import_collection(output_file, "categories", target="local", index_dir=tmp_path)
+    assert version.startswith("categories.import-")
+    index = IndexRegistry(tmp_path, check_interval=0).get("categories")
+    assert index.vectors.dtype == np.float32
+    
+    query = hashing_service.encode(["Electronics > Computers > Laptops"])[0]
+    remote = memory_store.search("categories", query.tolist(), limit=3)
+    assert [r["id"] for r in index.search(query, limit=3)] == [r["id"] for r in remote]
+
+def test_import_rejects_mismatched_files(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that a file built with another model or taxonomy is refused."""
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service
+    )
+    output_file = tmp_path / "categories.npz"
+    export.export_collection("categories", output_file, "hashing", taxonomy_file=taxonomy_file, vector_store=memory_store)
+    
+    with pytest.raises(ValueError, match="built with"):
+        export.import_collection(output_file, "seeded", expected_model="other", vector_store=memory_store)
+    
+    changed_taxonomy = tmp_path / "changed.txt"
+    changed_taxonomy.write_text(taxonomy_file.read_text() + "999 - Extra\n")
+    with pytest.raises(ValueError, match="different taxonomy"):
+        export.import_collection(output_file, "seeded", taxonomy_file=changed_taxonomy, vector_store=memory_store)
+    assert "seeded" not in {c["name"] for c in memory_store.list_collections()}
@@ -0,0 +1,62 @@
+"""
+Tests for ETags and Cache-Control on deterministic responses.
+"""
+from fastapi.testclient import TestClient
+from search_suggest import api
+from search_suggest.http_cache import cache_headers, etag_matches, make_etag
+from search_suggest.populate_db import populate_versioned_collection
+
+def test_etags_match_weakly_and_change_with_inputs():
+    """Test ETag derivation and If-None-Match comparison."""
+    etag = make_etag("/search", "laptops", "model", 10, True, "c_v1")
+    assert etag == make_etag("/search", "laptops", "model", 10, True, "c_v1")
+    assert etag != make_etag("/search", "laptops", "model", 10, True, "c_v2")
+    assert etag.startswith('"') and etag.endswith('"')
+    
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+    
+    assert cache_headers(etag, 30) == {"ETag": etag, "Cache-Control": "public, max-age=30"}
+    assert cache_headers(etag, 0)["Cache-Control"] == "no-cache"
+    assert cache_headers(None) == {"Cache-Control": "no-store"}
+
+def test_search_revalidates_until_a_new_version(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that /search answers 304 until populate publishes a new version."""
+    monkeypatch.setattr(api, "collection_specs", {})
+    monkeypatch.setattr(api, "collections_cache", {})
+    alias_name = api.get_collection_for_model("BAAI/bge-small-en-v1.5")
+    
+    def populate():
+        populate_versioned_collection(
+            taxonomy_file=taxonomy_file,
+            alias_name=alias_name,
+            embedding_service=hashing_service,
+            index_dir=tmp_path
+        )
+        api.collection_specs.clear()
+    
+    populate()
+    api.app.dependency_overrides[api.get_embedding_service] = lambda: hashing_service
+    api.app.dependency_overrides[api.get_vector_store] = lambda: memory_store
+    try:
+        client = TestClient(api.app)
+        params = {"query": "laptops", "limit": 3}
+        first = client.get("/search", params=params)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"].startswith("public")
+        
+        revalidated = client.get("/search", params=params, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert client.get("/search", params=dict(params, limit=2), headers={"If-None-Match": etag}).status_code == 200
+        collections = client.get("/collections")
+        assert client.get("/collections", headers={"If-None-Match": collections.headers["ETag"]}).status_code == 304
+        
+        populate()
+        refreshed = client.get("/search", params=params, headers={"If-None-Match": etag})
+        assert refreshed.status_code == 200 and refreshed.headers["ETag"] != etag
+        assert client.get("/collections", headers={"If-None-Match": collections.headers["ETag"]}).status_code == 200
+    finally:
+        api.app.dependency_overrides.clear()
@@ -0,0 +1,76 @@
+"""
+Tests for the background job manager.
+"""
+import threading
+import time
+import pytest
+from search_suggest.jobs import JobManager, JobLimitExceeded
+
+def wait_until_finished(job, timeout=5.0):
+    """Poll a job until it stops running."""
+    deadline = time.time() + timeout
+    while not job.is_finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.is_finished
+
+def test_job_reports_progress():
+    """Test that a job records progress, throughput and completion."""
+    manager = JobManager(max_concurrent=1, max_queued=2)
+    
+    def work(job):
+        for processed in range(0, 11, 5):
+            job.update_progress(processed, 10)
+    
+    job = manager.submit("populate", {"collection": "test"}, work)
+    wait_until_finished(job)
+    
+    info = job.to_dict()
+    assert info["status"] == "completed"
+    assert info["processed"] == 10
+    assert info["progress"] == 1.0
+    assert info["eta_seconds"] is None
+    assert manager.get(job.id) is job
+
+def test_cancel_running_and_queued_jobs():
+    """Test cancelling a running job and a job still waiting in the queue."""
+    manager = JobManager(max_concurrent=1, max_queued=2)
+    started = threading.Event()
+    
+    def work(job):
+        started.set()
+        while True:
+            job.update_progress(job.processed + 1, 1000)
+            time.sleep(0.01)
+    
+    running = manager.submit("populate", {"collection": "a"}, work)
+    queued = manager.submit("populate", {"collection": "b"}, work)
+    assert started.wait(5)
+    assert manager.find_active(collection="b") is queued
+    
+    manager.cancel(queued.id)
+    assert queued.status == "cancelled"
+    
+    manager.cancel(running.id)
+    wait_until_finished(running)
+    assert running.status == "cancelled"
+    assert manager.find_active(collection="a") is None
+
+def test_failed_job_and_queue_limit():
+    """Test that errors are recorded and the queue depth is enforced."""
+    manager = JobManager(max_concurrent=1, max_queued=1)
+    release = threading.Event()
+    
+    def fail(job):
+        release.wait(5)
+        raise RuntimeError("boom")
+    
+    first = manager.submit("populate", {}, fail)
+    time.sleep(0.05)
+    manager.submit("populate", {}, fail)
+    with pytest.raises(JobLimitExceeded):
+        manager.submit("populate", {}, fail)
+    
+    release.set()
+    wait_until_finished(first)
+    assert first.status == "failed"
+    assert first.error == "boom"
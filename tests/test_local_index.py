@@ -0,0 +1,33 @@
+"""
+Tests for the in-process vector index.
+"""
+import numpy as np
+from search_suggest.local_index import LocalIndex, nearest_neighbors, normalize_rows
+
+def test_blocked_neighbors_match_full_matrix():
+    """Test that tiling the similarity matrix finds the same neighbors as computing it whole."""
+    vectors = normalize_rows(np.random.default_rng(0).standard_normal((50, 8)).astype(np.float32))
+    similarities = vectors @ vectors.T
+    np.fill_diagonal(similarities, -np.inf)
+    expected = np.argsort(-similarities, axis=1)[:, :5]
+    
+    neighbors, scores = nearest_neighbors(vectors, k=5, block_size=7)
+    assert neighbors.dtype == np.int32 and scores.dtype == np.float16
+    assert (neighbors == expected).all()
+    np.testing.assert_allclose(scores, np.take_along_axis(similarities, expected, axis=1), atol=1e-3)
+    
+    # Fewer vectors than neighbors asked for
+    neighbors, _ = nearest_neighbors(vectors[:3], k=5, block_size=2)
+    assert [sorted(row) for row in neighbors.tolist()] == [[1, 2], [0, 2], [0, 1]]
+
+def test_neighbors_survive_save_and_load(tmp_path):
+    """Test that a saved index maps its neighbor table back read-only."""
+    vectors = np.random.default_rng(1).standard_normal((10, 4)).astype(np.float32)
+    index = LocalIndex([str(i) for i in range(10)], vectors, [{"name": str(i)} for i in range(10)])
+    index.build_neighbors(k=3)
+    index.save(tmp_path / "v1")
+    
+    loaded = LocalIndex.load(tmp_path / "v1")
+    assert not loaded.neighbors.flags.writeable
+    assert loaded.related("4") == index.related("4")
+    assert [r["id"] for r in loaded.related("4", limit=2)] == [r["id"] for r in index.related("4")][:2]
@@ -0,0 +1,49 @@
+"""
+Tests for memory accounting.
+"""
+import numpy as np
+from fastapi.testclient import TestClient
+from search_suggest import api, profiling
+from search_suggest.embeddings import EmbeddingService
+from search_suggest.local_index import IndexRegistry, LocalIndex, publish_index
+from search_suggest.memory import deep_sizeof, mapped_files
+from search_suggest.profiling import PROFILE_HEADER
+
+def test_deep_sizeof_skips_mapped_data(tmp_path):
+    """Test that owned arrays count their data and memory-mapped ones don't."""
+    owned = np.zeros((1000, 64), dtype=np.float32)
+    np.save(tmp_path / "vectors.npy", owned)
+    mapped = np.load(tmp_path / "vectors.npy", mmap_mode="r")
+    
+    assert deep_sizeof({"vectors": owned}) > owned.nbytes
+    assert deep_sizeof({"vectors": mapped}) < 1024
+    assert float(mapped.sum()) == 0.0
+    mapping = mapped_files()[str((tmp_path / "vectors.npy").resolve())]
+    assert mapping["size"] >= owned.nbytes and mapping["rss"] > 0
+
+def test_memory_endpoint_breaks_down_models_and_indexes(tiny_model, tmp_path, monkeypatch):
+    """Test that /debug/memory reports loaded models and mapped indexes."""
+    alias_name = api.get_collection_for_model("BAAI/bge-small-en-v1.5")
+    vectors = np.random.default_rng(0).standard_normal((50, 16)).astype(np.float32)
+    LocalIndex([str(i) for i in range(50)], vectors, [{"full_path": f"C{i}", "level": 1} for i in range(50)]).save(
+        tmp_path / alias_name / "v1"
+    )
+    publish_index(tmp_path / alias_name, "v1")
+    registry = IndexRegistry(tmp_path)
+    registry.get(alias_name).search(vectors[0], limit=3)
+    monkeypatch.setattr(api, "local_indexes", registry)
+    monkeypatch.setattr(api, "embedding_services", {tiny_model: EmbeddingService(model_name=tiny_model)})
+    
+    client = TestClient(api.app)
+    assert client.get("/debug/memory").status_code == 404
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    report = client.get("/debug/memory", headers={PROFILE_HEADER: "secret"}).json()
+    
+    assert report["process"]["rss"] > 0
+    assert report["models"][0]["model"] == tiny_model
+    assert report["models"][0]["parameter_bytes"] > 0 and report["models"][0]["tokenizer_bytes"] > 0
+    index = report["local_indexes"][0]
+    assert index["count"] == 50 and index["vector_bytes"] == vectors.nbytes
+    assert index["resident_bytes"] > 0
+    assert "query_embeddings" in report["caches"] and "precomputed" in report["taxonomy"]
+    assert 0 < report["accounted_bytes"] < report["process"]["rss"]
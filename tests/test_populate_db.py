@@ -0,0 +1,200 @@
+"""
+Tests for populating collections, using an in-memory Qdrant instance.
+"""
+import numpy as np
+import pytest
+from search_suggest import populate_db, reduction
+from search_suggest.local_index import IndexRegistry
+
+def test_versioned_populate_swaps_alias(memory_store, taxonomy_file, hashing_service):
+    """Test that each populate builds a new version and repoints the alias."""
+    
+    for expected_version in range(1, 4):
+        collection = populate_db.populate_versioned_collection(
+            taxonomy_file=taxonomy_file,
+            alias_name="categories",
+            embedding_service=hashing_service,
+            retention=2,
+            index_dir=None
+        )
+        assert collection == f"categories_v{expected_version}"
+        assert memory_store.get_alias_target("categories") == collection
+        assert memory_store.count("categories") == 7
+    
+    # Only the live version and one previous version are retained
+    assert [name for _, name in memory_store.list_versions("categories")] == [
+        "categories_v2", "categories_v3"
+    ]
+
+def test_failed_verification_keeps_live_version(memory_store, taxonomy_file, monkeypatch, hashing_service):
+    """Test that a version failing verification is dropped and never published."""
+    populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        index_dir=None
+    )
+    
+    def fail_verification(*args, **kwargs):
+        raise ValueError("bad build")
+    
+    monkeypatch.setattr(populate_db, "verify_collection", fail_verification)
+    with pytest.raises(ValueError):
+        populate_db.populate_versioned_collection(
+            taxonomy_file=taxonomy_file,
+            alias_name="categories",
+            embedding_service=hashing_service,
+            index_dir=None
+        )
+    
+    assert memory_store.get_alias_target("categories") == "categories_v1"
+    assert [name for _, name in memory_store.list_versions("categories")] == ["categories_v1"]
+
+def test_reduced_populate_uses_named_vector(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that a PCA-reduced version records its reduction and can be searched."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "reductions")
+    
+    collection = populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        reduction="pca:4",
+        index_dir=None
+    )
+    
+    assert memory_store.get_vector_spec(collection) == ("pca-4", 4)
+    reducer = reduction.load_reducer(collection, "pca-4")
+    results = memory_store.search(
+        collection_name=collection,
+        query_vector=hashing_service.create_embedding("Electronics > Computers > Laptops", reducer=reducer),
+        limit=1,
+        vector_name="pca-4"
+    )
+    assert results[0]["id"] == "328"
+
+def test_old_projections_are_pruned(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that projections of deleted versions go with them, in Qdrant and locally."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "reductions")
+    
+    for _ in range(3):
+        populate_db.populate_versioned_collection(
+            taxonomy_file=taxonomy_file,
+            alias_name="categories",
+            embedding_service=hashing_service,
+            reduction="pca:4",
+            retention=2,
+            index_dir=tmp_path / "indexes"
+        )
+    
+    names = set(memory_store.collection_names())
+    assert "categories_v1_projection" not in names
+    assert {"categories_v2_projection", "categories_v3_projection"} <= names
+    assert sorted(path.name for path in (tmp_path / "reductions").iterdir()) == ["categories_v2", "categories_v3"]
+    # The local index ships the projection it needs
+    assert (tmp_path / "indexes" / "categories" / "categories_v3" / "pca-4.npz").exists()
+
+def test_build_local_index_matches_populate(memory_store, taxonomy_file, hashing_service):
+    """Test that the local index and a populated collection rank the same."""
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service
+    )
+    index = populate_db.build_local_index(taxonomy_file, hashing_service)
+    assert index.vectors.dtype == np.float32
+    
+    queries = hashing_service.encode(["Laptops", "Cat Supplies"])
+    remote = memory_store.search_batch("categories", queries, limit=3)
+    local = index.search_batch(queries, limit=3)
+    for remote_results, local_results in zip(remote, local):
+        assert [r["id"] for r in remote_results] == [r["id"] for r in local_results]
+
+def test_versioned_populate_publishes_local_index(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that each version is mirrored to a local index workers remap to."""
+    registry = IndexRegistry(tmp_path, check_interval=0)
+    
+    for expected_version in range(1, 4):
+        collection = populate_db.populate_versioned_collection(
+            taxonomy_file=taxonomy_file,
+            alias_name="categories",
+            embedding_service=hashing_service,
+            retention=2,
+            index_dir=tmp_path
+        )
+        index = registry.get("categories")
+        assert index.metadata["collection"] == collection
+        assert len(index) == 7
+        # Mapped read-only from the file rather than copied into the process
+        assert not index.vectors.flags.writeable
+        assert index.search(hashing_service.encode(["Electronics > Computers > Laptops"])[0], limit=1)[0]["id"] == "328"
+    
+    # Old versions are pruned along with their collections
+    assert sorted(path.name for path in (tmp_path / "categories").iterdir()) == [
+        "CURRENT", "categories_v2", "categories_v3"
+    ]
+
+def test_snapshot_collection_mirrors_qdrant(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that a snapshot reads the collection back into a published local index."""
+    populate_db.populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name="categories",
+        embedding_service=hashing_service
+    )
+    registry = IndexRegistry(tmp_path, check_interval=0)
+    
+    populate_db.snapshot_collection("categories", embedding_model="hashing", index_dir=tmp_path, vector_store=memory_store)
+    index = registry.get("categories")
+    assert len(index) == 7
+    assert index.metadata == {"collection": "categories", "model": "hashing", "vector_name": None}
+    
+    query = hashing_service.encode(["Electronics > Computers > Laptops"])[0]
+    remote = memory_store.search("categories", query.tolist(), limit=3)
+    local = index.search(query, limit=3)
+    assert [r["id"] for r in local] == [r["id"] for r in remote]
+    assert local[0]["payload"] == {k: v for k, v in remote[0]["payload"].items() if k != "original_id"}
+
+def test_streamed_versioned_populate(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that a streamed populate writes the same categories and fits PCA on a sample."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "reductions")
+    monkeypatch.setattr(populate_db, "STREAM_FIT_SAMPLE", 4)
+    progress = []
+    
+    collection = populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        progress_callback=lambda processed, total: progress.append((processed, total)),
+        reduction="pca:4",
+        index_dir=tmp_path / "indexes",
+        stream=True
+    )
+    assert memory_store.count(collection) == 7
+    assert progress[-1] == (7, 7)
+    assert memory_store.get_vector_spec(collection) == ("pca-4", 4)
+    # Streamed taxonomies don't get a local index
+    assert not (tmp_path / "indexes").exists()
+
+def test_encode_length_sorted_keeps_input_order(hashing_service, monkeypatch):
+    """Test that texts encoded shortest first come back in their original order."""
+    # Sorting must not tokenize the texts a second time
+    monkeypatch.setattr(hashing_service, "count_tokens", None)
+    texts = ["a b c d e", "a", "a b c", "a b"]
+    embeddings = populate_db.encode_length_sorted(hashing_service, texts, None, batch_size=2)
+    np.testing.assert_allclose(embeddings, hashing_service.encode(texts), rtol=1e-6)
+
+def test_populate_saves_related_categories(memory_store, taxonomy_file, tmp_path, hashing_service):
+    """Test that the published index carries each category's nearest other categories."""
+    populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        index_dir=tmp_path
+    )
+    index = IndexRegistry(tmp_path, check_interval=0).get("categories")
+    assert index.neighbors.shape == (7, 6)
+    
+    related = index.related("328", limit=3)
+    searched = index.search(index.vectors[index.rows["328"]], limit=4)
+    assert [r["id"] for r in related] == [r["id"] for r in searched if r["id"] != "328"][:3]
+    assert related[0]["payload"]["full_path"]
+    assert index.related("missing") is None
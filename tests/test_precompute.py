@@ -0,0 +1,62 @@
+"""
+Tests for precomputed head-query results.
+"""
+import json
+from collections import Counter
+from search_suggest import populate_db
+from search_suggest.precompute import (
+    PrecomputedResults,
+    build_precomputed_table,
+    canonicalize_query,
+    load_query_counts,
+    save_precomputed_table
+)
+
+def test_canonicalize_query():
+    """Test that case, spacing and surrounding punctuation don't matter."""
+    assert canonicalize_query("  Kitchen   APPLIANCES? ") == "kitchen appliances"
+    assert canonicalize_query("ｌａｐｔｏｐｓ") == "laptops"
+
+def test_load_query_counts(tmp_path):
+    """Test reading query logs and frequency lists into canonical counts."""
+    path = tmp_path / "queries.txt"
+    path.write_text(
+        json.dumps({"query": "Laptops"}) + "\n"
+        + "laptops\t3\n"
+        + "cat food\n"
+        + "\n",
+        encoding="utf-8"
+    )
+    assert load_query_counts(path) == Counter({"laptops": 4, "cat food": 1})
+
+def test_precomputed_table_round_trip(memory_store, taxonomy_file, hashing_service, tmp_path):
+    """Test that precomputed results are served only for the version they were built on."""
+    collection = populate_db.populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name="categories",
+        embedding_service=hashing_service,
+        index_dir=None
+    )
+    table = build_precomputed_table(
+        Counter({"laptops": 5, "cat supplies": 2, "rare query": 1}),
+        ["test-model"],
+        {"test-model": "categories"},
+        hashing_service,
+        memory_store,
+        top_n=2,
+        limit=3
+    )
+    path = tmp_path / "precomputed.json"
+    save_precomputed_table(table, path)
+    precomputed = PrecomputedResults.load(path)
+    
+    assert len(precomputed) == 2
+    results = precomputed.lookup("test-model", "  LAPTOPS ", 2, collection)
+    assert len(results) == 2
+    assert {"id", "score", "payload"} <= set(results[0])
+    
+    # Queries outside the head, larger limits and other versions miss
+    assert precomputed.lookup("test-model", "rare query", 2, collection) is None
+    assert precomputed.lookup("test-model", "laptops", 5, collection) is None
+    assert precomputed.lookup("test-model", "laptops", 2, "categories_v2") is None
+    assert PrecomputedResults.load(tmp_path / "missing.json").lookup("test-model", "laptops", 2, collection) is None
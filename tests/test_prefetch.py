@@ -0,0 +1,25 @@
+"""
+Tests for prefetching models and loading them offline.
+"""
+import numpy as np
+import pytest
+from search_suggest import embeddings
+from search_suggest.embeddings import EmbeddingService, is_prefetched, prefetch_models
+
+def test_prefetched_models_load_offline(tiny_model, tmp_path, monkeypatch):
+    """Test that prefetched models load offline and missing ones fail fast."""
+    model_dir = tmp_path / "models"
+    saved = prefetch_models([tiny_model], model_dir, dtype="float16")
+    assert saved[0]["downloaded"] and saved[0]["bytes"] > 0
+    assert is_prefetched(tiny_model, model_dir)
+    assert not prefetch_models([tiny_model], model_dir)[0]["downloaded"]
+    
+    monkeypatch.setattr(embeddings, "MODEL_DIR", model_dir)
+    monkeypatch.setattr(embeddings, "MODEL_OFFLINE", True)
+    service = EmbeddingService(model_name=tiny_model)
+    assert str(next(service.model.parameters()).dtype) == "torch.float32"
+    vectors = service.encode(["laptop bags", "coffee maker"])
+    assert vectors.shape == (2, 16) and vectors.dtype == np.float32
+    
+    with pytest.raises(ValueError, match="not prefetched"):
+        EmbeddingService(model_name="BAAI/bge-small-en-v1.5")
@@ -0,0 +1,66 @@
+"""
+Tests for opt-in request profiling and the sampling profiler.
+"""
+import pstats
+import threading
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from search_suggest import api, profiling
+from search_suggest.profiling import (
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    ProfiledRoute,
+    profile_path,
+    profile_requests,
+    sample_profile
+)
+
+def busy_work(seconds):
+    """Spin for a while, so profilers see this function."""
+    deadline = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < deadline:
+        total += sum(range(1000))
+    return total
+
+def test_profiles_only_requests_with_the_token(tmp_path, monkeypatch):
+    """Test that a request with the token gets its endpoint profiled and stored."""
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+    app.middleware("http")(profile_requests)
+    
+    @app.get("/work")
+    def work(seconds: float = 0.01):
+        return {"total": busy_work(seconds)}
+    
+    client = TestClient(app)
+    assert PROFILE_ID_HEADER not in client.get("/work").headers
+    assert PROFILE_ID_HEADER not in client.get("/work", headers={PROFILE_HEADER: "wrong"}).headers
+    
+    response = client.get("/work", params={"seconds": 0.02}, headers={PROFILE_HEADER: "secret"})
+    assert response.status_code == 200 and "total" in response.json()
+    assert response.headers["Cache-Control"] == "no-store"
+    path = profile_path(response.headers[PROFILE_ID_HEADER])
+    functions = {function for _, _, function in pstats.Stats(str(path)).stats}
+    assert "busy_work" in functions
+    assert profile_path("../../etc/passwd") is None
+
+def test_sampling_profiler_reports_collapsed_stacks(monkeypatch):
+    """Test that sampling finds a busy thread and the endpoints are hidden without the token."""
+    worker = threading.Thread(target=busy_work, args=(0.5,), name="busy")
+    worker.start()
+    stacks = sample_profile(0.2, interval=0.002)
+    worker.join()
+    
+    busy = [line for line in stacks.splitlines() if line.startswith("busy;")]
+    assert busy and any("busy_work (test_profiling.py" in line for line in busy)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
+    
+    client = TestClient(api.app)
+    assert client.get("/debug/sample", params={"seconds": 0.01}).status_code == 404
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    response = client.get("/debug/sample", params={"seconds": 0.05}, headers={PROFILE_HEADER: "secret"})
+    assert response.status_code == 200 and response.text
@@ -0,0 +1,51 @@
+"""
+Tests for query logging and replay.
+"""
+import httpx
+from search_suggest.precompute import load_query_counts
+from search_suggest.query_log import QueryLogger
+from search_suggest.replay import load_log_entries, send_request, summarize
+
+def test_query_log_writes_sampled_entries(tmp_path):
+    """Test that sampled queries are written as JSON lines with their timings."""
+    logger = QueryLogger(tmp_path / "queries.jsonl", sample_rate=1.0)
+    for query in ["laptops", "cat food", "laptops"]:
+        logger.log("/search", query, "all-MiniLM-L6-v2", 10, {"embed": 1.5, "search": 2.25, "total": 4.0}, ["328"])
+    logger.close()
+    
+    entries = load_log_entries([str(tmp_path / "queries.*.jsonl")])
+    assert [entry["query"] for entry in entries] == ["laptops", "cat food", "laptops"]
+    assert entries[0]["timings_ms"] == {"embed": 1.5, "search": 2.25, "total": 4.0}
+    assert entries[0]["result_ids"] == ["328"]
+    assert logger.dropped == 0
+    
+    # The same files feed head-query precomputation
+    log_file = next(tmp_path.glob("queries.*.jsonl"))
+    assert load_query_counts(log_file)["laptops"] == 2
+
+def test_query_log_sampling_off(tmp_path):
+    """Test that nothing is written when no request is sampled."""
+    logger = QueryLogger(tmp_path / "queries.jsonl", sample_rate=0.0)
+    logger.log("/search", "laptops", "all-MiniLM-L6-v2", 10, {"total": 1.0}, [])
+    logger.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_replay_request_and_summary():
+    """Test replaying entries and summarizing latency and errors."""
+    def handler(request):
+        if request.url.params.get("query") == "broken":
+            return httpx.Response(500)
+        return httpx.Response(200, json=[])
+    
+    client = httpx.Client(base_url="http://api", transport=httpx.MockTransport(handler))
+    outcomes = [
+        send_request(client, {"endpoint": "/search", "query": query, "model": "all-MiniLM-L6-v2", "limit": 5})
+        for query in ["laptops", "cat food", "broken", "laptops"]
+    ]
+    report = summarize(outcomes, elapsed=2.0)
+    
+    assert report["requests"] == 4
+    assert report["throughput_rps"] == 2.0
+    assert report["error_rate"] == 0.25
+    assert report["status_counts"] == {"200": 3, "500": 1}
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
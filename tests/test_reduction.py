@@ -0,0 +1,116 @@
+"""
+Tests for embedding dimensionality reduction.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from search_suggest import api, reduction
+from search_suggest.circuit_breaker import CircuitBreaker
+from search_suggest.populate_db import populate_versioned_collection
+from search_suggest.reduction import (
+    PCAReducer,
+    Reducer,
+    ReducerNotFound,
+    TruncationReducer,
+    delete_reducer,
+    fit_reducer,
+    load_reducer,
+    parse_reduction,
+    save_reducer
+)
+
+@pytest.fixture
+def vectors():
+    """Random full-size embeddings."""
+    return np.random.default_rng(0).standard_normal((50, 32)).astype(np.float32)
+
+def test_parse_reduction():
+    """Test reduction specs in both the CLI and vector name formats."""
+    assert parse_reduction("pca:128") == ("pca", 128)
+    assert parse_reduction("truncate-256") == ("truncate", 256)
+    for spec in ["pca", "svd:64", "pca:abc"]:
+        with pytest.raises(ValueError):
+            parse_reduction(spec)
+
+def test_truncation_keeps_prefix(vectors):
+    """Test that truncation keeps the leading dimensions, renormalized."""
+    reducer = fit_reducer("truncate:8", vectors, matryoshka=True)
+    assert isinstance(reducer, TruncationReducer)
+    assert reducer.vector_name == "truncate-8"
+    
+    reduced = reducer.transform(vectors)
+    assert reduced.shape == (50, 8)
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0)
+    expected = vectors[0, :8] / np.linalg.norm(vectors[0, :8])
+    assert np.allclose(reduced[0], expected, atol=1e-6)
+
+def test_reducer_without_transform_cannot_be_created():
+    """Test that a reducer missing ``transform`` fails when created, not on the first query."""
+    class IncompleteReducer(Reducer):
+        method = "incomplete"
+    
+    with pytest.raises(TypeError):
+        IncompleteReducer(8)
+
+def test_pca_round_trip(vectors, tmp_path, monkeypatch):
+    """Test that a saved PCA projection reloads and reduces identically."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path)
+    reducer = fit_reducer("pca:8", vectors)
+    assert isinstance(reducer, PCAReducer)
+    
+    save_reducer(reducer, "categories_v1")
+    loaded = load_reducer("categories_v1", "pca-8")
+    assert np.allclose(loaded.transform(vectors), reducer.transform(vectors))
+    
+    # Unreduced collections have no reducer, and missing projections are an error
+    assert load_reducer("categories_v1", None) is None
+    with pytest.raises(FileNotFoundError):
+        load_reducer("categories_v2", "pca-8")
+
+def test_projection_is_stored_with_the_collection(vectors, tmp_path, monkeypatch, memory_store):
+    """Test that a process without the local file loads the projection from Qdrant."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "built")
+    reducer = fit_reducer("pca:8", vectors)
+    save_reducer(reducer, "categories_v1", memory_store)
+    
+    # Another host: nothing cached yet, so the projection comes from Qdrant
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "other")
+    with pytest.raises(ReducerNotFound):
+        load_reducer("categories_v1", "pca-8")
+    loaded = load_reducer("categories_v1", "pca-8", memory_store)
+    assert np.allclose(loaded.transform(vectors), reducer.transform(vectors), atol=1e-6)
+    assert (tmp_path / "other" / "categories_v1" / "pca-8.npz").exists()
+    
+    delete_reducer("categories_v1", memory_store)
+    assert not (tmp_path / "other" / "categories_v1").exists()
+    with pytest.raises(ReducerNotFound):
+        load_reducer("categories_v1", "pca-8", memory_store)
+
+def test_reduced_dimension_must_be_smaller(vectors):
+    """Test that a reduction cannot grow the embeddings."""
+    with pytest.raises(ValueError):
+        fit_reducer("pca:32", vectors)
+
+def test_missing_projection_is_not_a_qdrant_failure(memory_store, taxonomy_file, tmp_path, monkeypatch, hashing_service):
+    """Test that a PCA collection without its projection answers 500 and leaves the breaker alone."""
+    monkeypatch.setattr(reduction, "REDUCTION_DIR", tmp_path / "reductions")
+    monkeypatch.setattr(api, "collection_specs", {})
+    monkeypatch.setattr(api, "qdrant_breaker", CircuitBreaker("qdrant", min_calls=1))
+    collection = populate_versioned_collection(
+        taxonomy_file=taxonomy_file,
+        alias_name=api.get_collection_for_model("BAAI/bge-small-en-v1.5"),
+        embedding_service=hashing_service,
+        reduction="pca:4",
+        index_dir=None
+    )
+    delete_reducer(collection, memory_store)
+    
+    api.app.dependency_overrides[api.get_embedding_service] = lambda: hashing_service
+    api.app.dependency_overrides[api.get_vector_store] = lambda: memory_store
+    try:
+        response = TestClient(api.app).get("/search", params={"query": "laptops"})
+    finally:
+        api.app.dependency_overrides.clear()
+    assert response.status_code == 500
+    assert "No PCA projection" in response.json()["detail"]
+    assert api.qdrant_breaker.stats()["calls"] == 0
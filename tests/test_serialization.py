@@ -0,0 +1,41 @@
+"""
+Tests for the fast response serialization path.
+"""
+import json
+import numpy as np
+from search_suggest.api import SearchResult, app
+from search_suggest.serialization import (
+    FastJSONResponse,
+    benchmark_serialization,
+    sample_results,
+    search_rows
+)
+
+def test_fast_rows_match_pydantic_serialization():
+    """Test that shaped rows encode to the same JSON as SearchResult models."""
+    raw_results = sample_results(5)
+    raw_results[0]["score"] = np.float32(0.75)
+    raw_results.append({"id": "9", "score": 0.1, "payload": {"name": "No path"}})
+    
+    body = json.loads(FastJSONResponse(search_rows(raw_results)).body)
+    expected = [
+        SearchResult(
+            id=result["id"],
+            score=float(result["score"]),
+            full_path=result["payload"]["full_path"],
+            level=result["payload"]["level"]
+        ).model_dump(mode="json")
+        for result in raw_results[:5]
+    ]
+    assert body == expected
+
+def test_openapi_schema_still_documents_results():
+    """Test that endpoints returning responses directly keep their schema."""
+    schema = app.openapi()["paths"]["/search"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["items"]["$ref"].endswith("/SearchResult")
+
+def test_benchmark_reports_both_endpoints():
+    """Test that the benchmark times both paths for /search and /compare."""
+    report = benchmark_serialization(limit=5, models=2, iterations=20)
+    assert [row["endpoint"] for row in report] == ["/search", "/compare"]
+    assert all(row["pydantic_us"] > 0 and row["fast_us"] > 0 for row in report)
@@ -0,0 +1,18 @@
+"""
+Tests for the pre-fork server helpers.
+"""
+import os
+from search_suggest import server
+
+def test_threads_per_worker():
+    """Test that CPU cores are split between workers, with at least one each."""
+    cores = os.cpu_count() or 1
+    assert server.threads_per_worker(1) == cores
+    assert server.threads_per_worker(cores * 2) == 1
+
+def test_worker_memory_reports_uss():
+    """Test that worker memory includes the unique set size of each process."""
+    rows = server.worker_memory([os.getpid()])
+    assert rows[0]["pid"] == os.getpid()
+    assert rows[0]["uss"] > 0
+    assert rows[0]["rss"] >= rows[0]["uss"]
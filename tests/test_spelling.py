@@ -0,0 +1,93 @@
+"""
+Tests for query spelling correction.
+"""
+from pathlib import Path
+
+from search_suggest.spelling import SpellingIndex, edit_distance, typo_distance, vocabulary
+
+TAXONOMY_FILE = Path(__file__).parent.parent / "data" / "taxonomy.txt"
+
+CATEGORY_NAMES = [
+    "Refrigerators",
+    "Blenders",
+    "Cookware",
+    "Cookware Sets",
+    "Phone Cases",
+    "Dresses",
+    "Dress Shirts"
+]
+
+def test_edit_distance_counts_transpositions():
+    """Test that swapped adjacent letters cost one edit."""
+    assert edit_distance("leash", "leash", 2) == 0
+    assert edit_distance("leahs", "leash", 2) == 1
+    assert edit_distance("blendr", "blender", 2) == 1
+    assert edit_distance("kitten", "sitting", 2) == 3
+
+def test_typo_distance_only_counts_plausible_typos():
+    """Test that only dropped letters, swaps and neighbouring keys are typos."""
+    assert typo_distance("leahs", "leash", 2) == 1
+    assert typo_distance("blendr", "blender", 2) == 1
+    assert typo_distance("blendet", "blender", 2) == 1
+    assert typo_distance("cookwear", "cookware", 2) == 2
+    # Keys far apart, or an extra letter unrelated to its neighbours
+    assert typo_distance("sneakers", "speakers", 2) == 3
+    assert typo_distance("legos", "legs", 2) == 3
+
+def test_spelling_index_corrects_query_terms():
+    """Test that misspelled words are replaced while known and unrelated words are kept."""
+    index = SpellingIndex(vocabulary(CATEGORY_NAMES + ["Refrigerator", "Blender"]))
+    
+    assert index.correct("refrigeratr") == ("refrigerator", [("refrigeratr", "refrigerator")])
+    assert index.correct("Stainless cookwear, 10 pc") == (
+        "Stainless cookware, 10 pc",
+        [("cookwear", "cookware")]
+    )
+    assert index.lookup("dres") is None
+    
+    # The more frequent word wins between equally close candidates
+    assert SpellingIndex({"dress": 1, "dresses": 5}).lookup("dreses") == "dresses"
+    assert SpellingIndex({"dress": 5, "dresses": 1}).lookup("dreses") == "dress"
+
+def test_spelling_index_leaves_plurals_and_brands_alone():
+    """Test that plural forms, short words and first-letter differences are not corrected."""
+    index = SpellingIndex(vocabulary(CATEGORY_NAMES))
+    
+    assert index.correct("blender phone case") == ("blender phone case", [])
+    assert index.correct("iphone") == ("iphone", [])
+    assert index.correct("ses") == ("ses", [])
+
+def test_taxonomy_index_leaves_product_words_alone():
+    """Test that valid product words missing from the taxonomy are not rewritten."""
+    index = SpellingIndex.from_taxonomy(TAXONOMY_FILE)
+    
+    for query in ["sneakers", "legos", "airpods", "lego set", "leggings", "vape pens"]:
+        assert index.correct(query) == (query, [])
+    assert index.correct("hedphones") == ("headphones", [("hedphones", "headphones")])
+    assert index.correct("vacum cleaner") == ("vacuum cleaner", [("vacum", "vacuum")])
+
+def test_correction_is_kept_only_when_it_scores_better(monkeypatch):
+    """Test that a corrected query replaces the original only if its top match is clearly better."""
+    from search_suggest import api
+    
+    monkeypatch.setattr(api, "spelling_index", SpellingIndex(vocabulary(CATEGORY_NAMES + ["Blender"])))
+    monkeypatch.setattr(api, "SPELLING_MIN_SCORE_GAIN", 0.05)
+    scores = {"blendr": 0.6, "blender": 0.9, "cookwear": 0.8, "cookware": 0.82}
+    searched = []
+    
+    def run_search(text, trace):
+        searched.append(text)
+        trace["query"] = text
+        return [{"id": "1", "score": scores[text]}]
+    
+    assert api.search_with_correction("blendr", True, run_search) == (
+        "blender", True, [{"id": "1", "score": 0.9}], {"query": "blender"}
+    )
+    assert searched == ["blender", "blendr"]
+    assert api.search_with_correction("cookwear", True, run_search) == (
+        "cookwear", False, [{"id": "1", "score": 0.8}], {"query": "cookwear"}
+    )
+    
+    searched.clear()
+    assert api.search_with_correction("blendr", False, run_search)[:2] == ("blendr", False)
+    assert searched == ["blendr"]
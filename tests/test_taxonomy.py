@@ -0,0 +1,90 @@
+"""
+Tests for parsing and streaming taxonomies.
+"""
+import pytest
+from search_suggest.taxonomy import (
+    TaxonomyParser,
+    check_streaming_order,
+    iter_rich_categories,
+    select_within_budget,
+    sort_taxonomy_file
+)
+
+# Sorted by full path string, as Google's file is: "Pet Supplies > Bird
+# Supplies" ends up outside the "Pet Supplies" subtree
+UNORDERED_TAXONOMY = """1 - Animals & Pet Supplies
+2 - Animals & Pet Supplies > Pet Supplies
+5 - Animals & Pet Supplies > Pet Supplies Sets
+3 - Animals & Pet Supplies > Pet Supplies > Bird Supplies
+4 - Animals & Pet Supplies > Pet Supplies > Bird Supplies > Bird Cages
+222 - Electronics
+"""
+
+def test_streamed_rich_text_matches_parser(taxonomy_file):
+    """Test that streaming yields the same texts and payloads as the in-memory parser."""
+    parser = TaxonomyParser(taxonomy_file)
+    expected = dict(parser.get_rich_categories_for_embedding(max_level=2))
+    
+    streamed = list(iter_rich_categories(taxonomy_file, max_level=2))
+    assert {id_: text for id_, text, _ in streamed} == expected
+    assert check_streaming_order(taxonomy_file, max_level=2) == len(expected)
+    
+    payloads = {id_: payload for id_, _, payload in streamed}
+    assert payloads["278"] == {
+        "id": "278",
+        "name": "Computers",
+        "full_path": "Electronics > Computers",
+        "level": 2,
+        "path_parts": ["Electronics", "Computers"]
+    }
+    # Children are complete before their parents
+    assert [id_ for id_, _, _ in streamed].index("278") < [id_ for id_, _, _ in streamed].index("222")
+
+def test_streaming_caps_descendants(taxonomy_file):
+    """Test that only the first descendant names on each level are kept."""
+    texts = {id_: text for id_, text, _ in iter_rich_categories(taxonomy_file, max_descendants=1)}
+    assert texts["1"] == "Animals & Pet Supplies Pet Supplies Bird Supplies"
+    assert texts["328"] == "Electronics > Computers > Laptops"
+
+def test_unordered_taxonomy_is_sorted_for_streaming(tmp_path):
+    """Test that out-of-order files are rejected and can be sorted externally."""
+    source = tmp_path / "unordered.txt"
+    source.write_text(UNORDERED_TAXONOMY, encoding="utf-8")
+    assert check_streaming_order(source) is None
+    with pytest.raises(ValueError):
+        list(iter_rich_categories(source))
+    
+    sorted_file = tmp_path / "sorted.txt"
+    sort_taxonomy_file(source, sorted_file, chunk_lines=2)
+    texts = {id_: text for id_, text, _ in iter_rich_categories(sorted_file, max_level=4)}
+    expected = dict(TaxonomyParser(source).get_rich_categories_for_embedding(max_level=4))
+    # Same descendants; they are listed in sorted rather than file order
+    assert {id_: sorted(text.split(" ")) for id_, text in texts.items()} == {
+        id_: sorted(text.split(" ")) for id_, text in expected.items()
+    }
+    assert texts["1"] == "Animals & Pet Supplies Pet Supplies Bird Supplies Bird Cages Pet Supplies Sets"
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+def test_budget_keeps_nearer_descendants(taxonomy_file):
+    """Test that budgeted texts fit the budget and favour children over grandchildren."""
+    descendants = [(2, "Pet Supplies"), (3, "Bird Supplies"), (3, "Cat Supplies"), (2, "Live Animals")]
+    token_counts = {name: len(name.split()) for _, name in descendants}
+    # Both children fit (4 tokens), then only one grandchild; file order is kept
+    assert select_within_budget(3, descendants, token_counts, 9) == ["Pet Supplies", "Bird Supplies", "Live Animals"]
+    assert select_within_budget(3, descendants, token_counts, 3) == []
+    
+    parser = TaxonomyParser(taxonomy_file)
+    budgeted = dict(parser.get_rich_categories_for_embedding(token_budget=6, count_tokens=count_words))
+    assert budgeted["1"] == "Animals & Pet Supplies Pet Supplies"
+    assert budgeted["328"] == "Electronics > Computers > Laptops"
+    # Texts that already fit are unchanged
+    assert dict(parser.get_rich_categories_for_embedding(token_budget=100, count_tokens=count_words)) == dict(
+        parser.get_rich_categories_for_embedding()
+    )
+    
+    streamed = {
+        id_: text for id_, text, _ in iter_rich_categories(taxonomy_file, token_budget=6, count_tokens=count_words)
+    }
+    assert streamed == budgeted
@@ -0,0 +1,109 @@
+"""
+Tests for incremental type-ahead search.
+"""
+import json
+import threading
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from search_suggest import api
+from search_suggest.cache import LRUCache
+from search_suggest.populate_db import populate_taxonomy_embeddings
+from search_suggest.typeahead import Superseded, TypeaheadSession
+
+def test_session_rescores_only_extensions():
+    """Test that the candidates answer extensions of the last full search only."""
+    vectors = np.eye(3, dtype=np.float32)
+    results = [
+        {"id": str(i), "score": 0.0, "payload": {"name": f"c{i}"}, "vector": vectors[i].tolist()}
+        for i in range(3)
+    ]
+    session = TypeaheadSession(max_extension=4)
+    assert not session.can_rescore("lap", "c_v1")
+    
+    session.reset("Lap", "c_v1", None, results)
+    assert session.can_rescore("laptop", "c_v1")
+    assert not session.can_rescore("laptop bags", "c_v1")
+    assert not session.can_rescore("la", "c_v1")
+    assert not session.can_rescore("laptop", "c_v2")
+    
+    rescored = session.rescore([0.1, 0.9, 0.3], limit=2)
+    assert [result["id"] for result in rescored] == ["1", "2"]
+    assert rescored[0]["score"] == np.float32(0.9)
+    assert "vector" not in rescored[0]
+
+def test_typeahead_websocket_rescores_extensions(memory_store, taxonomy_file, hashing_service):
+    """Test that a keystroke extending the last search is rescored, not searched."""
+    populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name=api.get_collection_for_model("BAAI/bge-small-en-v1.5"),
+        embedding_service=hashing_service
+    )
+    api.app.dependency_overrides[api.get_embedding_service] = lambda: hashing_service
+    api.app.dependency_overrides[api.get_vector_store] = lambda: memory_store
+    try:
+        with TestClient(api.app).websocket_connect("/typeahead?limit=3") as websocket:
+            websocket.send_text("lapt")
+            first = websocket.receive_json()
+            websocket.send_text(json.dumps({"query": "laptops", "seq": 7}))
+            second = websocket.receive_json()
+    finally:
+        api.app.dependency_overrides.clear()
+    
+    assert first["query"] == "lapt" and not first["rescored"]
+    assert len(first["results"]) == 3
+    assert second["seq"] == 7 and second["rescored"]
+    expected = memory_store.search(
+        api.get_collection_for_model("BAAI/bge-small-en-v1.5"),
+        hashing_service.create_embedding("laptops"),
+        limit=3
+    )
+    assert [result["id"] for result in second["results"]] == [result["id"] for result in expected]
+
+def test_superseded_keystroke_stops_before_embedding_and_search(memory_store, taxonomy_file, hashing_service, monkeypatch):
+    """Test that a superseded keystroke's search does no further work."""
+    populate_taxonomy_embeddings(
+        taxonomy_file=taxonomy_file,
+        collection_name=api.get_collection_for_model("BAAI/bge-small-en-v1.5"),
+        embedding_service=hashing_service
+    )
+    monkeypatch.setattr(api, "collection_specs", {})
+    monkeypatch.setattr(api, "query_embeddings", LRUCache(100))
+    cancel_event = threading.Event()
+    embedded, searched = [], []
+    create_embedding, search = hashing_service.create_embedding, memory_store.search
+    
+    def embed_and_supersede(text, model_name=None, reducer=None):
+        # A newer keystroke arrives while this one is being embedded
+        embedded.append(text)
+        cancel_event.set()
+        return create_embedding(text, model_name=model_name, reducer=reducer)
+    
+    def record_search(*args, **kwargs):
+        searched.append(args)
+        return search(*args, **kwargs)
+    
+    monkeypatch.setattr(hashing_service, "create_embedding", embed_and_supersede)
+    monkeypatch.setattr(memory_store, "search", record_search)
+    
+    def keystroke(query):
+        return api.typeahead_search(
+            TypeaheadSession(),
+            query,
+            "BAAI/bge-small-en-v1.5",
+            3,
+            hashing_service,
+            memory_store,
+            cancel_event=cancel_event
+        )
+    
+    # Superseded while embedding: Qdrant is never queried
+    with pytest.raises(Superseded):
+        keystroke("laptops")
+    assert embedded == ["laptops"] and searched == []
+    
+    # Superseded before it started: nothing is embedded either
+    with pytest.raises(Superseded):
+        keystroke("laptop bags")
+    assert embedded == ["laptops"] and searched == []
+    assert api.qdrant_breaker.stats()["failure_rate"] == 0.0
@@ -39,3 +39,14 @@ def test_search_functionality(vector_store, embedding_service):
         assert "id" in results[0]
         assert "score" in results[0]
         assert "payload" in results[0]
+
+def test_vector_stores_share_pooled_client(monkeypatch):
+    """Test that stores for the same server reuse one pooled client."""
+    monkeypatch.setenv("USE_LOCAL_QDRANT", "false")
+    
+    first = VectorStore(url="http://localhost:6333", api_key="key")
+    second = VectorStore(url="http://localhost:6333", api_key="key")
+    grpc = VectorStore(url="http://localhost:6333", api_key="key", prefer_grpc=True)
+    
+    assert first.client is second.client
+    assert grpc.client is not first.client